@@ -1,14 +1,26 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, send_file
 from flask_cors import CORS
+import atexit
+import functools
 import os
+import time
 from http import HTTPStatus
-from datetime import datetime
+from datetime import datetime, timedelta
 from services.user_manager import UserManager
 from services.doable_manager import DoableManager
 from services.allocation_manager import AllocationManager
+from services.archive import ArchiveManager
+from services.columnar_store import ColumnarDoableStore
 from services.data_manager import DataManager
+from services.event_bus import EventBus
+from services.metrics import registry as metrics_registry
+from services.profiler import RequestProfiler
+from services.response_cache import ResponseCache
+from services.sqlite_storage import SqliteStorage
+from services.write_ahead_log import WriteAheadLog
+from models.allocation import Allocation
 from models.doable import Doable
-from utils import convert_dict_keys_to_camel_case
+from utils import camel_case_rows, iter_ndjson
 
 app = Flask(__name__)
 
@@ -16,22 +28,169 @@ CORS(app)
 
 # Configuration
 base_dir = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(base_dir, "data")
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(base_dir, "data"))
 user_data_path = os.path.join(DATA_DIR, "users.json")
 doable_data_path = os.path.join(DATA_DIR, "doables.json")
 allocation_data_path = os.path.join(DATA_DIR, "allocations.json")
 
+# "json" keeps all data in the JSON data files. "sqlite" keeps it in a SQLite database at
+# SQLITE_PATH, seeded from the JSON data files when the database is first created.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(DATA_DIR, "work_allocation.db"))
+
+# With the json backend, "json" rewrites the data files on every save. "wal" appends each
+# change to a write-ahead log and only rewrites the data files in the background once a
+# checkpoint is due.
+PERSISTENCE_MODE = os.environ.get("PERSISTENCE_MODE", "json")
+WAL_CHECKPOINT_EVERY = int(os.environ.get("WAL_CHECKPOINT_EVERY", 1000))
+
+# Seconds to hold a save so that saves requested in the meantime are written together. Each request
+# still waits for its changes to be written before responding.
+SAVE_COMMIT_WINDOW = float(os.environ.get("SAVE_COMMIT_WINDOW", 0))
+
+# Whether to also keep every doable in a columnar store, which makes counts over all doables
+# much faster for large histories at the cost of memory for the columns
+COLUMNAR_STORE = os.environ.get("COLUMNAR_STORE", "0") == "1"
+
+# With the json backend, "json" saves doables and allocations to the JSON data files. "binary"
+# saves them to memory-mapped snapshots instead, which load much faster; the JSON data files are
+# then only read until the first snapshot is written, and can be exported with export_json.py.
+# Snapshots are only written when the write-ahead log is checkpointed, so "binary" requires
+# PERSISTENCE_MODE=wal.
+SNAPSHOT_FORMAT = os.environ.get("SNAPSHOT_FORMAT", "json")
+doable_snapshot_path = allocation_snapshot_path = None
+if SNAPSHOT_FORMAT == "binary" and STORAGE_BACKEND != "sqlite":
+    if PERSISTENCE_MODE != "wal":
+        raise ValueError("SNAPSHOT_FORMAT=binary requires PERSISTENCE_MODE=wal.")
+    doable_snapshot_path = os.path.join(DATA_DIR, "doables.snapshot")
+    allocation_snapshot_path = os.path.join(DATA_DIR, "allocations.snapshot")
+
+# With binary snapshots, whether to also drop doables completed since startup and their allocations
+# from memory once they are written to the snapshots, so memory tracks active work rather than
+# history, and how many recently read completed doables to keep in memory
+TIERED_DOABLES = os.environ.get("TIERED_DOABLES", "0") == "1"
+COLD_CACHE_SIZE = int(os.environ.get("COLD_CACHE_SIZE", 1024))
+
+# Completed doables and their allocations can be moved into compressed monthly archive files
+# in ARCHIVE_DIR. With ARCHIVE_AFTER_DAYS set, cases completed for longer than that (by the
+# doables' creation dates) are archived in the background every ARCHIVE_INTERVAL seconds.
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 0))
+ARCHIVE_INTERVAL = float(os.environ.get("ARCHIVE_INTERVAL", 24 * 60 * 60))
+
+# Number of recent changes kept for /api/events streams to resume from and for polls of
+# /api/allocations with since, and seconds between heartbeats sent to streams while nothing changes
+EVENT_LOG_SIZE = int(os.environ.get("EVENT_LOG_SIZE", 10000))
+EVENT_HEARTBEAT = float(os.environ.get("EVENT_HEARTBEAT", 15))
+
+# Whether requests can be profiled with cProfile: those sent with an "X-Profile: 1" header, and
+# a random PROFILE_SAMPLE_RATE share of all requests. The PROFILE_KEEP most recent profiles are
+# kept in PROFILE_DIR and served by /api/profiles.
+PROFILING = os.environ.get("PROFILING", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 50))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+
+# Number of serialized GET responses to cache until the data changes (0 disables the cache)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 256))
+
 os.makedirs(DATA_DIR, exist_ok=True)
 
+storage = doable_wal = allocation_wal = None
+if STORAGE_BACKEND == "sqlite":
+    storage = SqliteStorage(SQLITE_PATH)
+    if storage.is_empty():
+        storage.import_json(doable_data_path, allocation_data_path, user_data_path)
+elif PERSISTENCE_MODE == "wal":
+    doable_wal = WriteAheadLog(f"{doable_data_path}.log", checkpoint_every=WAL_CHECKPOINT_EVERY)
+    allocation_wal = WriteAheadLog(f"{allocation_data_path}.log", checkpoint_every=WAL_CHECKPOINT_EVERY)
+
 # Initialise managers
-user_manager = UserManager(user_data_path)
-doable_manager = DoableManager(doable_data_path)
-allocation_manager = AllocationManager(doable_manager, user_manager, allocation_data_path)
-data_manager = DataManager(doable_manager, allocation_manager)
+event_bus = EventBus(EVENT_LOG_SIZE)
+user_manager = UserManager(user_data_path, storage=storage)
+doable_manager = DoableManager(
+    doable_data_path,
+    wal=doable_wal,
+    storage=storage,
+    columns=ColumnarDoableStore() if COLUMNAR_STORE else None,
+    snapshot_path=None if storage else doable_snapshot_path,
+    tiered=TIERED_DOABLES and doable_snapshot_path is not None and not storage,
+    cold_cache_size=COLD_CACHE_SIZE,
+    events=event_bus,
+)
+allocation_manager = AllocationManager(
+    doable_manager,
+    user_manager,
+    allocation_data_path,
+    wal=allocation_wal,
+    storage=storage,
+    snapshot_path=None if storage else allocation_snapshot_path,
+    tiered=TIERED_DOABLES and allocation_snapshot_path is not None and not storage,
+    events=event_bus,
+)
+data_manager = DataManager(doable_manager, allocation_manager, commit_window=SAVE_COMMIT_WINDOW)
+atexit.register(data_manager.close)
+archive_manager = ArchiveManager(ARCHIVE_DIR, doable_manager, allocation_manager, data_manager=data_manager)
+if ARCHIVE_AFTER_DAYS > 0:
+    archive_manager.schedule(timedelta(days=ARCHIVE_AFTER_DAYS), ARCHIVE_INTERVAL)
+    atexit.register(archive_manager.stop)
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+profiler = None
+if PROFILING:
+    profiler = RequestProfiler(PROFILE_DIR, keep=PROFILE_KEEP, sample_rate=PROFILE_SAMPLE_RATE)
+    app.wsgi_app = profiler.wrap(app.wsgi_app)
 
 def error_response(message, status_code):
     return jsonify({"error": message}), status_code
 
+def doable_row_from_request(data):
+    """
+    Map a doable sent to the API onto the fields of Doable.from_dict, leaving out missing fields.
+    Anything that is not a JSON object is passed through to be reported as an invalid row.
+    """
+    if not isinstance(data, dict):
+        return data
+    row = {
+        "title": data.get("doableTitle"),
+        "case_id": data.get("caseId"),
+        "type": data.get("doableType"),
+        "priority": data.get("doablePriority"),
+        "created_at": data.get("createdAt"),
+    }
+    return {key: value for key, value in row.items() if value is not None}
+
+def cached_response(view):
+    """
+    Serve a GET endpoint from the response cache while the data is unchanged, keyed by path and
+    query arguments. Responses carry a strong ETag, so polls with a matching If-None-Match get a 304,
+    and the data version they reflect as X-Data-Version, to pass as since to GET /api/allocations.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # Read first, so that the response reflects at least every change up to it
+        data_version = event_bus.last_id
+        version = (data_version, data_manager.version())
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        cached = response_cache.get(key, version)
+        if cached is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != HTTPStatus.OK:
+                return response
+            body = response.get_data()
+            etag = response_cache.put(key, version, body)
+        else:
+            body, etag = cached
+
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=HTTPStatus.NOT_MODIFIED)
+        else:
+            response = app.response_class(body, status=HTTPStatus.OK, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Data-Version"] = str(data_version)
+        return response
+    return wrapper
+
 @app.errorhandler(404)
 def not_found_error(error):
     return error_response("Resource not found", HTTPStatus.NOT_FOUND)
@@ -40,36 +199,51 @@ def not_found_error(error):
 def internal_error(error):
     return error_response("Internal server error", HTTPStatus.INTERNAL_SERVER_ERROR)
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    """
+    Record the duration of every request by method, route pattern and status.
+    """
+    started = g.pop("request_started", None)
+    if started is not None:
+        metrics_registry.histogram(
+            "http_request_duration_seconds",
+            "Duration of HTTP requests.",
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            status=str(response.status_code),
+        ).observe(time.perf_counter() - started)
+    return response
+
 
 @app.route('/api/users')
+@cached_response
 def get_users():
     """
     Get all users.
     """
     try:
         users = user_manager.list_users()
-        sorted_users = sorted(
-            [user.to_dict() for user in users],
-            key=lambda user: user.get("first_name", "").lower()
-        )
-        return jsonify(convert_dict_keys_to_camel_case(sorted_users)), HTTPStatus.OK
+        sorted_users = sorted(users, key=lambda user: user.first_name.lower())
+        return jsonify([user.to_camel_dict() for user in sorted_users]), HTTPStatus.OK
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
 @app.route('/api/users/<user_id>/doables')
+@cached_response
 def get_user_doables(user_id):
     """
     Get all doables assigned to a user.
     """
     try:
-        user_allocations = allocation_manager.get_allocations_by_user(user_id)
-        doable_ids = [allocation.doable_id for allocation in user_allocations]
+        incomplete_doables = allocation_manager.get_open_doables_by_user(user_id)
 
-        user_doables = [doable_manager.get_doable(doable_id) for doable_id in doable_ids]
-        incomplete_doables = [doable for doable in user_doables if doable.status != "completed"]
-        
-        return jsonify(convert_dict_keys_to_camel_case([doable.to_dict() for doable in incomplete_doables])), HTTPStatus.OK
+        return jsonify([doable.to_camel_dict() for doable in incomplete_doables]), HTTPStatus.OK
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
@@ -91,7 +265,7 @@ def allocate_doable_to_user(user_id):
         allocated_doable = doable_manager.get_doable(allocation.doable_id)
         data_manager.save_all()
         
-        return jsonify(convert_dict_keys_to_camel_case(allocated_doable.to_dict())), HTTPStatus.OK
+        return jsonify(allocated_doable.to_camel_dict()), HTTPStatus.OK
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
@@ -113,7 +287,7 @@ def allocate_case_to_user(user_id):
         allocated_doables = [doable_manager.get_doable(allocation.doable_id) for allocation in allocations]
         data_manager.save_all()
         
-        return jsonify(convert_dict_keys_to_camel_case([doable.to_dict() for doable in allocated_doables])), HTTPStatus.OK
+        return jsonify([doable.to_camel_dict() for doable in allocated_doables]), HTTPStatus.OK
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
@@ -133,19 +307,107 @@ def allocate_case_to_user_by_id(user_id, case_id):
         allocated_doables = [doable_manager.get_doable(allocation.doable_id) for allocation in allocations]
         data_manager.save_all()
 
-        return jsonify(convert_dict_keys_to_camel_case([doable.to_dict() for doable in allocated_doables])), HTTPStatus.OK
+        return jsonify([doable.to_camel_dict() for doable in allocated_doables]), HTTPStatus.OK
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
     
 
 @app.route('/api/allocations')
+@cached_response
 def get_allocations():
     """
-    Get all allocations.
+    Get allocations, optionally filtered by status (comma-separated), type, userId, caseId and title.
+    With a limit or cursor, a page is returned together with the cursor of the next page.
+    With groupBy=case, allocations are returned grouped by case instead.
+    With since, the version from the X-Data-Version header of an earlier response or the version of
+    earlier changes, only the changes since then are returned, or a 410 if a full reload is needed.
+    """
+    try:
+        since = request.args.get("since")
+        if since is not None:
+            if not since.isdigit():
+                raise ValueError(f"Invalid since '{since}'. Must be a non-negative integer.")
+            if len(request.args) > 1:
+                raise ValueError("since cannot be combined with other arguments.")
+            changes = allocation_manager.get_allocation_view_changes(int(since))
+            if changes is None:
+                return jsonify({
+                    "error": "Full resync required: the changes since this version are no longer kept.",
+                    "resyncRequired": True,
+                    "version": event_bus.last_id,
+                }), HTTPStatus.GONE
+            return jsonify({
+                "version": changes["version"],
+                "added": camel_case_rows(changes["added"]),
+                "updated": camel_case_rows(changes["updated"]),
+                "removed": changes["removed"],
+            }), HTTPStatus.OK
+
+        status = request.args.get("status")
+        statuses = status.split(",") if status else None
+        group_by = request.args.get("groupBy")
+        if group_by is not None:
+            if group_by != "case":
+                raise ValueError(f"Invalid groupBy '{group_by}'. Must be 'case'.")
+            groups = allocation_manager.get_allocation_view_by_case(
+                statuses=statuses,
+                doable_type=request.args.get("type"),
+                user_id=request.args.get("userId"),
+                title=request.args.get("title"),
+            )
+            return jsonify([
+                {"caseId": group["case_id"], "allocations": camel_case_rows(group["allocations"])} for group in groups
+            ]), HTTPStatus.OK
+
+        limit = request.args.get("limit")
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                raise ValueError(f"Invalid limit '{limit}'. Must be a positive integer.")
+            limit = int(limit)
+        cursor = request.args.get("cursor")
+
+        allocations, next_cursor = allocation_manager.query_allocation_view(
+            statuses=statuses,
+            doable_type=request.args.get("type"),
+            user_id=request.args.get("userId"),
+            case_id=request.args.get("caseId"),
+            title=request.args.get("title"),
+            cursor=cursor,
+            limit=limit,
+        )
+        allocations = camel_case_rows(allocations)
+        if limit is None and cursor is None:
+            return jsonify(allocations), HTTPStatus.OK
+        return jsonify({"allocations": allocations, "nextCursor": next_cursor}), HTTPStatus.OK
+    except ValueError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route('/api/allocations/bulk', methods=['POST'])
+def allocate_bulk():
+    """
+    Allocate doables or cases to several users at once.
     """
     try:
-        allocations = allocation_manager.get_allocation_view()
-        return jsonify(convert_dict_keys_to_camel_case(allocations)), HTTPStatus.OK
+        data = request.get_json()
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            raise ValueError("Expected a list of allocation requests.")
+
+        allocations = allocation_manager.allocate_bulk([{
+            "user_id": item.get("userId"),
+            "mode": item.get("mode"),
+            "count": item.get("count", 1),
+        } for item in data])
+        data_manager.save_all()
+
+        return jsonify([
+            {**allocation.to_camel_dict(), "doable": doable_manager.get_doable(allocation.doable_id).to_camel_dict()}
+            for allocation in allocations
+        ]), HTTPStatus.OK
+    except ValueError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
@@ -156,11 +418,13 @@ def delete_allocation(doable_id):
     Delete an allocation.
     """
     try:
+        if allocation_manager.get_allocation(doable_id) is None:
+            return error_response(f"No allocation found for doable with ID {doable_id}.", HTTPStatus.NOT_FOUND)
         allocation_manager.delete_allocation(doable_id)
         data_manager.save_all()
         return jsonify({"message": "Allocation deleted."}), HTTPStatus.OK
     except ValueError as e:
-        return error_response(str(e), HTTPStatus.NOT_FOUND)
+        return error_response(str(e), HTTPStatus.CONFLICT)
     except Exception as e:
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
@@ -200,7 +464,7 @@ def add_doable():
             "created_at": data["created_at"],
         })
         doable_manager.add_doable_instance(new_doable)
-        doable_manager.save_doables()
+        data_manager.save_all()
         return jsonify({"message": "Doable added."}), HTTPStatus.CREATED
     except ValueError as e:
         return error_response(str(e), HTTPStatus.BAD_REQUEST)
@@ -208,6 +472,42 @@ def add_doable():
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
+@app.route('/api/doables/bulk', methods=['POST'])
+def add_doables_bulk():
+    """
+    Add many doables at once from a JSON array, or from an NDJSON stream
+    sent with the application/x-ndjson content type.
+    """
+    try:
+        if request.mimetype == "application/x-ndjson":
+            items = iter_ndjson(request.stream)
+        else:
+            items = request.get_json()
+            if not isinstance(items, list):
+                raise ValueError("Expected a list of doables.")
+
+        added, errors = doable_manager.add_doables_bulk(doable_row_from_request(item) for item in items)
+        data_manager.save_all()
+
+        return jsonify({"added": added, "errors": errors}), HTTPStatus.OK
+    except ValueError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route('/api/doables/counts')
+@cached_response
+def get_doable_counts():
+    """
+    Count doables by status and then by type.
+    """
+    try:
+        return jsonify(doable_manager.get_doable_counts()), HTTPStatus.OK
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
 @app.route('/api/doables/<doable_id>', methods=['PATCH'])
 def update_doable(doable_id):
     """
@@ -217,8 +517,8 @@ def update_doable(doable_id):
         data = request.get_json()
         
         status = data.get("status")
-        doable_manager.update_doable(doable_id, status=status)
-        doable_manager.save_doables()
+        doable_manager.transition_status(doable_id, status)
+        data_manager.save_all()
         
         return jsonify({"message": "Doable updated."}), HTTPStatus.OK
     except ValueError as e:
@@ -227,5 +527,141 @@ def update_doable(doable_id):
         return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
 
 
+@app.route('/api/events')
+def get_events():
+    """
+    Stream changes as server-sent events: allocation.created, allocation.deleted, doable.created,
+    doable.updated, doable.status and doable.removed. A stream resumes after the event ID in the
+    Last-Event-ID header or lastEventId argument, or otherwise starts with the next change. If the
+    events since then are no longer kept, a resync event tells the client to reload everything.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    if last_event_id is None:
+        last_event_id = event_bus.last_id
+    elif not last_event_id.isdigit():
+        return error_response(f"Invalid last event ID '{last_event_id}'. Must be a non-negative integer.", HTTPStatus.BAD_REQUEST)
+
+    def stream(last_id):
+        while True:
+            events = event_bus.wait(last_id, EVENT_HEARTBEAT)
+            if events is None:
+                last_id = event_bus.last_id
+                yield f"id: {last_id}\nevent: resync\ndata: {{}}\n\n"
+            elif not events:
+                yield ": heartbeat\n\n"  # a comment, so that dead connections are noticed and closed
+            else:
+                last_id = events[-1].id
+                yield "".join(event.to_sse() for event in events)
+
+    return app.response_class(
+        stream(int(last_event_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route('/api/metrics')
+def get_metrics():
+    """
+    Report request and manager call durations in the Prometheus text format.
+    """
+    return app.response_class(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route('/api/profiles')
+def get_profiles():
+    """
+    List the saved request profiles, newest first.
+    """
+    if profiler is None:
+        return error_response("Profiling is not enabled.", HTTPStatus.NOT_FOUND)
+    try:
+        return jsonify(camel_case_rows(profiler.list_profiles())), HTTPStatus.OK
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route('/api/profiles/<profile_id>')
+def get_profile(profile_id):
+    """
+    Download a saved request profile in the pstats format, or with ?format=text as a report of
+    its top functions, sorted by ?sort (default cumulative).
+    """
+    if profiler is None:
+        return error_response("Profiling is not enabled.", HTTPStatus.NOT_FOUND)
+    try:
+        if request.args.get("format") == "text":
+            report = profiler.report(profile_id, sort=request.args.get("sort", "cumulative"))
+            if report is None:
+                return error_response(f"Profile {profile_id} not found.", HTTPStatus.NOT_FOUND)
+            return app.response_class(report, content_type="text/plain; charset=utf-8")
+
+        path = profiler.profile_path(profile_id)
+        if path is None:
+            return error_response(f"Profile {profile_id} not found.", HTTPStatus.NOT_FOUND)
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=f"{profile_id}.prof")
+    except ValueError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route('/api/archive')
+def get_archive_partitions():
+    """
+    List the archive partitions with the number of doables and allocations in each.
+    """
+    try:
+        return jsonify(archive_manager.partitions()), HTTPStatus.OK
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route('/api/archive/<partition>')
+def get_archive_partition(partition):
+    """
+    Get the archived doables and allocations of a partition, optionally only those of a case.
+    """
+    try:
+        data = archive_manager.read_partition(partition)
+        if data is None:
+            return error_response(f"Archive partition {partition} not found.", HTTPStatus.NOT_FOUND)
+
+        case_id = request.args.get("caseId")
+        doables = [
+            Doable.from_dict(doable_data) for doable_data in data["doables"]
+            if case_id is None or doable_data["case_id"] == case_id
+        ]
+        doable_ids = {doable.id for doable in doables}
+        allocations = [
+            Allocation.from_dict(allocation_data) for allocation_data in data["allocations"]
+            if allocation_data["doable_id"] in doable_ids
+        ]
+        return jsonify({
+            "doables": [doable.to_camel_dict() for doable in doables],
+            "allocations": [allocation.to_camel_dict() for allocation in allocations],
+        }), HTTPStatus.OK
+    except ValueError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+@app.route('/api/archive/<partition>/restore', methods=['POST'])
+def restore_archive_partition(partition):
+    """
+    Move the doables and allocations of an archive partition back into the live data.
+    """
+    try:
+        restored = archive_manager.restore(partition)
+        if restored is None:
+            return error_response(f"Archive partition {partition} not found.", HTTPStatus.NOT_FOUND)
+        return jsonify(restored), HTTPStatus.OK
+    except ValueError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except Exception as e:
+        return error_response(str(e), HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Archive completed doables and their allocations, list the archive, or restore part of it.
+
+Cases whose doables are all completed and were created more than the given number of days
+ago are moved into compressed monthly files in ARCHIVE_DIR. Run this while the server is
+stopped, as both would otherwise write to the same data; a running server can archive on a
+schedule instead (ARCHIVE_AFTER_DAYS).
+
+    python archive_doables.py archive --days 90
+    python archive_doables.py list
+    python archive_doables.py restore 2024-01
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive completed doables, or list or restore the archive.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="Archive cases completed more than --days ago.")
+    archive.add_argument("--days", type=int, required=True, help="Retention period in days.")
+    commands.add_parser("list", help="List the archive partitions.")
+    restore = commands.add_parser("restore", help="Restore the doables of an archive partition.")
+    restore.add_argument("partition", help="Partition to restore, as YYYY-MM.")
+    args = parser.parse_args(argv)
+
+    from app import archive_manager  # loads the store as configured for the app
+
+    if args.command == "archive":
+        archived = archive_manager.archive_completed(datetime.now() - timedelta(days=args.days))
+        for partition, count in sorted(archived.items()):
+            print(f"{partition}: archived {count} doables")
+        print(f"Archived {sum(archived.values())} doables.")
+    elif args.command == "list":
+        for summary in archive_manager.partitions():
+            print(f"{summary['partition']}: {summary['doables']} doables, {summary['allocations']} allocations")
+    else:
+        restored = archive_manager.restore(args.partition)
+        if restored is None:
+            print(f"Archive partition {args.partition} not found.", file=sys.stderr)
+            return 1
+        print(f"Restored {restored['doables']} doables and {restored['allocations']} allocations.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
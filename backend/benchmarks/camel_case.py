@@ -0,0 +1,74 @@
+"""
+Compare the camelCase serialization of allocation view rows with the original recursive conversion.
+
+Run from the backend directory:
+
+    python -m benchmarks.camel_case --rows 100000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from utils import camel_case_rows, convert_dict_keys_to_camel_case
+
+
+def legacy_snake_to_camel(snake_str):
+    components = snake_str.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+def legacy_convert_dict_keys_to_camel_case(data):
+    """The conversion as it was before memoization and the flat-row fast path."""
+    if isinstance(data, dict):
+        return {legacy_snake_to_camel(key): legacy_convert_dict_keys_to_camel_case(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [legacy_convert_dict_keys_to_camel_case(item) for item in data]
+    else:
+        return data
+
+
+def make_rows(count):
+    """Build allocation view rows shaped like AllocationManager.query_allocation_view's."""
+    start = datetime(2024, 1, 1)
+    return [{
+        "doable_id": f"message_{number}",
+        "doable_title": f"Email {number}",
+        "doable_type": "email",
+        "case_id": f"case_{number // 5}",
+        "created_at": (start + timedelta(minutes=number)).isoformat(),
+        "user_name": "emma.emails",
+        "user_first_name": "Emma",
+        "user_last_name": None,
+        "user_preferred_type": "email",
+        "allocated_at": (start + timedelta(minutes=number, seconds=30)).isoformat(),
+        "is_case_allocation": False,
+        "priority": ("high", "medium", "low")[number % 3],
+        "status": "allocated",
+    } for number in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Number of rows per response.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs; the best is reported.")
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    assert camel_case_rows(rows) == legacy_convert_dict_keys_to_camel_case(rows)
+
+    candidates = {
+        "legacy recursive": lambda: legacy_convert_dict_keys_to_camel_case(rows),
+        "memoized recursive": lambda: convert_dict_keys_to_camel_case(rows),
+        "camel_case_rows": lambda: camel_case_rows(rows),
+        "camel_case_rows + json.dumps": lambda: json.dumps(camel_case_rows(rows)),
+        "legacy + json.dumps": lambda: json.dumps(legacy_convert_dict_keys_to_camel_case(rows)),
+    }
+    baseline = None
+    for name, run in candidates.items():
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<30} {best * 1000:9.1f} ms  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
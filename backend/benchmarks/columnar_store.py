@@ -0,0 +1,67 @@
+"""
+Compare counting doables over the columnar doable store with the same count over
+DoableManager's dict of Doable objects.
+
+Run from the backend directory (numpy is used if installed):
+
+    python -m benchmarks.columnar_store --rows 1000000
+"""
+import argparse
+import random
+import timeit
+from collections import Counter
+from datetime import datetime, timedelta
+from models.doable import Doable
+from services import columnar_store
+from services.columnar_store import ColumnarDoableStore
+
+
+def make_doables(count, seed=0):
+    """
+    Build Doables with a realistic mix: most completed, a few cases per hundred doables.
+    """
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    doables = []
+    for number in range(count):
+        type = rng.choice(("task", "email"))
+        doables.append(Doable(
+            id=f"{type}_{number}",
+            title=f"Doable {number}",
+            case_id=f"case_{rng.randrange(count // 20 or 1)}",
+            type=type,
+            priority=rng.choice(("high", "medium", "low")),
+            status=rng.choices(("pending", "allocated", "completed"), weights=(5, 5, 90))[0],
+            created_at=start + timedelta(minutes=rng.randrange(count * 10)),
+        ))
+    return doables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="Number of doables.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs; the best is reported.")
+    args = parser.parse_args(argv)
+
+    doables = {doable.id: doable for doable in make_doables(args.rows)}
+    store = ColumnarDoableStore()
+    store.extend(doables.values())
+    objects = doables.values()
+
+    scans = {
+        "counts by status and type": (
+            lambda: Counter((doable.status, doable.type) for doable in objects),
+            store.counts_by_status_and_type,
+        ),
+    }
+
+    print(f"{args.rows} doables, columns scanned with {'numpy' if columnar_store.np else 'Python'}")
+    print(f"{'scan':<28} {'objects':>10} {'columns':>10}")
+    for name, (over_objects, over_columns) in scans.items():
+        objects_time = min(timeit.repeat(over_objects, number=1, repeat=args.repeat))
+        columns_time = min(timeit.repeat(over_columns, number=1, repeat=args.repeat))
+        print(f"{name:<28} {objects_time * 1000:7.1f} ms {columns_time * 1000:7.1f} ms  {objects_time / columns_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Measure the overhead the metrics add: a method timed with the timed decorator against the
+same method undecorated, and the histogram lookup and observation done for every request.
+
+Run from the backend directory:
+
+    python -m benchmarks.metrics_overhead --calls 1000000
+"""
+import argparse
+import timeit
+from services.metrics import Histogram, registry, timed
+
+
+def plain(value):
+    return value
+
+
+@timed("Benchmark.decorated")
+def decorated(value):
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000000, help="Number of calls to time.")
+    args = parser.parse_args(argv)
+
+    histogram = Histogram()
+    plain_time = min(timeit.repeat(lambda: plain(1), number=args.calls, repeat=3)) / args.calls
+    decorated_time = min(timeit.repeat(lambda: decorated(1), number=args.calls, repeat=3)) / args.calls
+    observe_time = min(timeit.repeat(lambda: histogram.observe(0.0005), number=args.calls, repeat=3)) / args.calls
+
+    def record_request():
+        registry.histogram(
+            "http_request_duration_seconds", method="GET", route="/api/users/<user_id>/doables", status="200"
+        ).observe(0.0005)
+    request_time = min(timeit.repeat(record_request, number=args.calls, repeat=3)) / args.calls
+
+    print(f"undecorated call      {plain_time * 1e6:6.3f} us")
+    print(f"decorated call        {decorated_time * 1e6:6.3f} us  (+{(decorated_time - plain_time) * 1e6:.3f} us)")
+    print(f"Histogram.observe     {observe_time * 1e6:6.3f} us")
+    print(f"per-request record    {request_time * 1e6:6.3f} us")
+
+
+if __name__ == "__main__":
+    main()
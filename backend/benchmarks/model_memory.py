@@ -0,0 +1,139 @@
+"""
+Report the memory held per Doable, Allocation and User object, compared with the original
+unslotted dataclasses that kept their own copy of every string.
+
+Run from the backend directory:
+
+    python -m benchmarks.model_memory --count 100000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+from models.allocation import Allocation
+from models.doable import Doable
+from models.user import User
+
+
+@dataclass
+class LegacyDoable:
+    id: str
+    title: str
+    case_id: Optional[str] = None
+    type: str = "task"
+    priority: str = "medium"
+    status: str = "pending"
+    created_at: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            case_id=data.get("case_id"),
+            type=data.get("type", "task"),
+            priority=data.get("priority", "medium"),
+            status=data.get("status", "pending"),
+            created_at=datetime.fromisoformat(data["created_at"]),
+        )
+
+
+@dataclass
+class LegacyAllocation:
+    doable_id: str
+    user_id: str
+    allocated_at: datetime = field(default_factory=datetime.now)
+    is_case_allocation: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            doable_id=data["doable_id"],
+            user_id=data["user_id"],
+            allocated_at=datetime.fromisoformat(data["allocated_at"]),
+            is_case_allocation=data.get("is_case_allocation", False),
+        )
+
+
+@dataclass
+class LegacyUser:
+    user_name: str
+    first_name: str
+    id: str = ""
+    last_name: Optional[str] = None
+    preferred_doable_type: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+def make_records(count):
+    """
+    Build records of each model as JSON, to be parsed afresh for every measurement.
+    """
+    start = datetime(2024, 1, 1)
+    doables = [{
+        "id": f"message_{number}",
+        "title": f"Email {number}",
+        "case_id": f"case_{number // 5}",
+        "type": "email",
+        "priority": ("high", "medium", "low")[number % 3],
+        "status": "completed",
+        "created_at": (start + timedelta(minutes=number)).isoformat(),
+    } for number in range(count)]
+    allocations = [{
+        "doable_id": f"message_{number}",
+        "user_id": f"user_{number % 10}",
+        "allocated_at": (start + timedelta(minutes=number, seconds=30)).isoformat(),
+        "is_case_allocation": False,
+    } for number in range(count)]
+    users = [{
+        "id": f"user_{number}",
+        "user_name": f"user.{number}",
+        "first_name": f"User {number}",
+        "last_name": None,
+        "preferred_doable_type": "email",
+    } for number in range(count)]
+    return {"doables": json.dumps(doables), "allocations": json.dumps(allocations), "users": json.dumps(users)}
+
+
+def bytes_per_object(model, data):
+    """
+    Measure the memory still held by objects loaded from JSON once the parsed records are gone,
+    including the strings the objects keep alive, divided by the number of objects.
+    """
+    gc.collect()
+    tracemalloc.start()
+    records = json.loads(data)
+    objects = [model.from_dict(record) for record in records]
+    del records
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the objects is not part of their cost
+    return held / len(objects) - 8
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000, help="Number of objects of each model.")
+    args = parser.parse_args(argv)
+
+    records = make_records(args.count)
+    print(f"{'model':<12} {'before':>10} {'after':>10}")
+    for name, legacy, model in (
+        ("doables", LegacyDoable, Doable),
+        ("allocations", LegacyAllocation, Allocation),
+        ("users", LegacyUser, User),
+    ):
+        before = bytes_per_object(legacy, records[name])
+        after = bytes_per_object(model, records[name])
+        print(f"{name:<12} {before:>8.0f} B {after:>8.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare loading a DoableManager and AllocationManager from the JSON data files with loading
+them from binary snapshots, for a history where most doables are completed.
+
+Run from the backend directory:
+
+    python -m benchmarks.snapshot_startup --rows 200000 --completed 0.9
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from models.allocation import Allocation
+from models.doable import Doable
+from models.user import User
+from services.allocation_manager import AllocationManager
+from services.doable_manager import DoableManager
+from services.snapshot import write_allocation_snapshot, write_doable_snapshot
+from services.write_ahead_log import WriteAheadLog
+from utils import write_json_atomic
+
+
+def make_data(directory, count, completed):
+    """
+    Write the same doables and allocations as JSON data files and as snapshots.
+    """
+    start = datetime(2024, 1, 1)
+    doables = []
+    allocations = []
+    for number in range(count):
+        status = "completed" if number < count * completed else ("allocated" if number % 3 == 0 else "pending")
+        doables.append(Doable(
+            id=f"message_{number}",
+            title=f"Email {number}",
+            case_id=f"case_{number // 10}",
+            type="email" if number % 2 else "task",
+            priority=("low", "medium", "high")[number % 3],
+            status=status,
+            created_at=start + timedelta(minutes=number),
+        ))
+        if status != "pending":
+            allocations.append(Allocation(doable_id=f"message_{number}", user_id=f"user_{number % 50}"))
+
+    paths = {name: os.path.join(directory, name) for name in (
+        "doables.json", "allocations.json", "doables.snapshot", "allocations.snapshot"
+    )}
+    write_json_atomic(paths["doables.json"], [doable.to_dict() for doable in doables])
+    write_json_atomic(paths["allocations.json"], [allocation.to_dict() for allocation in allocations])
+    write_doable_snapshot(paths["doables.snapshot"], doables, count)
+    completed_ids = {doable.id for doable in doables if doable.status == "completed"}
+    write_allocation_snapshot(paths["allocations.snapshot"], allocations, completed_ids)
+    return paths
+
+
+class Users:
+    """
+    Stand-in for UserManager that finds a user for every ID.
+    """
+    def get_user(self, user_id):
+        return User(id=user_id, user_name=user_id, first_name="Test", last_name="User")
+
+
+def load(paths, snapshot):
+    """
+    Time loading each manager with an empty write-ahead log, from the snapshots if asked and the JSON data files otherwise.
+    """
+    started = time.perf_counter()
+    doable_manager = DoableManager(
+        paths["doables.json"],
+        wal=WriteAheadLog(f"{paths['doables.json']}.log"),
+        snapshot_path=paths["doables.snapshot"] if snapshot else None,
+    )
+    loaded_doables = time.perf_counter()
+    AllocationManager(
+        doable_manager,
+        Users(),
+        paths["allocations.json"],
+        wal=WriteAheadLog(f"{paths['allocations.json']}.log"),
+        snapshot_path=paths["allocations.snapshot"] if snapshot else None,
+    )
+    return loaded_doables - started, time.perf_counter() - loaded_doables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="Number of doables.")
+    parser.add_argument("--completed", type=float, default=0.9, help="Fraction of doables that are completed.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_data(directory, args.rows, args.completed)
+        json_size = os.path.getsize(paths["doables.json"]) + os.path.getsize(paths["allocations.json"])
+        snapshot_size = os.path.getsize(paths["doables.snapshot"]) + os.path.getsize(paths["allocations.snapshot"])
+        json_time = load(paths, snapshot=False)
+        snapshot_time = load(paths, snapshot=True)
+
+    print("           doables    allocations       total     size")
+    for name, (doable_time, allocation_time), size in (
+        ("json", json_time, json_size), ("snapshot", snapshot_time, snapshot_size)
+    ):
+        total = doable_time + allocation_time
+        print(
+            f"{name:10} {doable_time * 1000:8.1f} ms  {allocation_time * 1000:8.1f} ms  {total * 1000:8.1f} ms"
+            f"  {size / 1e6:5.1f} MB  {sum(json_time) / total:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
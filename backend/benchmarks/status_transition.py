@@ -0,0 +1,64 @@
+"""
+Compare changing doable statuses through update_doable with the transition_status fast path,
+as done for every doable of a case when it is allocated and unallocated.
+
+Run from the backend directory:
+
+    python -m benchmarks.status_transition --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from models.doable import Doable
+from services.doable_manager import DoableManager
+
+
+def make_manager(count):
+    """
+    Build a manager holding pending doables in cases of ten, without saving them anywhere.
+    """
+    manager = DoableManager(os.path.join(tempfile.mkdtemp(), "doables.json"))
+    start = datetime(2024, 1, 1)
+    for number in range(count):
+        manager.add_doable_instance(Doable(
+            id=f"message_{number}",
+            title=f"Email {number}",
+            case_id=f"case_{number // 10}",
+            type="email",
+            created_at=start + timedelta(minutes=number),
+        ))
+    return manager
+
+
+def run(change_status, doable_ids):
+    """
+    Time allocating and then unallocating every doable.
+    """
+    started = time.perf_counter()
+    for doable_id in doable_ids:
+        change_status(doable_id, "allocated")
+    for doable_id in doable_ids:
+        change_status(doable_id, "pending")
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Number of doables.")
+    args = parser.parse_args(argv)
+
+    manager = make_manager(args.rows)
+    doable_ids = list(manager.doables)
+    update_time = run(lambda doable_id, status: manager.update_doable(doable_id, status=status), doable_ids)
+    manager = make_manager(args.rows)
+    transition_time = run(manager.transition_status, doable_ids)
+
+    transitions = 2 * len(doable_ids)
+    print(f"update_doable       {update_time / transitions * 1e6:6.2f} us per transition")
+    print(f"transition_status   {transition_time / transitions * 1e6:6.2f} us per transition  {update_time / transition_time:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
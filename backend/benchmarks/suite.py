@@ -0,0 +1,339 @@
+"""
+Benchmark suite for the managers and routes on generated data sets of several sizes.
+
+Each scenario runs against a data set from benchmarks.workload, either by calling the
+managers directly or through the Flask test client, and records the time of every
+operation. Results are written as JSON, and can be compared against a stored baseline,
+flagging scenarios that got slower by more than a threshold.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite run --sizes 10000 100000 --output benchmarks/results/latest.json
+    python -m benchmarks.suite run --sizes 10000 --baseline benchmarks/results/baseline.json
+    python -m benchmarks.suite compare benchmarks/results/baseline.json benchmarks/results/latest.json
+"""
+import argparse
+import atexit
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+from benchmarks.workload import generate, write_data_dir
+from services.allocation_manager import AllocationManager
+from services.data_manager import DataManager
+from services.doable_manager import DoableManager
+from services.user_manager import UserManager
+from services.write_ahead_log import WriteAheadLog
+
+SCENARIOS: Dict[str, Callable] = {}
+
+
+def scenario(name: str):
+    """
+    Register a scenario, a function of the run's context returning the seconds taken by each operation.
+    """
+    def register(function):
+        SCENARIOS[name] = function
+        return function
+    return register
+
+
+def timed(operation: Callable[[int], object], count: int) -> List[float]:
+    """
+    Time each of a number of calls of an operation, passing it the call's index.
+    """
+    times = []
+    for index in range(count):
+        started = time.perf_counter()
+        operation(index)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+class Context:
+    def __init__(self, data_dir: str, ops: int, repeat: int):
+        """
+        A data set being benchmarked, with managers loaded from it on demand.
+
+        Scenarios that change data get managers of their own, loaded from the data files,
+        which are never written to; scenarios that save work on a copy of them.
+        """
+        self.data_dir = data_dir
+        self.ops = ops
+        self.repeat = repeat
+        self._shared = None
+
+    def load(self, data_dir=None, wal: bool = False):
+        """
+        Load a user, doable and allocation manager from a data directory.
+        """
+        data_dir = data_dir or self.data_dir
+        doable_path = os.path.join(data_dir, "doables.json")
+        allocation_path = os.path.join(data_dir, "allocations.json")
+        user_manager = UserManager(os.path.join(data_dir, "users.json"))
+        doable_manager = DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log") if wal else None)
+        allocation_manager = AllocationManager(
+            doable_manager, user_manager, allocation_path,
+            wal=WriteAheadLog(f"{allocation_path}.log") if wal else None,
+        )
+        return user_manager, doable_manager, allocation_manager
+
+    @property
+    def shared(self):
+        """
+        Managers for the scenarios that only read.
+        """
+        if self._shared is None:
+            self._shared = self.load()
+        return self._shared
+
+    def copy(self) -> str:
+        """
+        Copy the data files to a new directory, removed on exit.
+        """
+        directory = tempfile.mkdtemp(prefix="benchmark_")
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        for name in ("users.json", "doables.json", "allocations.json"):
+            shutil.copy(os.path.join(self.data_dir, name), directory)
+        return directory
+
+
+@scenario("direct.load")
+def load(context):
+    return timed(lambda _: context.load(), context.repeat)
+
+
+@scenario("direct.user_doables")
+def user_doables(context):
+    user_manager, _, allocation_manager = context.shared
+    user_ids = list(user_manager.users)
+    return timed(lambda index: allocation_manager.get_open_doables_by_user(user_ids[index % len(user_ids)]), context.ops)
+
+
+@scenario("direct.allocation_view_page")
+def allocation_view_page(context):
+    _, _, allocation_manager = context.shared
+    return timed(lambda _: allocation_manager.query_allocation_view(limit=50), context.ops)
+
+
+@scenario("direct.allocation_view")
+def allocation_view(context):
+    _, _, allocation_manager = context.shared
+    return timed(lambda _: allocation_manager.get_allocation_view(), context.repeat)
+
+
+@scenario("direct.allocate_by_doable")
+def allocate_by_doable(context):
+    user_manager, _, allocation_manager = context.load()
+    users = list(user_manager.users.values())
+
+    def allocate(index):
+        user = users[index % len(users)]
+        allocation_manager.allocate_by_doable(user.id, user.preferred_doable_type)
+    return timed(allocate, context.ops)
+
+
+@scenario("direct.allocate_by_case")
+def allocate_by_case(context):
+    user_manager, _, allocation_manager = context.load()
+    users = list(user_manager.users.values())
+
+    def allocate(index):
+        user = users[index % len(users)]
+        allocation_manager.allocate_by_case(user.id, user.preferred_doable_type)
+    return timed(allocate, context.ops)
+
+
+def save_all(context, wal: bool) -> List[float]:
+    """
+    Time saving after each of a number of allocations.
+    """
+    user_manager, doable_manager, allocation_manager = context.load(context.copy(), wal=wal)
+    data_manager = DataManager(doable_manager, allocation_manager)
+    users = list(user_manager.users.values())
+    times = []
+    for index in range(context.repeat if not wal else context.ops):
+        allocation_manager.allocate_by_doable(users[index % len(users)].id)
+        times += timed(lambda _: data_manager.save_all(), 1)
+    for manager in (doable_manager, allocation_manager):
+        if manager.wal:
+            manager.wal.wait()
+    return times
+
+
+@scenario("direct.save_all_json")
+def save_all_json(context):
+    return save_all(context, wal=False)
+
+
+@scenario("direct.save_all_wal")
+def save_all_wal(context):
+    return save_all(context, wal=True)
+
+
+def load_app(context):
+    """
+    Import a fresh copy of the app on a copy of the data, logging changes to a write-ahead log
+    and with the response cache off, so every request does its work.
+    """
+    os.environ.update({
+        "DATA_DIR": context.copy(),
+        "PERSISTENCE_MODE": "wal",
+        "RESPONSE_CACHE_SIZE": "0",
+    })
+    sys.modules.pop("app", None)
+    app = importlib.import_module("app")
+    return app, app.app.test_client(), list(app.user_manager.users)
+
+
+def checked(response):
+    """
+    Fail the run on an error response, rather than timing the error.
+    """
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.path} failed with {response.status_code}: {response.get_data(as_text=True)}")
+    return response
+
+
+@scenario("route.get_user_doables")
+def route_user_doables(context):
+    _, client, user_ids = load_app(context)
+    return timed(lambda index: checked(client.get(f"/api/users/{user_ids[index % len(user_ids)]}/doables")), context.ops)
+
+
+@scenario("route.get_allocations_page")
+def route_allocations_page(context):
+    _, client, _ = load_app(context)
+    return timed(lambda _: checked(client.get("/api/allocations?limit=50")), context.ops)
+
+
+@scenario("route.allocate_doable")
+def route_allocate_doable(context):
+    _, client, user_ids = load_app(context)
+    return timed(lambda index: checked(client.post(f"/api/users/{user_ids[index % len(user_ids)]}/doables")), context.ops)
+
+
+@scenario("route.allocate_case")
+def route_allocate_case(context):
+    _, client, user_ids = load_app(context)
+    return timed(lambda index: checked(client.post(f"/api/users/{user_ids[index % len(user_ids)]}/doables/case")), context.ops)
+
+
+def summarise(times: List[float]) -> dict:
+    """
+    Summarise the times of a scenario's operations in milliseconds.
+    """
+    ordered = sorted(times)
+    return {
+        "ops": len(times),
+        "mean_ms": statistics.fmean(times) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def run(sizes: List[int], seed: int, ops: int, repeat: int, only: List[str]) -> dict:
+    """
+    Run the scenarios on a data set of each size and collect their results.
+    """
+    results = []
+    for size in sizes:
+        data_dir = tempfile.mkdtemp(prefix="benchmark_data_")
+        atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+        write_data_dir(data_dir, generate(size, seed=seed))
+        context = Context(data_dir, ops, repeat)
+        for name, function in SCENARIOS.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            summary = summarise(function(context))
+            results.append({"scenario": name, "size": size, **summary})
+            print(f"{size:>9} {name:32} {summary['p50_ms']:10.3f} ms p50 {summary['p95_ms']:10.3f} ms p95", flush=True)
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "seed": seed,
+            "ops": ops,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, metric: str, threshold: float, min_ms: float) -> List[dict]:
+    """
+    Compare the results of scenarios run in both, and print the changes. Returns the regressions:
+    scenarios whose metric grew by more than the threshold fraction and by more than min_ms.
+    """
+    before = {(result["scenario"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    print(f"{'size':>9} {'scenario':32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for result in current["results"]:
+        previous = before.get((result["scenario"], result["size"]))
+        if previous is None:
+            continue
+        old, new = previous[metric], result[metric]
+        change = new / old - 1 if old else 0.0
+        regressed = change > threshold and new - old > min_ms
+        if regressed:
+            regressions.append({**result, "baseline_ms": old, "change": change})
+        print(f"{result['size']:>9} {result['scenario']:32} {old:9.3f} ms {new:9.3f} ms {change:+7.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the scenarios and write the results.")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10000], help="Numbers of doables to run with.")
+    run_parser.add_argument("--seed", type=int, default=1, help="Seed of the generated data.")
+    run_parser.add_argument("--ops", type=int, default=200, help="Operations per fast scenario.")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Operations per slow scenario (loads and full saves).")
+    run_parser.add_argument("--only", nargs="*", default=[], help="Only run scenarios starting with these prefixes.")
+    run_parser.add_argument("--output", default="benchmarks/results/latest.json", help="File to write the results to.")
+    run_parser.add_argument("--baseline", help="Results to compare with after the run.")
+
+    compare_parser = commands.add_parser("compare", help="Compare results against a baseline.")
+    compare_parser.add_argument("baseline", help="Baseline results.")
+    compare_parser.add_argument("current", help="Results to check.")
+
+    for command in (run_parser, compare_parser):
+        command.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "max_ms"])
+        command.add_argument("--threshold", type=float, default=0.2, help="Slowdown to flag, as a fraction.")
+        command.add_argument("--min-ms", type=float, default=0.05, help="Smallest slowdown to flag, in milliseconds.")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        current = run(args.sizes, args.seed, args.ops, args.repeat, args.only)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote results to {args.output}.")
+        if not args.baseline:
+            return 0
+        baseline_path = args.baseline
+    else:
+        with open(args.current) as f:
+            current = json.load(f)
+        baseline_path = args.baseline
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, current, args.metric, args.threshold, args.min_ms)
+    print(f"{len(regressions)} regressions.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
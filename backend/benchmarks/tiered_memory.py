@@ -0,0 +1,105 @@
+"""
+Report the memory a DoableManager and AllocationManager hold after working through most of their
+doables, with completed doables and their allocations kept in memory and with them evicted to the
+snapshots in tiered mode.
+
+Run from the backend directory:
+
+    python -m benchmarks.tiered_memory --rows 100000 --completed 0.9
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from benchmarks.snapshot_startup import Users
+from models.doable import Doable
+from services.allocation_manager import AllocationManager
+from services.doable_manager import DoableManager
+from services.snapshot import write_allocation_snapshot, write_doable_snapshot
+from services.write_ahead_log import WriteAheadLog
+
+
+def measure(directory, doables, count, tiered):
+    """
+    Load pending doables from the snapshots, allocate and complete the first count of them and checkpoint,
+    and report the memory still held, what is still resident and how long reads of completed work take.
+    """
+    doable_snapshot_path = os.path.join(directory, f"doables_{tiered}.snapshot")
+    allocation_snapshot_path = os.path.join(directory, f"allocations_{tiered}.snapshot")
+    write_doable_snapshot(doable_snapshot_path, doables, 0)
+    write_allocation_snapshot(allocation_snapshot_path, [])
+
+    gc.collect()
+    tracemalloc.start()
+    doable_manager = DoableManager(
+        os.devnull,
+        wal=WriteAheadLog(os.path.join(directory, f"doables_{tiered}.log")),
+        snapshot_path=doable_snapshot_path,
+        tiered=tiered,
+        cold_cache_size=1024,
+    )
+    allocation_manager = AllocationManager(
+        doable_manager,
+        Users(),
+        os.devnull,
+        wal=WriteAheadLog(os.path.join(directory, f"allocations_{tiered}.log")),
+        snapshot_path=allocation_snapshot_path,
+        tiered=tiered,
+    )
+    completed_ids = []
+    for number in range(count):
+        allocation = allocation_manager.allocate_by_doable(f"user_{number % 50}")
+        doable_manager.transition_status(allocation.doable_id, "completed")
+        completed_ids.append(allocation.doable_id)
+    doable_manager.checkpoint(background=False)
+    allocation_manager.checkpoint(background=False)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for doable_id in completed_ids[:10000]:
+        doable_manager.get_doable(doable_id)
+    lookup_time = (time.perf_counter() - started) / min(len(completed_ids), 10000) if completed_ids else 0
+
+    started = time.perf_counter()
+    allocation_manager.query_allocation_view(statuses=["completed"], limit=50)
+    query_time = time.perf_counter() - started
+    return held, len(doable_manager.doables), len(allocation_manager.allocations), lookup_time, query_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Number of doables.")
+    parser.add_argument("--completed", type=float, default=0.9, help="Fraction of doables to allocate and complete.")
+    args = parser.parse_args(argv)
+
+    start = datetime(2024, 1, 1)
+    doables = [
+        Doable(
+            id=f"message_{number}",
+            title=f"Email {number}",
+            case_id=f"case_{number // 10}",
+            type="email",
+            created_at=start + timedelta(minutes=number),
+        )
+        for number in range(args.rows)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        print("              held   doables  allocations   get_doable   completed page")
+        for tiered in (False, True):
+            held, doables_held, allocations_held, lookup_time, query_time = measure(
+                directory, doables, int(args.rows * args.completed), tiered
+            )
+            print(
+                f"{'tiered' if tiered else 'resident':10} {held / 1e6:7.1f} MB  {doables_held:8}  {allocations_held:11}"
+                f"   {lookup_time * 1e6:7.2f} us   {query_time * 1000:9.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Seeded generator of realistic data sets for the benchmarks: users, and cases made up of
+tasks and emails spread over time, a share of them already allocated or completed.
+
+The same size and seed always give the same data. Write a data directory to point the app
+at with:
+
+    python -m benchmarks.workload --doables 100000 --seed 1 data_100k/
+"""
+import argparse
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+TASK_TITLES = [
+    "set up the case", "exchange", "completion", "check the contract", "order searches",
+    "review the searches", "raise enquiries", "report to the client", "chase the bank", "file the deeds",
+]
+EMAIL_TITLES = [
+    "re: send us your details", "re: searches", "re: mortgage offer", "re: completion date",
+    "fwd: signed contract", "re: enquiries", "re: deposit", "re: identity documents",
+]
+PRIORITIES = ["low", "medium", "high"]
+FIRST_NAMES = ["Emma", "Terry", "Bobby", "Priya", "Sam", "Alex", "Jo", "Chris", "Mo", "Kim"]
+
+
+def generate(doables: int, seed: int = 1, users: int = 50, completed: float = 0.6, allocated: float = 0.1) -> dict:
+    """
+    Generate users, doables and allocations as records in the format of the data files.
+
+    Doables come in cases of a set-up task followed by a mix of tasks and emails, created over
+    time from 2021 onwards. The oldest cases are completed and the newest pending, with the
+    given shares of doables allocated and completed. A few emails have no case.
+    """
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+
+    users_data = [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_name": f"user.{number}",
+        "first_name": FIRST_NAMES[number % len(FIRST_NAMES)],
+        "last_name": f"User {number}",
+        "preferred_doable_type": ("email", "task", None)[number % 3],
+    } for number in range(users)]
+
+    doables_data = []
+    allocations_data = []
+    created_at = start
+    case_number = 0
+    message_number = 0
+    task_ids = set()
+    while len(doables_data) < doables:
+        case_number += 1
+        case_id = f"case_{case_number}" if rng.random() > 0.02 else None
+        size = rng.randint(3, 12) if case_id else 1
+        # Cases created earlier are further along
+        progress = len(doables_data) / doables
+        status = "completed" if progress < completed else ("allocated" if progress < completed + allocated else "pending")
+        user = rng.choice(users_data)
+
+        for index in range(min(size, doables - len(doables_data))):
+            created_at += timedelta(seconds=rng.randint(60, 3600))
+            if case_id and (index == 0 or rng.random() < 0.4):
+                title = "set up the case" if index == 0 else rng.choice(TASK_TITLES[1:])
+                doable_id = (
+                    f"case_setup_{case_number}" if index == 0
+                    else f"{title.replace(' ', '_')}_{case_number}"
+                )
+                if doable_id in task_ids:
+                    continue
+                task_ids.add(doable_id)
+                doable_type = "task"
+            else:
+                message_number += 1
+                title = rng.choice(EMAIL_TITLES)
+                doable_id = f"message_{message_number}"
+                doable_type = "email"
+
+            doables_data.append({
+                "id": doable_id,
+                "title": title,
+                "case_id": case_id,
+                "type": doable_type,
+                "priority": rng.choice(PRIORITIES),
+                "status": status,
+                "created_at": created_at.isoformat(),
+            })
+            if status != "pending":
+                allocations_data.append({
+                    "doable_id": doable_id,
+                    "user_id": user["id"],
+                    "allocated_at": (created_at + timedelta(hours=1)).isoformat(),
+                    "is_case_allocation": case_id is not None,
+                })
+
+    return {"users": users_data, "doables": doables_data, "allocations": allocations_data}
+
+
+def write_data_dir(directory: str, workload: dict):
+    """
+    Write a workload as the users.json, doables.json and allocations.json data files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in ("users", "doables", "allocations"):
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            json.dump(workload[name], f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", help="Directory to write the data files to.")
+    parser.add_argument("--doables", type=int, default=10000, help="Number of doables.")
+    parser.add_argument("--users", type=int, default=50, help="Number of users.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed.")
+    args = parser.parse_args(argv)
+
+    workload = generate(args.doables, seed=args.seed, users=args.users)
+    write_data_dir(args.directory, workload)
+    print(f"Wrote {len(workload['doables'])} doables, {len(workload['allocations'])} allocations "
+          f"and {len(workload['users'])} users to {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Export the doables and allocations of the configured store as JSON data files.
+
+With SNAPSHOT_FORMAT=binary the data is saved to binary snapshots, and this writes it
+back out in the format of the JSON data files, including the completed doables that are
+only read from the snapshot on demand. Run this while the server is stopped.
+
+    python export_json.py export/
+"""
+import argparse
+import os
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export doables and allocations as JSON data files.")
+    parser.add_argument("directory", help="Directory to write doables.json and allocations.json to.")
+    args = parser.parse_args(argv)
+    os.makedirs(args.directory, exist_ok=True)
+
+    from app import allocation_manager, doable_manager  # loads the store as configured for the app
+
+    doable_manager.export_json(os.path.join(args.directory, "doables.json"))
+    allocation_manager.export_json(os.path.join(args.directory, "allocations.json"))
+    print(f"Exported doables and allocations to {args.directory}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
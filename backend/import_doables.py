@@ -0,0 +1,58 @@
+"""
+Import doables into the configured store from a JSON array or an NDJSON file.
+
+Rows use the same fields as the data files (title, type, case_id, priority and
+optionally id and created_at). Invalid rows are reported and skipped. Run this
+while the server is stopped, as both would otherwise write to the same data.
+
+    python import_doables.py doables.ndjson
+    cat doables.ndjson | python import_doables.py -
+"""
+import argparse
+import json
+import sys
+from utils import iter_ndjson
+
+
+def read_rows(path, ndjson):
+    """
+    Yield the rows of a JSON array or NDJSON file, reading NDJSON line by line.
+    """
+    if path == "-":
+        yield from iter_ndjson(sys.stdin)
+        return
+
+    with open(path, "r") as file:
+        if ndjson:
+            yield from iter_ndjson(file)
+        else:
+            rows = json.load(file)
+            if not isinstance(rows, list):
+                raise ValueError("Expected a JSON array of doables.")
+            yield from rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import doables from a JSON array or NDJSON file.")
+    parser.add_argument("path", help="File to import, or - to read NDJSON from standard input.")
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Read the file as NDJSON. Implied by a .ndjson or .jsonl extension.",
+    )
+    args = parser.parse_args(argv)
+    ndjson = args.ndjson or args.path.endswith((".ndjson", ".jsonl"))
+
+    from app import data_manager, doable_manager  # loads the store as configured for the app
+
+    added, errors = doable_manager.add_doables_bulk(read_rows(args.path, ndjson))
+    data_manager.flush()
+
+    for error in errors:
+        print(f"Row {error['row']}: {error['error']}", file=sys.stderr)
+    print(f"Added {added} doables, skipped {len(errors)} rows.")
+    return 1 if errors and not added else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
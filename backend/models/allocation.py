@@ -1,7 +1,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime
+import sys
 
-@dataclass
+@dataclass(slots=True)
 class Allocation:
     doable_id: str
     user_id: str
@@ -15,13 +16,19 @@ class Allocation:
             raise ValueError("User ID must be provided.")
         if not isinstance(self.is_case_allocation, bool):
             raise ValueError("is_case_allocation must be a boolean value.")
+        self.doable_id = sys.intern(self.doable_id)
+        self.user_id = sys.intern(self.user_id)
     
     @classmethod
     def from_dict(cls, data: dict):
         return cls(
             doable_id=data["doable_id"],
             user_id=data["user_id"],
-            allocated_at=datetime.fromisoformat(data["allocated_at"]),
+            allocated_at=(
+                datetime.fromisoformat(data["allocated_at"])
+                if isinstance(data["allocated_at"], str)
+                else data["allocated_at"]
+            ),
             is_case_allocation=data.get("is_case_allocation", False),
         )
 
@@ -31,4 +38,12 @@ class Allocation:
             "user_id": self.user_id,
             "allocated_at": self.allocated_at.isoformat(),
             "is_case_allocation": self.is_case_allocation,
+        }
+
+    def to_camel_dict(self) -> dict:
+        return {
+            "doableId": self.doable_id,
+            "userId": self.user_id,
+            "allocatedAt": self.allocated_at.isoformat(),
+            "isCaseAllocation": self.is_case_allocation,
         }
\ No newline at end of file
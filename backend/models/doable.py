@@ -1,8 +1,18 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
+import sys
 
-@dataclass
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# The statuses a Doable may move to from each status
+STATUS_TRANSITIONS = {
+    "pending": frozenset({"allocated"}),
+    "allocated": frozenset({"completed", "pending"}),
+    "completed": frozenset(),
+}
+
+@dataclass(slots=True)
 class Doable:
     id: str
     title: str
@@ -27,6 +37,19 @@ class Doable:
             raise ValueError(f"Invalid status '{self.status}'. Must be one of {self.valid_statuses}.")
         if isinstance(self.created_at, str):
             self.created_at = datetime.fromisoformat(self.created_at)
+        if not isinstance(self.created_at, datetime):
+            raise ValueError(f"Invalid created_at '{self.created_at}'. Must be an ISO 8601 date and time.")
+        if self.created_at.tzinfo is not None:
+            # Doables are ordered by naive local times, which cannot be compared with aware ones
+            self.created_at = self.created_at.astimezone().replace(tzinfo=None)
+
+        # Share one copy of the strings repeated across many Doables and their indexes
+        self.id = sys.intern(self.id)
+        self.type = sys.intern(self.type)
+        self.priority = sys.intern(self.priority)
+        self.status = sys.intern(self.status)
+        if self.case_id is not None:
+            self.case_id = sys.intern(self.case_id)
 
     @classmethod
     def from_dict(cls, data: dict):
@@ -56,3 +79,17 @@ class Doable:
             "status": self.status,
             "created_at": self.created_at.isoformat(),
         }
+
+    def to_camel_dict(self) -> dict:
+        """
+        Convert the Doable instance to a dictionary with the camelCase keys used by the API.
+        """
+        return {
+            "id": self.id,
+            "title": self.title,
+            "caseId": self.case_id,
+            "type": self.type,
+            "priority": self.priority,
+            "status": self.status,
+            "createdAt": self.created_at.isoformat(),
+        }
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from typing import Optional
 import uuid
 
-@dataclass
+@dataclass(slots=True)
 class User:
     user_name: str
     first_name: str
@@ -40,4 +40,16 @@ class User:
             "first_name": self.first_name,
             "last_name": self.last_name,
             "preferred_doable_type": self.preferred_doable_type,
+        }
+
+    def to_camel_dict(self) -> dict:
+        """
+        Convert the User instance to a dictionary with the camelCase keys used by the API.
+        """
+        return {
+            "id": self.id,
+            "userName": self.user_name,
+            "firstName": self.first_name,
+            "lastName": self.last_name,
+            "preferredDoableType": self.preferred_doable_type,
         }
\ No newline at end of file
@@ -1,16 +1,72 @@
-from typing import List, Dict
+from datetime import datetime
+from typing import Callable, Iterable, List, Dict, Optional, Set, Tuple
+import heapq
 from models.allocation import Allocation
+from services.allocation_view import AllocationView
+from services.event_bus import EventBus
+from services.keyed_lock import KeyedLock
+from services.metrics import timed
+from services.snapshot import AllocationSnapshot, write_allocation_snapshot
+from services.sqlite_storage import SqliteStorage
+from services.write_ahead_log import WriteAheadLog
+from utils import decode_cursor, encode_cursor, write_json_atomic
 import json
+import os
+import threading
 
 class AllocationManager:
-    def __init__(self, doable_manager, user_manager, file_path: str):
+    def __init__(
+        self,
+        doable_manager,
+        user_manager,
+        file_path: str,
+        wal: Optional[WriteAheadLog] = None,
+        storage: Optional[SqliteStorage] = None,
+        snapshot_path: Optional[str] = None,
+        tiered: bool = False,
+        events: Optional[EventBus] = None,
+    ):
+        if tiered and not snapshot_path:
+            raise ValueError("Tiered mode requires a snapshot path.")
+        if snapshot_path and not wal:
+            raise ValueError("Binary snapshots require a write-ahead log.")
         self.doable_manager = doable_manager
         self.user_manager = user_manager
         self.file_path = file_path
+        self.wal = wal
+        self.storage = storage
+        self.snapshot_path = snapshot_path  # binary snapshot checkpointed to instead of the JSON file
+        self.tiered = tiered  # whether to drop allocations of completed doables from memory once written
+        self.events = events  # event bus to publish created and deleted allocations to
+        self.dirty = False  # whether there are changes since the last save
+        self.version = 0  # incremented on every change
         self.allocations: Dict[str, Allocation] = {}
-        self._load_from_file()
+        self._allocations_by_user: Dict[str, Dict[str, Allocation]] = {}  # user_id -> doable_id -> Allocation
+        self._view = AllocationView()
 
+        # With storage or a snapshot to load from, the allocations of completed doables are left in
+        # the storage or snapshot that _cold_source reads them from, rather than held in memory.
+        # Completed is final, so they are only read for queries that can include completed doables.
+        self._cold_source = storage
+        # IDs of deleted allocations that storage or the snapshot still holds until it is next written
+        self._removed: Set[str] = set()
 
+        # Doables are claimed by compare-and-set on their status, so concurrent requests never
+        # allocate the same doable twice. _lock guards the allocations and their index,
+        # _case_locks serialises work on the same case, and _save_lock keeps saves in order.
+        self._lock = threading.RLock()
+        self._case_locks = KeyedLock()
+        self._save_lock = threading.Lock()
+        if self.storage:
+            self._load_from_storage()
+        elif self.snapshot_path and os.path.exists(self.snapshot_path):
+            self._load_from_snapshot()
+        else:
+            self._load_from_file()
+        self.doable_manager.subscribe(self._view.update_doable)
+
+
+    @timed("AllocationManager._load_from_file")
     def _load_from_file(self):
         """
         Load Allocations from JSON file.
@@ -20,165 +76,680 @@ class AllocationManager:
                 allocations_data = json.load(f)
                 for allocation_data in allocations_data:
                     allocation = Allocation.from_dict(allocation_data)
-                    self.allocations[allocation.doable_id] = allocation
+                    self._add_allocation(allocation)
         except FileNotFoundError:
             print("File not found. Starting with an empty allocations list.")
 
+        self._replay_wal()
+
+
+    @timed("AllocationManager._load_from_snapshot")
+    def _load_from_snapshot(self):
+        """
+        Load the Allocations of Doables that are not completed from the binary snapshot.
+        The others are left in the snapshot until they are needed.
+        """
+        self._cold_source = AllocationSnapshot(self.snapshot_path)
+        for allocation_data in self._cold_source.load_allocations(include_completed=False):
+            self._add_allocation(Allocation.from_dict(allocation_data))
+        self._replay_wal()
+
+
+    def _replay_wal(self):
+        """
+        Apply the changes recorded in the write-ahead log since the data file or snapshot was written.
+        """
+        if not self.wal:
+            return
+        for op, data in self.wal.replay():
+            if op == "put":
+                self._add_allocation(Allocation.from_dict(data))
+            elif op == "delete":
+                if data["doable_id"] in self.allocations:
+                    self._remove_allocation(data["doable_id"])
+                if self._cold_source:
+                    self._removed.add(data["doable_id"])
+
+
+    @timed("AllocationManager._load_from_storage")
+    def _load_from_storage(self):
+        """
+        Load the Allocations of Doables that are not completed from storage.
+        """
+        for allocation_data in self.storage.load_allocations(include_completed=False):
+            self._add_allocation(Allocation.from_dict(allocation_data))
+
+
+    def _add_allocation(self, allocation: Allocation):
+        """
+        Store an Allocation and add it to the user index and view, replacing any existing allocation of the doable.
+        """
+        if allocation.doable_id in self.allocations:
+            self._remove_allocation(allocation.doable_id)
+        self._removed.discard(allocation.doable_id)
+        self.allocations[allocation.doable_id] = allocation
+        self._allocations_by_user.setdefault(allocation.user_id, {})[allocation.doable_id] = allocation
+
+        doable = self.doable_manager.get_doable(allocation.doable_id)
+        user = self.user_manager.get_user(allocation.user_id)
+        if doable and user:
+            self._view.put(allocation, doable, user)
+
+
+    def _remove_allocation(self, doable_id: str) -> Allocation:
+        """
+        Remove an Allocation and drop it from the user index and view.
+        """
+        allocation = self.allocations.pop(doable_id)
+        self._view.remove(doable_id)
+        user_allocations = self._allocations_by_user.get(allocation.user_id, {})
+        user_allocations.pop(doable_id, None)
+        if not user_allocations:
+            self._allocations_by_user.pop(allocation.user_id, None)
+        return allocation
+
+
+    def _get_cold_allocation(self, doable_id: str) -> Optional[Allocation]:
+        """
+        Read an Allocation that is not held in memory from storage or the snapshot, unless it has been deleted since.
+        Must be called with _lock held.
+        """
+        if not self._cold_source or doable_id in self.allocations or doable_id in self._removed:
+            return None
+        allocation_data = self._cold_source.get_allocation(doable_id)
+        return Allocation.from_dict(allocation_data) if allocation_data else None
+
+
+    def _cold_allocations(self, resident_ids: Set[str], user_id: Optional[str] = None) -> List[Allocation]:
+        """
+        Read the Allocations in storage or the snapshot that are not among the given resident Allocations,
+        optionally only those of a user.
+        """
+        if not self._cold_source:
+            return []
+        return [
+            Allocation.from_dict(allocation_data)
+            for allocation_data in self._cold_source.get_completed_allocations(user_id)
+            if allocation_data["doable_id"] not in resident_ids and allocation_data["doable_id"] not in self._removed
+        ]
+
+
+    def _cold_rows(
+        self, doable_type: Optional[str], user_id: Optional[str], case_id: Optional[str], title: Optional[str]
+    ) -> List[dict]:
+        """
+        Build the view rows matching the filters of the Allocations held only in storage or the snapshot,
+        which all belong to completed Doables, in view order. Unless a case is given, every such Allocation
+        and completed Doable is read, so these queries take time in proportion to the history.
+        Must be called with _lock held.
+        """
+        if case_id is not None:
+            doables = {
+                doable.id: doable for doable in self.doable_manager.get_doables_by_case(case_id)
+                if doable.status == "completed"
+            }
+            allocations = [
+                allocation for allocation in map(self._get_cold_allocation, doables)
+                if allocation and (user_id is None or allocation.user_id == user_id)
+            ]
+        else:
+            allocations = self._cold_allocations(set(self.allocations), user_id)
+            if not allocations:
+                return []
+            if user_id is None:
+                doables = {doable.id: doable for doable in self.doable_manager.get_doables_by_status("completed")}
+            else:
+                doables = {
+                    allocation.doable_id: self.doable_manager.get_doable(allocation.doable_id) for allocation in allocations
+                }
+
+        title = title.lower() if title else None
+        rows = []
+        for allocation in allocations:
+            doable = doables.get(allocation.doable_id)
+            user = self.user_manager.get_user(allocation.user_id)
+            if (
+                doable and user
+                and (doable_type is None or doable.type == doable_type)
+                and (title is None or title in doable.title.lower())
+            ):
+                rows.append(AllocationView.make_row(allocation, doable, user))
+        rows.sort(key=AllocationView.row_key)
+        return rows
+
+
+    def _includes_cold(self, statuses: Optional[Iterable[str]]) -> bool:
+        """
+        Check whether a view query with these statuses can include Allocations held only in storage or the snapshot.
+        """
+        return self._cold_source is not None and (not statuses or "completed" in statuses)
+
+
+    def _log_change(self, op: str, allocation: Allocation):
+        """
+        Record an added ("put") or removed ("delete") Allocation in the write-ahead log or storage, if one is configured,
+        and publish it as an event.
+        """
+        self.dirty = True
+        data = allocation.to_dict() if op == "put" else {"doable_id": allocation.doable_id}
+        if op == "delete" and self._cold_source:
+            self._removed.add(allocation.doable_id)
+        if self.wal:
+            self.wal.append(op, data)
+        if self.storage:
+            self.storage.stage("allocations", allocation.doable_id, data if op == "put" else None)
+        if self.events is not None:
+            if op == "put":
+                self.events.publish("allocation.created", allocation.to_camel_dict())
+            else:
+                self.events.publish("allocation.deleted", {"doableId": allocation.doable_id, "userId": allocation.user_id})
+        self.version += 1
+
+
+    def _claim_doable(self, doable_id: str) -> bool:
+        """
+        Mark a pending doable as allocated, failing if another request got to it first.
+        """
+        return self.doable_manager.compare_and_set_status(doable_id, "pending", "allocated")
+
 
     def _create_allocation(self, doable, user_id, is_case_allocation=False):
         """
-        Create an allocation for a doable in a case.
+        Create an allocation for a doable that has been claimed.
         """
         allocation = Allocation(
             doable_id=doable.id,
             user_id=user_id,
             is_case_allocation=is_case_allocation
         )
-        self.allocations[allocation.doable_id] = allocation 
-        self.doable_manager.update_doable(doable.id, status="allocated")
+        with self._lock:
+            self._add_allocation(allocation)
+            self._log_change("put", allocation)
         return allocation
     
 
-    def _sort_allocations_by_priority_and_age(self, allocations: List[Dict]) -> List[Dict]:
+    @staticmethod
+    def _encode_view_cursor(key: tuple) -> str:
         """
-        Sort a list of Allocations by priority and age.
+        Encode the sort key of the last allocation on a page as the cursor of the next page.
         """
-        priority_order = {"high": 0, "medium": 1, "low": 2}
+        rank, created_at, doable_id = key
+        return encode_cursor([rank, created_at.isoformat(), doable_id])
 
-        return sorted(
-            allocations,
-            key=lambda a: (
-                priority_order.get(a["priority"], float("inf")),
-                a["created_at"],
-            ),
-        )
+
+    @staticmethod
+    def _decode_view_cursor(cursor: str) -> tuple:
+        """
+        Decode a cursor of the allocation view back into a sort key.
+        """
+        key = decode_cursor(cursor)
+        if len(key) != 3 or type(key[0]) is not int or not isinstance(key[1], str) or not isinstance(key[2], str):
+            raise ValueError("Invalid cursor.")
+        rank, created_at, doable_id = key
+        return rank, datetime.fromisoformat(created_at), doable_id
 
 
+    @timed("AllocationManager.get_allocation_view")
     def get_allocation_view(self) -> List[dict]:
         """
         Generate a list of all allocations.
         """
-        allocation_list = []
-        for allocation in self.allocations.values():
-            doable = self.doable_manager.get_doable(allocation.doable_id)
-            user = self.user_manager.get_user(allocation.user_id)
-            if doable and user:
-                allocation_list.append({
-                    "doable_id": doable.id,
-                    "doable_title": doable.title,
-                    "doable_type": doable.type,
-                    "case_id": doable.case_id,
-                    "created_at": doable.created_at,
-                    "user_name": user.user_name,
-                    "user_first_name": user.first_name,
-                    "user_last_name": user.last_name,
-                    "user_preferred_type": user.preferred_doable_type,
-                    "allocated_at": allocation.allocated_at,
-                    "is_case_allocation": allocation.is_case_allocation,
-                    "priority": doable.priority,
-                    "status": doable.status
-                })
-        return self._sort_allocations_by_priority_and_age(allocation_list)
-    
+        return self.query_allocation_view()[0]
+
+
+    @timed("AllocationManager.query_allocation_view")
+    def query_allocation_view(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        doable_type: Optional[str] = None,
+        user_id: Optional[str] = None,
+        case_id: Optional[str] = None,
+        title: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Get a page of the allocation view, sorted by priority and then by age.
+        The view is read from the narrowest of its sorted user, case and status indexes,
+        starting at the cursor, so only the rows up to the end of the page are visited.
+        Queries that can include completed doables also read the allocations held only in storage
+        or the snapshot, if any, and merge them in.
+
+        :param statuses: Only include doables with one of these statuses.
+        :param doable_type: Only include doables of this type.
+        :param user_id: Only include allocations to this user.
+        :param case_id: Only include doables of this case.
+        :param title: Only include doables whose title contains this text, ignoring case.
+        :param cursor: Cursor returned with the previous page, to continue after it.
+        :param limit: Maximum number of allocations on the page, or None for all of them.
+        :return: The rows of the page and the cursor of the next page, or None if there are no more.
+        """
+        after = self._decode_view_cursor(cursor) if cursor else None
+        statuses = list(statuses) if statuses else None
+        if not self._includes_cold(statuses):
+            rows, last_key = self._view.page(statuses, doable_type, user_id, case_id, title, after, limit)
+            return rows, self._encode_view_cursor(last_key) if last_key else None
+
+        with self._lock:
+            rows, last_key = self._view.page(statuses, doable_type, user_id, case_id, title, after, limit)
+            cold_rows = [
+                row for row in self._cold_rows(doable_type, user_id, case_id, title)
+                if after is None or AllocationView.row_key(row) > after
+            ]
+        rows = list(heapq.merge(rows, cold_rows, key=AllocationView.row_key))
+        if limit is not None and len(rows) > limit:
+            rows, last_key = rows[:limit], AllocationView.row_key(rows[limit - 1])
+        return rows, self._encode_view_cursor(last_key) if last_key else None
+
+
+    def get_allocation_view_by_case(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        doable_type: Optional[str] = None,
+        user_id: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Get the allocation view grouped by case, as {"case_id", "allocations"} groups ordered by their
+        first allocation, taking the same filters as query_allocation_view.
+        """
+        statuses = list(statuses) if statuses else None
+        if not self._includes_cold(statuses):
+            groups = self._view.grouped_by_case(statuses, doable_type, user_id, title)
+        else:
+            with self._lock:
+                grouped = dict(self._view.grouped_by_case(statuses, doable_type, user_id, title))
+                cold_rows = self._cold_rows(doable_type, user_id, None, title)
+            for row in cold_rows:
+                grouped.setdefault(row["case_id"], []).append(row)
+            for rows in grouped.values():
+                rows.sort(key=AllocationView.row_key)
+            groups = sorted(grouped.items(), key=lambda group: AllocationView.row_key(group[1][0]))
+        return [{"case_id": case_id, "allocations": rows} for case_id, rows in groups]
+
+
+    def get_allocation_view_changes(self, since: int) -> Optional[dict]:
+        """
+        Get the changes to the allocation view after a version, the ID of an event on the event bus,
+        as {"version", "added", "updated", "removed"}: the current rows of allocations created or
+        whose doables changed since then, and the doable IDs of deleted allocations. The rows are read
+        after the version returned, so applying them again from that version is harmless.
+        Returns None if the changes since then are no longer kept, and a full reload is needed.
+        """
+        if self.events is None:
+            raise ValueError("Changes are not recorded without an event bus.")
+        events = self.events.since(since)
+        if events is None:
+            return None
+
+        changed: Dict[str, None] = {}  # doable IDs in order of their first change
+        allocated_before: Dict[str, bool] = {}  # whether a doable had an allocation, by its first allocation event
+        for event in events:
+            if event.type == "allocation.created":
+                doable_id = event.data["doableId"]
+                allocated_before.setdefault(doable_id, False)
+            elif event.type == "allocation.deleted":
+                doable_id = event.data["doableId"]
+                allocated_before.setdefault(doable_id, True)
+            elif event.type in ("doable.status", "doable.updated", "doable.removed"):
+                doable_id = event.data["id"]
+            else:
+                continue
+            changed[doable_id] = None
+
+        rows = self._view.get_rows(changed)
+        if self._cold_source:
+            with self._lock:
+                for doable_id in changed:
+                    allocation = None if doable_id in rows else self._get_cold_allocation(doable_id)
+                    if allocation is None:
+                        continue
+                    doable = self.doable_manager.get_doable(doable_id)
+                    user = self.user_manager.get_user(allocation.user_id)
+                    if doable and user:
+                        rows[doable_id] = AllocationView.make_row(allocation, doable, user)
+        added, updated, removed = [], [], []
+        for doable_id in changed:
+            row = rows.get(doable_id)
+            if not allocated_before.get(doable_id, row is not None):
+                if row is not None:
+                    added.append(row)
+            elif row is not None:
+                updated.append(row)
+            else:
+                removed.append(doable_id)
+        return {
+            "version": events[-1].id if events else since,
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+        }
+
+
+    def get_allocation(self, doable_id: str) -> Optional[Allocation]:
+        """
+        Get the allocation of a doable, including one only held in storage or the snapshot.
+        """
+        with self._lock:
+            return self.allocations.get(doable_id) or self._get_cold_allocation(doable_id)
+
 
     def get_allocations_by_user(self, user_id: str) -> List[Allocation]:
         """
         Get all allocations assigned to a user.
         """
-        return [allocation for allocation in self.allocations.values() if allocation.user_id == user_id]
+        with self._lock:
+            allocations = self._allocations_by_user.get(user_id, {})
+            return list(allocations.values()) + self._cold_allocations(set(allocations), user_id)
+
+
+    def get_open_doables_by_user(self, user_id: str) -> List:
+        """
+        Get the doables assigned to a user that are not completed.
+        """
+        with self._lock:
+            doable_ids = list(self._allocations_by_user.get(user_id, {}))
 
+        open_doables = []
+        for doable_id in doable_ids:
+            doable = self.doable_manager.get_doable(doable_id)
+            if doable and doable.status != "completed":
+                open_doables.append(doable)
+        return open_doables
 
+
+    @timed("AllocationManager.allocate_by_doable")
     def allocate_by_doable(self, user_id: str, doable_type: str = None):
         """
         Assign the oldest unallocated Doable matching the user preferences to a user.
         If no type is specified, assign the oldest Doable regardless of type.
         Update the status of the doable to 'allocated'.
         """
-        oldest_doable = self.doable_manager.get_oldest_doable_by_type(doable_type)
+        while True:
+            oldest_doable = self.doable_manager.get_oldest_doable_by_type(doable_type)
 
-        if not oldest_doable:
-            return None
-        
-        return self._create_allocation(oldest_doable, user_id)
+            if not oldest_doable:
+                return None
+
+            # Another request may claim the doable first, in which case try the next one
+            if self._claim_doable(oldest_doable.id):
+                return self._create_allocation(oldest_doable, user_id)
 
 
+    @timed("AllocationManager.allocate_by_case")
     def allocate_by_case(self, user_id: str, doable_type: str = None) -> List[Allocation]:
         """
         Allocate the oldest case with no allocated doables.
         If no type is specified, allocate the oldest case regardless of type.
         """
-        grouped_doables = self.doable_manager.get_doables_grouped_by_case()
-        
-        # Try to find case matching type preference
-        for doables in grouped_doables.values():
-            if not all(doable.status == "pending" for doable in doables):
-                continue
-            if doable_type and any(doable.type == doable_type for doable in doables):
-                return [self._create_allocation(d, user_id, is_case_allocation=True) for d in doables]
-
-        # If no matching case found, get case with oldest doable
-        oldest_case = min(
-            (doables for doables in grouped_doables.values() 
-                if all(d.status == "pending" for d in doables)),
-            key=lambda doables: min(d.created_at for d in doables),
-            default=[]
-        )
-        
-        return [self._create_case_allocation(d, user_id) for d in oldest_case]
+        while True:
+            case_id = None
+
+            # Try to find case matching type preference
+            if doable_type:
+                case_id = self.doable_manager.get_oldest_pending_case(doable_type)
+
+            # If no matching case found, get case with oldest doable
+            if case_id is None:
+                case_id = self.doable_manager.get_oldest_pending_case()
+            if case_id is None:
+                return []
+
+            with self._case_locks(case_id):
+                case_doables = self.doable_manager.get_doables_by_case(case_id)
+                claimed = []
+                for doable in case_doables:
+                    if not self._claim_doable(doable.id):
+                        break
+                    claimed.append(doable)
+
+                if len(claimed) == len(case_doables):
+                    return [self._create_allocation(d, user_id, is_case_allocation=True) for d in case_doables]
+
+                # Another request allocated part of the case, so release it and try the next case
+                for doable in claimed:
+                    self.doable_manager.compare_and_set_status(doable.id, "allocated", "pending")
         
 
+    def allocate_bulk(self, requests: List[dict]) -> List[Allocation]:
+        """
+        Fill the queues of several users in one pass.
+        Each request has a "user_id", a "mode" of "single" (default) or "case", and a "count" (default 1)
+        of doables or cases to allocate using the user's preferred doable type. Users take turns, one
+        doable or case at a time, until each has its count or there is nothing left to allocate.
+        """
+        queue = []
+        for request in requests:
+            user = self.user_manager.get_user(request.get("user_id"))
+            mode = request.get("mode") or "single"
+            count = request.get("count", 1)
+            if not user:
+                raise ValueError(f"No user found with ID {request.get('user_id')}.")
+            if mode not in ("single", "case"):
+                raise ValueError(f"Invalid mode '{mode}'. Must be 'single' or 'case'.")
+            if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+                raise ValueError(f"Invalid count '{count}'. Must be a positive integer.")
+            queue.append([user, mode, count])
+
+        allocations = []
+        while queue:
+            remaining = []
+            for entry in queue:
+                user, mode, count = entry
+                if mode == "case":
+                    new_allocations = self.allocate_by_case(user.id, user.preferred_doable_type)
+                else:
+                    allocation = self.allocate_by_doable(user.id, user.preferred_doable_type)
+                    new_allocations = [allocation] if allocation else []
+
+                if new_allocations:
+                    allocations.extend(new_allocations)
+                    entry[2] = count - 1
+                    if entry[2]:
+                        remaining.append(entry)
+            queue = remaining
+
+        return allocations
+
+
     def allocate_related_doables(self, user_id: str, case_id: str) -> List[Allocation]:
         """
         Allocate all doables in a case to a user.
         """
-        case_doables = self.doable_manager.get_doables_by_case(case_id)
-        
-        new_allocations = []
-        for doable in case_doables:
-            if doable.status == "pending":
-                allocation = Allocation(   # is_case_allocation=False because full case might not be allocated
-                    doable_id=doable.id,   # if some doables are already allocated
-                    user_id=user_id
-                )  
-                self.allocations[allocation.doable_id] = allocation 
-                new_allocations.append(allocation)
-                self.doable_manager.update_doable(doable.id, status="allocated")
+        with self._case_locks(case_id):
+            case_doables = self.doable_manager.get_doables_by_case(case_id)
+
+            new_allocations = []
+            for doable in case_doables:
+                if doable.status == "pending" and self._claim_doable(doable.id):
+                    # is_case_allocation=False because full case might not be allocated
+                    # if some doables are already allocated
+                    new_allocations.append(self._create_allocation(doable, user_id))
 
         return new_allocations
     
 
     def delete_allocation(self, doable_id: str):
         """
-        Delete an allocation by its doable_id.
+        Delete an allocation by its doable_id, releasing the doable back to pending. Raises a ValueError,
+        changing nothing, if there is no allocation or the doable is no longer allocated.
         """
-        allocation = self.allocations.get(doable_id)
-        if allocation:
-            del self.allocations[doable_id]
-            self.doable_manager.update_doable(doable_id, status="pending")
-        else:
-            raise ValueError(f"No allocation found for doable with ID {doable_id}.")
+        with self._lock:
+            allocation = self.get_allocation(doable_id)
+            if not allocation:
+                raise ValueError(f"No allocation found for doable with ID {doable_id}.")
+            # The doable is released first, so nothing changes if it can no longer be, e.g. once completed
+            if not self.doable_manager.compare_and_set_status(doable_id, "allocated", "pending"):
+                raise ValueError(f"Cannot delete the allocation of doable {doable_id}, which is no longer allocated.")
+            self._remove_allocation(doable_id)
+            self._log_change("delete", allocation)
+
+
+    def remove_allocations(self, doable_ids: Iterable[str]) -> List[Allocation]:
+        """
+        Remove the allocations of doables, e.g. once they have been archived, skipping doables without one.
+        Returns the removed allocations.
+        """
+        removed = []
+        with self._lock:
+            for doable_id in doable_ids:
+                if doable_id in self.allocations:
+                    allocation = self._remove_allocation(doable_id)
+                else:
+                    allocation = self._get_cold_allocation(doable_id)
+                    if allocation is None:
+                        continue
+                self._log_change("delete", allocation)
+                removed.append(allocation)
+        return removed
+
+
+    def restore_allocations(self, allocations: Iterable[Allocation]) -> int:
+        """
+        Add previously removed allocations back, skipping doables that already have an allocation.
+        Returns the number restored.
+        """
+        restored = 0
+        with self._lock:
+            for allocation in allocations:
+                if self.get_allocation(allocation.doable_id) is None:
+                    self._add_allocation(allocation)
+                    self._log_change("put", allocation)
+                    restored += 1
+        return restored
 
 
     def delete_case_allocations(self, case_id: str):
         """
         Delete all allocations for a case.
         """
-        doables_to_delete = self.doable_manager.get_doables_by_case(case_id)
-        deleted_count = 0
-        for doable in doables_to_delete:
-            if doable.id in self.allocations and doable.status == "allocated":
-                del self.allocations[doable.id]
-                self.doable_manager.update_doable(doable.id, status="pending")
-                deleted_count += 1
-            else:
-                raise ValueError(f"No allocation found for doable with ID {doable.id}.")
-        
-        return deleted_count
+        with self._case_locks(case_id), self._lock:
+            doables_to_delete = self.doable_manager.get_doables_by_case(case_id)
+            for doable in doables_to_delete:
+                if doable.id not in self.allocations or doable.status != "allocated":
+                    raise ValueError(f"No allocation found for doable with ID {doable.id}.")
+            # All of the doables are released, or none if any has changed since, before any allocation is removed
+            doable_ids = [doable.id for doable in doables_to_delete]
+            if not self.doable_manager.compare_and_set_statuses(doable_ids, "allocated", "pending"):
+                raise ValueError(f"Cannot delete the allocations of case {case_id}, which are no longer all allocated.")
+            for doable_id in doable_ids:
+                self._log_change("delete", self._remove_allocation(doable_id))
+
+        return len(doable_ids)
     
     
+    @timed("AllocationManager.save_allocations")
     def save_allocations(self):
         """
-        Save all allocations to the JSON file.
+        Save all allocations to the JSON file, or the binary snapshot if one is configured.
+        With a write-ahead log, only the changes since the last save are appended to the log,
+        and the file is rewritten in the background once a checkpoint is due.
+        """
+        with self._save_lock:
+            self.dirty = False
+            if self.wal:
+                self.wal.flush()
+                if self.wal.checkpoint_due():
+                    self.checkpoint()
+                return
+
+            if self.storage:
+                with self._lock:
+                    self.storage.commit()
+                    self._removed.clear()
+                    self._evict_completed()
+                return
+
+            self._snapshot_writer()()
+
+
+    @timed("AllocationManager.checkpoint")
+    def checkpoint(self, background: bool = True):
+        """
+        Write a snapshot of all allocations to the JSON file or binary snapshot and truncate the write-ahead log.
+        """
+        self.wal.checkpoint(self._snapshot_writer(), background=background)
+
+
+    def _evict_completed(self):
+        """
+        Drop the allocations of completed doables from memory once they have been committed to storage.
+        Must be called with _lock held.
+        """
+        evicted = 0
+        for doable_id in self._view.doable_ids_with_status("completed"):
+            if doable_id in self.allocations:
+                self._remove_allocation(doable_id)
+                evicted += 1
+        if evicted:
+            self._compact()
+
+
+    def _switch_snapshot(self, snapshot: AllocationSnapshot, written: Dict[str, Allocation], removed: Set[str]):
+        """
+        Switch to the snapshot that was just written, which no longer holds the given deleted allocations.
+        In tiered mode, also drop the allocations of completed doables written to it from memory, unless
+        they have been replaced or deleted since. Must be called with _lock held.
+        """
+        if self._cold_source is not None:
+            self._cold_source.close()  # read with _lock held, apart from by the writer that is done with it
+        self._cold_source = snapshot
+        self._removed -= removed
+        evicted = 0
+        for doable_id, allocation in written.items():
+            if self.allocations.get(doable_id) is allocation:
+                self._remove_allocation(doable_id)
+                evicted += 1
+        if evicted:
+            self._compact()
+
+
+    def _compact(self):
+        """
+        Rebuild the dicts that keep their size as allocations are removed, so that memory is released
+        once allocations are dropped. Must be called with _lock held.
+        """
+        self.allocations = dict(self.allocations)
+        self._allocations_by_user = {
+            user_id: dict(allocations) for user_id, allocations in self._allocations_by_user.items()
+        }
+        self._view.compact()
+
+
+    def _snapshot_writer(self) -> Callable[[], None]:
+        """
+        Capture the allocations held in memory and return a function that writes them, with any allocations
+        only held in the snapshot, to the binary snapshot if one is configured and the JSON file otherwise.
+        In tiered mode, the allocations of completed doables written are then dropped from memory.
+        """
+        with self._lock:
+            allocations = list(self.allocations.values())
+            if not self.snapshot_path:
+                return lambda: write_json_atomic(self.file_path, [allocation.to_dict() for allocation in allocations])
+            completed = set(self._view.doable_ids_with_status("completed"))
+            written = {
+                allocation.doable_id: allocation for allocation in allocations
+                if self.tiered and allocation.doable_id in completed
+            }
+            removed = set(self._removed)
+
+        def write():
+            cold_allocations = self._cold_allocations({allocation.doable_id for allocation in allocations} | removed)
+            write_allocation_snapshot(
+                self.snapshot_path,
+                allocations + cold_allocations,
+                completed | {allocation.doable_id for allocation in cold_allocations},
+            )
+            snapshot = AllocationSnapshot(self.snapshot_path)
+            with self._lock:
+                self._switch_snapshot(snapshot, written, removed)
+        return write
+
+
+    def export_json(self, file_path: str):
+        """
+        Write all allocations, including those only held in storage or the snapshot, to a JSON file.
         """
-        with open(self.file_path, "w") as file:
-            json.dump([allocation.to_dict() for allocation in self.allocations.values()], file, indent=4)
\ No newline at end of file
+        with self._lock:
+            allocations = list(self.allocations.values()) + self._cold_allocations(set(self.allocations))
+        write_json_atomic(file_path, [allocation.to_dict() for allocation in allocations])
\ No newline at end of file
@@ -0,0 +1,282 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import threading
+from models.allocation import Allocation
+from models.doable import Doable, PRIORITY_ORDER
+from models.user import User
+
+class AllocationView:
+    def __init__(self):
+        """
+        Materialized view of the allocations joined to their doables and users.
+
+        Rows are kept sorted by (priority rank, created_at, doable ID) overall and per user,
+        case and status, and are patched as allocations and doables change instead of being
+        rebuilt on every read. _lock is only held while the view itself is read or patched,
+        so it may be taken while holding the manager locks.
+        """
+        self._rows: Dict[str, dict] = {}
+        self._keys: Dict[str, tuple] = {}
+        self._user_ids: Dict[str, str] = {}
+        self._sorted: List[tuple] = []
+        self._sorted_by_user: Dict[str, List[tuple]] = {}
+        self._sorted_by_case: Dict[Optional[str], List[tuple]] = {}
+        self._sorted_by_status: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def sort_key(doable: Doable) -> tuple:
+        """
+        Sort key of a doable's row: priority, then age, then doable ID.
+        """
+        return (PRIORITY_ORDER.get(doable.priority, len(PRIORITY_ORDER)), doable.created_at, doable.id)
+
+
+    @staticmethod
+    def row_key(row: dict) -> tuple:
+        """
+        Sort key of a row, as sort_key of its doable.
+        """
+        return (PRIORITY_ORDER.get(row["priority"], len(PRIORITY_ORDER)), row["created_at"], row["doable_id"])
+
+
+    @staticmethod
+    def make_row(allocation: Allocation, doable: Doable, user: User) -> dict:
+        """
+        Build the row of an allocation joined to its doable and user.
+        """
+        return {
+            "doable_id": doable.id,
+            "doable_title": doable.title,
+            "doable_type": doable.type,
+            "case_id": doable.case_id,
+            "created_at": doable.created_at,
+            "user_name": user.user_name,
+            "user_first_name": user.first_name,
+            "user_last_name": user.last_name,
+            "user_preferred_type": user.preferred_doable_type,
+            "allocated_at": allocation.allocated_at,
+            "is_case_allocation": allocation.is_case_allocation,
+            "priority": doable.priority,
+            "status": doable.status
+        }
+
+
+    def _insert(self, doable_id: str):
+        """
+        Add a row's key to the sorted indexes.
+        """
+        key, row = self._keys[doable_id], self._rows[doable_id]
+        insort(self._sorted, key)
+        insort(self._sorted_by_user.setdefault(self._user_ids[doable_id], []), key)
+        insort(self._sorted_by_case.setdefault(row["case_id"], []), key)
+        insort(self._sorted_by_status.setdefault(row["status"], []), key)
+
+
+    def _discard(self, doable_id: str):
+        """
+        Remove a row's key from the sorted indexes.
+        """
+        key, row = self._keys[doable_id], self._rows[doable_id]
+        self._discard_key(self._sorted, key)
+        for index, value in (
+            (self._sorted_by_user, self._user_ids[doable_id]),
+            (self._sorted_by_case, row["case_id"]),
+            (self._sorted_by_status, row["status"]),
+        ):
+            self._discard_key(index[value], key)
+            if not index[value]:
+                del index[value]
+
+
+    @staticmethod
+    def _discard_key(keys: List[tuple], key: tuple):
+        del keys[bisect_left(keys, key)]
+
+
+    def put(self, allocation: Allocation, doable: Doable, user: User):
+        """
+        Add or replace the row of an allocation.
+        """
+        with self._lock:
+            if allocation.doable_id in self._rows:
+                self._remove(allocation.doable_id)
+            self._rows[doable.id] = self.make_row(allocation, doable, user)
+            self._keys[doable.id] = self.sort_key(doable)
+            self._user_ids[doable.id] = user.id
+            self._insert(doable.id)
+
+
+    def remove(self, doable_id: str):
+        """
+        Remove the row of an allocation, if it is in the view.
+        """
+        with self._lock:
+            if doable_id in self._rows:
+                self._remove(doable_id)
+
+
+    def _remove(self, doable_id: str):
+        self._discard(doable_id)
+        del self._rows[doable_id]
+        del self._keys[doable_id]
+        del self._user_ids[doable_id]
+
+
+    def update_doable(self, doable: Doable):
+        """
+        Patch the row of a changed doable, moving it if its position changed. Doables without an allocation are ignored.
+        """
+        with self._lock:
+            row = self._rows.get(doable.id)
+            if row is None:
+                return
+
+            key = self.sort_key(doable)
+            moved = key != self._keys[doable.id] or doable.case_id != row["case_id"] or doable.status != row["status"]
+            if moved:
+                self._discard(doable.id)
+            row.update({
+                "doable_title": doable.title,
+                "doable_type": doable.type,
+                "case_id": doable.case_id,
+                "created_at": doable.created_at,
+                "priority": doable.priority,
+                "status": doable.status,
+            })
+            if moved:
+                self._keys[doable.id] = key
+                self._insert(doable.id)
+
+
+    def compact(self):
+        """
+        Rebuild the dicts that keep their size as rows are removed, so that memory is released once
+        many rows are dropped.
+        """
+        with self._lock:
+            self._rows = dict(self._rows)
+            self._keys = dict(self._keys)
+            self._user_ids = dict(self._user_ids)
+
+
+    def doable_ids_with_status(self, status: str) -> List[str]:
+        """
+        Get the doable IDs of the rows whose doables have a status.
+        """
+        with self._lock:
+            return [key[2] for key in self._sorted_by_status.get(status, ())]
+
+
+    def get_rows(self, doable_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Get copies of the rows of those of the doables that are in the view, by doable ID.
+        """
+        with self._lock:
+            return {doable_id: dict(self._rows[doable_id]) for doable_id in doable_ids if doable_id in self._rows}
+
+
+    def _candidate_keys(
+        self, statuses: Optional[set], user_id: Optional[str], case_id: Optional[str], after: Optional[tuple]
+    ) -> Iterator[tuple]:
+        """
+        Iterate in order over the keys of the narrowest sorted index matching the filters, starting after a key.
+        """
+        if user_id is not None:
+            sources = [self._sorted_by_user.get(user_id, [])]
+        elif case_id is not None:
+            sources = [self._sorted_by_case.get(case_id, [])]
+        elif statuses is not None:
+            sources = [self._sorted_by_status.get(status, []) for status in statuses]
+        else:
+            sources = [self._sorted]
+
+        def iterate(keys):
+            for index in range(bisect_right(keys, after) if after else 0, len(keys)):
+                yield keys[index]
+
+        return heapq.merge(*(iterate(keys) for keys in sources)) if len(sources) > 1 else iterate(sources[0])
+
+
+    def _matching_rows(
+        self,
+        statuses: Optional[Iterable[str]],
+        doable_type: Optional[str],
+        user_id: Optional[str],
+        case_id: Optional[str],
+        title: Optional[str],
+        after: Optional[tuple] = None,
+    ) -> Iterator[Tuple[tuple, dict]]:
+        """
+        Iterate in order over the keys and rows matching the filters. Must be called with _lock held.
+        """
+        statuses = set(statuses) if statuses else None
+        title = title.lower() if title else None
+        for key in self._candidate_keys(statuses, user_id, case_id, after):
+            doable_id = key[2]
+            row = self._rows[doable_id]
+            if (
+                (statuses is None or row["status"] in statuses)
+                and (doable_type is None or row["doable_type"] == doable_type)
+                and (user_id is None or self._user_ids[doable_id] == user_id)
+                and (case_id is None or row["case_id"] == case_id)
+                and (title is None or title in row["doable_title"].lower())
+            ):
+                yield key, row
+
+
+    def page(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        doable_type: Optional[str] = None,
+        user_id: Optional[str] = None,
+        case_id: Optional[str] = None,
+        title: Optional[str] = None,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[dict], Optional[tuple]]:
+        """
+        Get copies of the rows matching the filters in order, starting after a key.
+        Returns at most limit rows, and the key of the last row if more rows match.
+        """
+        rows = []
+        with self._lock:
+            for key, row in self._matching_rows(statuses, doable_type, user_id, case_id, title, after):
+                if limit is not None and len(rows) == limit:
+                    return rows, self._keys[rows[-1]["doable_id"]]
+                rows.append(dict(row))
+        return rows, None
+
+
+    def grouped_by_case(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        doable_type: Optional[str] = None,
+        user_id: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> List[Tuple[Optional[str], List[dict]]]:
+        """
+        Get copies of the rows matching the filters grouped by case, as (case ID, rows) pairs.
+        Rows are in order within each case, and cases are ordered by their first row.
+        """
+        groups: Dict[Optional[str], List[dict]] = {}
+        with self._lock:
+            if user_id is None and statuses is None:
+                # The per-case indexes are already grouped and sorted. They are read directly, as
+                # _matching_rows takes a case ID of None to mean any case rather than no case.
+                title = title.lower() if title else None
+                for case_id, keys in self._sorted_by_case.items():
+                    rows = [
+                        dict(row) for row in (self._rows[key[2]] for key in keys)
+                        if (doable_type is None or row["doable_type"] == doable_type)
+                        and (title is None or title in row["doable_title"].lower())
+                    ]
+                    if rows:
+                        groups[case_id] = rows
+                return sorted(groups.items(), key=lambda group: self._keys[group[1][0]["doable_id"]])
+
+            for _, row in self._matching_rows(statuses, doable_type, user_id, None, title):
+                groups.setdefault(row["case_id"], []).append(dict(row))
+        return list(groups.items())
@@ -0,0 +1,221 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import gzip
+import json
+import os
+import re
+import threading
+from models.allocation import Allocation
+from models.doable import Doable
+from utils import write_bytes_atomic, write_json_atomic
+
+PARTITION_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+class ArchiveManager:
+    def __init__(self, directory: str, doable_manager, allocation_manager, data_manager=None):
+        """
+        Moves completed Doables and their allocations out of the managers into compressed archive
+        files, and back again.
+
+        Archives are partitioned by the month the Doables were created in, one gzip-compressed
+        JSON file per month (<YYYY-MM>.json.gz) holding {"doables": [...], "allocations": [...]}
+        in the format of the data files. Only cases whose Doables are all completed and old
+        enough are archived, so archiving never changes which cases can be allocated.
+
+        :param data_manager: DataManager to flush after Doables are moved, so that the data files
+                             never miss Doables that are not yet in an archive file.
+        """
+        self.directory = directory
+        self.doable_manager = doable_manager
+        self.allocation_manager = allocation_manager
+        self.data_manager = data_manager
+        self._summaries: Dict[str, tuple] = {}  # partition -> (modification time, summary)
+        self._lock = threading.Lock()  # serialises archiving and restoring
+        self._timer = None
+        os.makedirs(directory, exist_ok=True)
+
+        # The JSON data files only imply the message counter through the IDs they hold, so the
+        # counter is recorded when messages are archived, to keep their IDs from being reused
+        self._manifest_path = os.path.join(directory, "manifest.json")
+        try:
+            with open(self._manifest_path, "r") as f:
+                message_counter = json.load(f)["message_counter"]
+            doable_manager.message_counter = max(doable_manager.message_counter, message_counter)
+        except FileNotFoundError:
+            pass
+
+
+    def _path(self, partition: str) -> str:
+        if not PARTITION_PATTERN.match(partition):
+            raise ValueError(f"Invalid archive partition '{partition}'. Must be a month as YYYY-MM.")
+        return os.path.join(self.directory, f"{partition}.json.gz")
+
+
+    @staticmethod
+    def partition_of(doable: Doable) -> str:
+        """
+        Archive partition of a Doable: the month it was created in.
+        """
+        return doable.created_at.strftime("%Y-%m")
+
+
+    def read_partition(self, partition: str) -> Optional[dict]:
+        """
+        Read the Doable and allocation records of an archive partition, or None if there is none.
+        """
+        try:
+            with gzip.open(self._path(partition), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+    def _write_partition(self, partition: str, doables: List[Doable], allocations: List[Allocation]):
+        """
+        Add Doables and allocations to an archive partition, replacing any records with the same IDs.
+        """
+        data = self.read_partition(partition) or {"doables": [], "allocations": []}
+        doables_data = {doable_data["id"]: doable_data for doable_data in data["doables"]}
+        doables_data.update((doable.id, doable.to_dict()) for doable in doables)
+        allocations_data = {allocation_data["doable_id"]: allocation_data for allocation_data in data["allocations"]}
+        allocations_data.update((allocation.doable_id, allocation.to_dict()) for allocation in allocations)
+
+        data = {"doables": list(doables_data.values()), "allocations": list(allocations_data.values())}
+        write_bytes_atomic(self._path(partition), gzip.compress(json.dumps(data).encode("utf-8")))
+
+
+    def partitions(self) -> List[dict]:
+        """
+        Summarise the archive partitions, oldest first, with the number of Doables and allocations in each.
+        """
+        summaries = []
+        for name in sorted(os.listdir(self.directory)):
+            partition = name[:-len(".json.gz")]
+            if not name.endswith(".json.gz") or not PARTITION_PATTERN.match(partition):
+                continue
+            modified = os.path.getmtime(os.path.join(self.directory, name))
+            cached = self._summaries.get(partition)
+            if cached is None or cached[0] != modified:
+                data = self.read_partition(partition)
+                cached = self._summaries[partition] = (modified, {
+                    "partition": partition,
+                    "doables": len(data["doables"]),
+                    "allocations": len(data["allocations"]),
+                })
+            summaries.append(cached[1])
+        return summaries
+
+
+    def _archivable(self, before: datetime) -> List[str]:
+        """
+        Get the IDs of the completed Doables created before a time whose cases have no other Doables.
+        """
+        candidates = {
+            doable.id: doable
+            for doable in self.doable_manager.get_doables_by_status("completed")
+            if doable.created_at < before
+        }
+        case_ids = {doable.case_id for doable in candidates.values() if doable.case_id is not None}
+        held_back = set()
+        for case_id in case_ids:
+            case_doable_ids = [doable.id for doable in self.doable_manager.get_doables_by_case(case_id)]
+            if any(doable_id not in candidates for doable_id in case_doable_ids):
+                held_back.update(case_doable_ids)
+        return [doable_id for doable_id in candidates if doable_id not in held_back]
+
+
+    def archive_completed(self, before: datetime) -> Dict[str, int]:
+        """
+        Move the completed Doables created before a time, and their allocations, into the archive.
+        Returns the number of Doables archived per partition.
+        """
+        with self._lock:
+            doable_ids = self._archivable(before)
+            if not doable_ids:
+                return {}
+            doables = [doable for doable in map(self.doable_manager.get_doable, doable_ids) if doable is not None]
+            allocations = [
+                allocation for allocation in map(self.allocation_manager.get_allocation, doable_ids) if allocation is not None
+            ]
+
+            by_partition: Dict[str, tuple] = {}
+            for doable in doables:
+                by_partition.setdefault(self.partition_of(doable), ([], []))[0].append(doable)
+            partitions = {doable.id: self.partition_of(doable) for doable in doables}
+            for allocation in allocations:
+                by_partition[partitions[allocation.doable_id]][1].append(allocation)
+
+            # The archive files are written before anything is removed, so a failed write loses nothing,
+            # and a crash before the removals are saved leaves the Doables in both places
+            for partition, (partition_doables, partition_allocations) in by_partition.items():
+                self._write_partition(partition, partition_doables, partition_allocations)
+            write_json_atomic(self._manifest_path, {"message_counter": self.doable_manager.message_counter})
+
+            archived_ids = list(partitions)
+            self.allocation_manager.remove_allocations(archived_ids)
+            self.doable_manager.remove_doables(archived_ids)
+            if self.data_manager:
+                self.data_manager.flush()
+            return {partition: len(partition_doables) for partition, (partition_doables, _) in by_partition.items()}
+
+
+    def restore(self, partition: str) -> Optional[dict]:
+        """
+        Move the Doables and allocations of an archive partition back into the managers, skipping
+        Doables that already exist. Returns the numbers restored, or None if there is no such partition.
+        """
+        with self._lock:
+            data = self.read_partition(partition)
+            if data is None:
+                return None
+
+            restored = 0
+            for doable_data in data["doables"]:
+                try:
+                    self.doable_manager.add_doable_instance(Doable.from_dict(doable_data))
+                    restored += 1
+                except ValueError:
+                    pass  # already restored or re-created
+            allocations_restored = self.allocation_manager.restore_allocations(
+                Allocation.from_dict(allocation_data) for allocation_data in data["allocations"]
+            )
+
+            # Removed only once the restored Doables are saved
+            if self.data_manager:
+                self.data_manager.flush()
+            os.remove(self._path(partition))
+            self._summaries.pop(partition, None)
+            return {"doables": restored, "allocations": allocations_restored}
+
+
+    def schedule(self, retention: timedelta, interval: float):
+        """
+        Archive the completed Doables older than the retention period in the background, now and then
+        every interval seconds.
+        """
+        def run():
+            try:
+                archived = self.archive_completed(datetime.now() - retention)
+                if archived:
+                    print(f"Archived {sum(archived.values())} doables.")
+            except Exception as e:
+                print(f"Archiving failed: {e}")
+            if self._timer is not None:  # not stopped in the meantime
+                self._start_timer(interval, run)
+
+        self._start_timer(0, run)
+
+
+    def _start_timer(self, delay: float, run):
+        self._timer = threading.Timer(delay, run)
+        self._timer.daemon = True
+        self._timer.start()
+
+
+    def stop(self):
+        """
+        Stop scheduled archiving.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,142 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import threading
+from models.doable import Doable, PRIORITY_ORDER
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it the columns are scanned in Python
+    np = None
+
+TYPES = ["task", "email"]
+STATUSES = ["pending", "allocated", "completed"]
+PRIORITIES = sorted(PRIORITY_ORDER, key=PRIORITY_ORDER.get)
+
+# Timestamps are stored as microseconds since this (naive) epoch, which round-trips exactly
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+class ColumnarDoableStore:
+    def __init__(self):
+        """
+        Doables kept as parallel columns, one row per Doable, for scans over many Doables.
+
+        Type, priority and status are stored as small integer codes, created_at as microseconds
+        since the epoch and the case as an index into the list of case IDs seen. Counts run over
+        the columns, vectorized with numpy when it is installed.
+        """
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.case_ids: List[Optional[str]] = [None]  # case number -> case ID, 0 for no case
+        self._case_numbers: Dict[Optional[str], int] = {None: 0}
+        self._rows: Dict[str, int] = {}
+
+        self.type_codes = array("b")
+        self.priority_ranks = array("b")
+        self.status_codes = array("b")
+        self.created_at = array("q")
+        self.case_numbers = array("l")
+
+        self._type_codes = {type: code for code, type in enumerate(TYPES)}
+        self._status_codes = {status: code for code, status in enumerate(STATUSES)}
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+    def _case_number(self, case_id: Optional[str]) -> int:
+        number = self._case_numbers.get(case_id)
+        if number is None:
+            number = self._case_numbers[case_id] = len(self.case_ids)
+            self.case_ids.append(case_id)
+        return number
+
+
+    def put(self, doable: Doable):
+        """
+        Add a Doable, or update its row if it is already stored.
+        """
+        with self._lock:
+            values = (
+                self._type_codes[doable.type],
+                PRIORITY_ORDER[doable.priority],
+                self._status_codes[doable.status],
+                (doable.created_at - EPOCH) // MICROSECOND,
+                self._case_number(doable.case_id),
+            )
+            columns = (self.type_codes, self.priority_ranks, self.status_codes, self.created_at, self.case_numbers)
+            row = self._rows.get(doable.id)
+            if row is None:
+                self._rows[doable.id] = len(self.ids)
+                self.ids.append(doable.id)
+                self.titles.append(doable.title)
+                for column, value in zip(columns, values):
+                    column.append(value)
+            else:
+                self.titles[row] = doable.title
+                for column, value in zip(columns, values):
+                    column[row] = value
+
+
+    def remove(self, doable_id: str):
+        """
+        Remove a Doable's row, if it is stored, by moving the last row into its place.
+        """
+        with self._lock:
+            row = self._rows.pop(doable_id, None)
+            if row is None:
+                return
+            last = len(self.ids) - 1
+            for column in (self.ids, self.titles, self.type_codes, self.priority_ranks,
+                           self.status_codes, self.created_at, self.case_numbers):
+                column[row] = column[last]
+                column.pop()
+            if row != last:
+                self._rows[self.ids[row]] = row
+
+
+    def extend(self, doables: Iterable[Doable]):
+        """
+        Add or update many Doables.
+        """
+        for doable in doables:
+            self.put(doable)
+
+
+    def get_doable(self, row: int) -> Doable:
+        """
+        Build the Doable stored in a row.
+        """
+        return Doable(
+            id=self.ids[row],
+            title=self.titles[row],
+            case_id=self.case_ids[self.case_numbers[row]],
+            type=TYPES[self.type_codes[row]],
+            priority=PRIORITIES[self.priority_ranks[row]],
+            status=STATUSES[self.status_codes[row]],
+            created_at=EPOCH + self.created_at[row] * MICROSECOND,
+        )
+
+
+    def counts_by_status_and_type(self) -> Dict[str, Dict[str, int]]:
+        """
+        Count the Doables of each status and type.
+        """
+        with self._lock:
+            if np is not None:
+                combined = (
+                    np.frombuffer(self.status_codes, dtype=np.int8).astype(np.intp) * len(TYPES)
+                    + np.frombuffer(self.type_codes, dtype=np.int8)
+                )
+                flat = np.bincount(combined, minlength=len(STATUSES) * len(TYPES)).tolist()
+            else:
+                flat = [0] * (len(STATUSES) * len(TYPES))
+                for status, type in zip(self.status_codes, self.type_codes):
+                    flat[status * len(TYPES) + type] += 1
+        return {
+            status: {type: flat[status_code * len(TYPES) + type_code] for type_code, type in enumerate(TYPES)}
+            for status_code, status in enumerate(STATUSES)
+        }
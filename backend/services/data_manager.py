@@ -1,8 +1,102 @@
+import threading
+from services.metrics import timed
+
+class _SaveBatch:
+    def __init__(self):
+        """
+        Saves requested within one commit window, done once the flush that writes them has finished.
+        """
+        self.done = threading.Event()
+        self.error = None
+
+
 class DataManager:
-    def __init__(self, doable_manager, allocation_manager):
+    def __init__(self, doable_manager, allocation_manager, commit_window: float = 0.0):
+        """
+        Coordinates saving the Doable and Allocation managers.
+
+        :param commit_window: Seconds to hold a requested save so that saves requested in the
+                              meantime are written together. Each caller still waits until its
+                              changes are written, so only the writes are shared, not the durability.
+                              With 0, saves are written immediately.
+
+        The managers are saved one after the other, each atomically, but not together: a crash
+        between the two writes can leave one manager's file newer than the other's.
+        """
         self.doable_manager = doable_manager
         self.allocation_manager = allocation_manager
+        self.commit_window = commit_window
+        self._lock = threading.Lock()  # guards the open batch and its timer
+        self._write_lock = threading.Lock()  # keeps flushes in order
+        self._batch = None
+        self._timer = None
+
+    def version(self) -> tuple:
+        """
+        Version of the managed data, which changes whenever any of it changes.
+        """
+        return (self.doable_manager.version, self.allocation_manager.version)
 
+    @timed("DataManager.save_all")
     def save_all(self):
-        self.doable_manager.save_doables()
-        self.allocation_manager.save_allocations()
\ No newline at end of file
+        """
+        Save every manager with unsaved changes, returning once the changes made before the call are written.
+        With a commit window, the save joins the batch of saves being held, written together when the window ends.
+        """
+        if self.commit_window <= 0:
+            self.flush()
+            return
+
+        with self._lock:
+            batch = self._batch
+            if batch is None:
+                batch = self._batch = _SaveBatch()
+                self._timer = threading.Timer(self.commit_window, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            pass  # reported to the callers waiting on the batch
+
+    @timed("DataManager.flush")
+    def flush(self):
+        """
+        Save every manager with unsaved changes now, e.g. on shutdown, releasing the saves being held.
+        """
+        with self._lock:
+            batch, self._batch = self._batch, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        try:
+            with self._write_lock:
+                if self.doable_manager.dirty:
+                    self.doable_manager.save_doables()
+                if self.allocation_manager.dirty:
+                    self.allocation_manager.save_allocations()
+        except Exception as e:
+            if batch is not None:
+                batch.error = e
+            raise
+        finally:
+            if batch is not None:
+                batch.done.set()
+
+    def close(self):
+        """
+        Flush unsaved changes and checkpoint any write-ahead logs on shutdown, so the next
+        start loads the data files or snapshots without replaying a log.
+        """
+        self.flush()
+        for manager in (self.doable_manager, self.allocation_manager):
+            if manager.wal:
+                # A background checkpoint still running would race this one for the files
+                manager.wal.wait()
+                manager.checkpoint(background=False)
@@ -1,15 +1,123 @@
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+import heapq
 import json
-from models.doable import Doable
+import os
+import sys
+import threading
+from models.doable import Doable, PRIORITY_ORDER, STATUS_TRANSITIONS
+from services.columnar_store import ColumnarDoableStore, STATUSES, TYPES
+from services.event_bus import EventBus
+from services.metrics import timed
+from services.snapshot import DoableSnapshot, write_doable_snapshot
+from services.sqlite_storage import SqliteStorage
+from services.write_ahead_log import WriteAheadLog
+from utils import write_json_atomic
 
 class DoableManager:
-    def __init__(self, file_path: str):
+    def __init__(
+        self,
+        file_path: str,
+        wal: Optional[WriteAheadLog] = None,
+        storage: Optional[SqliteStorage] = None,
+        columns: Optional[ColumnarDoableStore] = None,
+        snapshot_path: Optional[str] = None,
+        tiered: bool = False,
+        cold_cache_size: int = 0,
+        events: Optional[EventBus] = None,
+    ):
+        """
+        Manages Doables and the indexes used to allocate them.
+
+        :param file_path: Path to the JSON file containing Doable data.
+        :param wal: Write-ahead log to append changes to instead of rewriting the JSON file.
+        :param storage: SQLite storage to use instead of the JSON file. Completed Doables are then
+                        only kept in memory until the next save and are read back from storage on demand.
+        :param columns: Columnar store to keep a copy of every Doable in, including completed Doables
+                        in storage, for counts and scans over all Doables.
+        :param snapshot_path: Path of a binary snapshot to save Doables to instead of the JSON file,
+                              which is then only read if there is no snapshot yet. Completed Doables
+                              are read from the snapshot on demand rather than loaded at startup.
+                              Requires a write-ahead log, as the snapshot is only written when the
+                              log is checkpointed.
+        :param tiered: Whether to also drop Doables completed since startup from memory once they
+                       are written to the snapshot, so that only active Doables stay in memory.
+                       Requires a snapshot path.
+        :param cold_cache_size: Number of recently read Doables from storage or the snapshot to keep
+                                in memory for get_doable (0 disables the cache).
+        :param events: Event bus to publish new, updated and removed Doables and status changes to.
+        """
+        if tiered and not snapshot_path:
+            raise ValueError("Tiered mode requires a snapshot path.")
+        if snapshot_path and not wal:
+            raise ValueError("Binary snapshots require a write-ahead log.")
         self.file_path = file_path
+        self.wal = wal
+        self.storage = storage
+        self.columns = columns
+        self.snapshot_path = snapshot_path
+        self.snapshot: Optional[DoableSnapshot] = None
+        self.tiered = tiered
+        self.cold_cache_size = cold_cache_size
+        self.events = events
         self.doables: Dict[str, Doable] = {}
         self.message_counter = 0
-        self._load_from_file()
+        self.dirty = False  # whether there are changes since the last save
+        self.version = 0  # incremented on every change
+
+        # _lock guards the Doables and their indexes. _save_lock keeps saves in order.
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+
+        # Pending doables are kept in one heap per type plus one for any type (key None),
+        # ordered by (priority rank, created_at). Entries are removed lazily: a heap entry
+        # is only live while it matches the key recorded for its doable in _pending_keys.
+        self._pending_heaps: Dict[Optional[str], list] = {None: []}
+        self._pending_keys: Dict[str, tuple] = {}
+
+        # Secondary indexes: case_id -> {doable_id: Doable} (in insertion order) and
+        # status -> set of doable IDs. The grouped-by-case view is cached until case
+        # membership changes.
+        self._case_index: Dict[str, Dict[str, Doable]] = {}
+        self._status_index: Dict[str, Set[str]] = {}
+        self._grouped_cache: Optional[Dict[str, List[Doable]]] = None
+
+        # Cases whose doables are all pending are kept in heaps ordered by their oldest
+        # doable, one per doable type the case contains plus one for any type. As with
+        # the pending heaps, entries are live only while they match _case_keys.
+        self._case_pending_counts: Dict[str, int] = {}
+        self._case_heaps: Dict[Optional[str], list] = {None: []}
+        self._case_keys: Dict[str, tuple] = {}
+
+        # Number of completed Doables per case that are not held in memory, but in the storage
+        # or snapshot that _cold_source reads them from
+        self._cold_case_counts: Dict[str, int] = {}
+        self._cold_source = storage
+        self._cold_cache: "OrderedDict[str, Doable]" = OrderedDict()  # LRU of Doables read from _cold_source
+        # IDs of removed Doables that storage or the snapshot still holds until it is next written
+        self._removed: Set[str] = set()
+
+        # While loading, heap pushes and case indexing are deferred and done once at the end
+        self._bulk_loading = False
+
+        # Callbacks for new and updated Doables, e.g. to keep views of them up to date
+        self._listeners: List[Callable[[Doable], None]] = []
+
+        if self.storage:
+            self._load_from_storage()
+        elif self.snapshot_path and os.path.exists(self.snapshot_path):
+            self._load_from_snapshot()
+        else:
+            self._load_from_file()
+
+        if self.columns is not None:
+            self.columns.extend(self._cold_doables(set(self.doables)))
+            self.columns.extend(self.doables.values())
+            self.subscribe(self.columns.put)
 
 
+    @timed("DoableManager._load_from_file")
     def _load_from_file(self):
         """
         Load Doables from JSON file and populate the manager.
@@ -17,18 +125,380 @@ class DoableManager:
         try:
             with open(self.file_path, "r") as f:
                 doables_data = json.load(f)
-                for doable_data in doables_data:
-                    doable = Doable.from_dict(doable_data)
-                    self.doables[doable.id] = doable
-                    
-                    # Update counter based on existing IDs
-                    if doable.id.startswith("message_"):
-                        number = int(doable.id.split("_")[1])
-                        self.message_counter = max(self.message_counter, number)
+                self._load_doables(doables_data)
 
         except FileNotFoundError:
             print("File not found. Starting with an empty doables list.")  
 
+        self._replay_wal()
+
+
+    @timed("DoableManager._load_from_snapshot")
+    def _load_from_snapshot(self):
+        """
+        Load the Doables that are not completed from the binary snapshot and populate the manager.
+        Completed Doables are left in the snapshot until they are needed.
+        """
+        self.snapshot = self._cold_source = DoableSnapshot(self.snapshot_path)
+        self._cold_case_counts = self.snapshot.count_doables_by_case("completed")
+        self._load_doables(self.snapshot.load_doables(include_completed=False), count_messages=False)
+        self.message_counter = max(self.message_counter, self.snapshot.max_message_number())
+        self._replay_wal()
+
+
+    def _replay_wal(self):
+        """
+        Apply the changes recorded in the write-ahead log since the data file or snapshot was written.
+        """
+        if not self.wal:
+            return
+        for op, doable_data in self.wal.replay():
+            doable_id = doable_data["id"]
+            if doable_id not in self.doables and self._read_cold(doable_id):
+                self._count_cold(doable_data["case_id"], -1)
+                if op == "delete":
+                    self._removed.add(doable_id)
+            if op == "delete":
+                if doable_id in self.doables:
+                    self._unindex_doable(self.doables.pop(doable_id))
+            else:
+                self._load_doable(doable_data)
+
+
+    @timed("DoableManager._load_from_storage")
+    def _load_from_storage(self):
+        """
+        Load Doables that are not completed from storage and populate the manager.
+        """
+        self._cold_case_counts = self.storage.count_doables_by_case("completed")
+        self._load_doables(self.storage.load_doables(include_completed=False))
+        self.message_counter = max(self.message_counter, self.storage.max_message_number())
+
+
+    def _load_doables(self, doables_data: Iterable[dict], count_messages: bool = True):
+        """
+        Load many Doable records, heapifying the pending heaps and queueing each case once at the
+        end instead of indexing them record by record.
+        """
+        self._bulk_loading = True
+        try:
+            for doable_data in doables_data:
+                self._load_doable(doable_data, count_messages)
+        finally:
+            self._bulk_loading = False
+            for heap in self._pending_heaps.values():
+                heapq.heapify(heap)
+            for case_id in self._case_index:
+                self._index_case(case_id)
+
+
+    def _load_doable(self, doable_data: dict, count_messages: bool = True) -> Doable:
+        """
+        Load a single Doable record, replacing any Doable already loaded with the same ID.
+        """
+        doable = Doable.from_dict(doable_data)
+        if doable.id in self.doables:
+            self._unindex_doable(self.doables[doable.id])
+        self.doables[doable.id] = doable
+        self._index_doable(doable)
+
+        if count_messages:
+            self._count_message(doable.id)
+
+        return doable
+
+
+    def _count_message(self, doable_id: str):
+        """
+        Advance the message counter past a message ID, so that generated IDs never clash with it.
+        """
+        number = doable_id[len("message_"):]
+        if doable_id.startswith("message_") and number.isdigit():
+            self.message_counter = max(self.message_counter, int(number))
+
+
+    def _get_resident_doable(self, doable_id: str) -> Optional[Doable]:
+        """
+        Retrieve a Doable held in memory, reading it back from storage or the snapshot first if it is not.
+        """
+        doable = self.doables.get(doable_id)
+        if doable is None:
+            doable_data = self._read_cold(doable_id)
+            if doable_data:
+                self._cold_cache.pop(doable_id, None)
+                self._count_cold(doable_data["case_id"], -1)
+                doable = self._load_doable(doable_data)
+        return doable
+
+
+    def _evict_completed(self):
+        """
+        Drop completed Doables from memory once they have been committed to storage.
+        """
+        for doable_id in list(self._status_index.get("completed", ())):
+            doable = self.doables.pop(doable_id)
+            self._count_cold(doable.case_id, 1)
+            self._unindex_doable(doable)
+
+
+    def _read_cold(self, doable_id: str) -> Optional[dict]:
+        """
+        Read a Doable record from storage or the snapshot, unless it has been removed since.
+        """
+        if not self._cold_source or doable_id in self._removed:
+            return None
+        return self._cold_source.get_doable(doable_id)
+
+
+    def _switch_snapshot(self, snapshot: DoableSnapshot, written: Dict[str, dict], removed: Set[str]):
+        """
+        Switch to the snapshot that was just written, which no longer holds the given removed Doables.
+        In tiered mode, also drop the completed Doables written to it from memory, unless they have
+        changed since. Must be called with _lock held.
+        """
+        if self.snapshot is not None:
+            self.snapshot.close()  # read with _lock held, apart from by the writer that is done with it
+        self.snapshot = self._cold_source = snapshot
+        self._removed -= removed
+        evicted = 0
+        for doable_id, doable_data in written.items():
+            doable = self.doables.get(doable_id)
+            if doable is not None and doable.to_dict() == doable_data:
+                del self.doables[doable_id]
+                self._count_cold(doable.case_id, 1)
+                self._unindex_doable(doable)
+                evicted += 1
+        if evicted:
+            self._compact_indexes()
+
+
+    def _compact_indexes(self):
+        """
+        Rebuild the heaps without their stale entries, and the dicts and sets that keep their
+        size as entries are removed, so that memory is released once Doables are dropped.
+        Must be called with _lock held.
+        """
+        self.doables = dict(self.doables)
+        self._status_index = {status: set(doable_ids) for status, doable_ids in self._status_index.items()}
+        self._pending_keys = dict(self._pending_keys)
+        self._case_keys = dict(self._case_keys)
+
+        self._pending_heaps = {None: []}
+        for key, type in self._pending_keys.values():
+            self._pending_heaps[None].append(key)
+            self._pending_heaps.setdefault(type, []).append(key)
+        self._case_heaps = {None: []}
+        for key, types in self._case_keys.values():
+            self._case_heaps[None].append(key)
+            for type in types:
+                self._case_heaps.setdefault(type, []).append(key)
+        for heap in (*self._pending_heaps.values(), *self._case_heaps.values()):
+            heapq.heapify(heap)
+
+
+    def _cold_doables(self, resident_ids: Set[str]) -> List[Doable]:
+        """
+        Read the Doables in storage or the snapshot that are not among the given resident Doables.
+        """
+        if not self._cold_source:
+            return []
+        return [
+            Doable.from_dict(doable_data)
+            for doable_data in self._cold_source.load_doables()
+            if doable_data["id"] not in resident_ids and doable_data["id"] not in self._removed
+        ]
+
+
+    def _count_cold(self, case_id: Optional[str], delta: int):
+        """
+        Adjust the number of completed Doables of a case that are not held in memory.
+        """
+        if case_id is None:
+            return
+        count = self._cold_case_counts.get(case_id, 0) + delta
+        if count > 0:
+            self._cold_case_counts[case_id] = count
+        else:
+            self._cold_case_counts.pop(case_id, None)
+
+
+    def _log_change(self, doable: Doable, event: str = "doable.updated", event_data: Optional[dict] = None):
+        """
+        Record a new or updated Doable in the write-ahead log or storage, if one is configured,
+        and publish the change as an event, by default the whole Doable.
+        """
+        self.dirty = True
+        if self.wal:
+            self.wal.append("put", doable.to_dict())
+        if self.storage:
+            self.storage.stage("doables", doable.id, doable.to_dict())
+        for listener in self._listeners:
+            listener(doable)
+        if self.events is not None:
+            self.events.publish(event, event_data if event_data is not None else doable.to_camel_dict())
+        # Bumped last, so that anything read at the new version already reflects the change
+        self.version += 1
+
+
+    def _log_removal(self, doable: Doable):
+        """
+        Record a removed Doable in the write-ahead log or storage, if one is configured.
+        """
+        self.dirty = True
+        if self.wal:
+            self.wal.append("delete", {"id": doable.id, "case_id": doable.case_id})
+        if self.storage:
+            self.storage.stage("doables", doable.id, None)
+        if self.events is not None:
+            self.events.publish("doable.removed", {"id": doable.id, "caseId": doable.case_id})
+        self.version += 1
+
+
+    def subscribe(self, listener: Callable[[Doable], None]):
+        """
+        Call a listener with every new or updated Doable. Listeners are called with _lock held,
+        so they must not call back into the manager or take locks held while calling it.
+        """
+        self._listeners.append(listener)
+
+
+    def _index_doable(self, doable: Doable):
+        """
+        Add a Doable to the case, status and pending indexes.
+        """
+        if doable.case_id is not None:
+            self._case_index.setdefault(doable.case_id, {})[doable.id] = doable
+            self._grouped_cache = None
+            self._count_case_pending(doable.case_id, doable.status, 1)
+        self._status_index.setdefault(doable.status, set()).add(doable.id)
+        self._index_pending(doable)
+        self._index_case(doable.case_id)
+
+
+    def _unindex_doable(self, doable: Doable):
+        """
+        Remove a Doable from the case, status and pending indexes.
+        """
+        if self._remove_from_case_index(doable.id, doable.case_id):
+            self._count_case_pending(doable.case_id, doable.status, -1)
+        self._status_index.get(doable.status, set()).discard(doable.id)
+        self._pending_keys.pop(doable.id, None)
+        self._index_case(doable.case_id)
+
+
+    def _reindex_doable(self, doable: Doable, previous_case_id: Optional[str], previous_status: str):
+        """
+        Bring the indexes up to date after a Doable's attributes have changed.
+        """
+        if doable.case_id != previous_case_id:
+            self._remove_from_case_index(doable.id, previous_case_id)
+            if doable.case_id is not None:
+                self._case_index.setdefault(doable.case_id, {})[doable.id] = doable
+                self._grouped_cache = None
+
+        if doable.status != previous_status:
+            self._status_index.get(previous_status, set()).discard(doable.id)
+            self._status_index.setdefault(doable.status, set()).add(doable.id)
+
+        if doable.case_id != previous_case_id or doable.status != previous_status:
+            self._count_case_pending(previous_case_id, previous_status, -1)
+            self._count_case_pending(doable.case_id, doable.status, 1)
+            if doable.case_id != previous_case_id:
+                self._index_case(previous_case_id)
+
+        self._index_pending(doable)
+        self._index_case(doable.case_id)
+
+
+    def _remove_from_case_index(self, doable_id: str, case_id: Optional[str]):
+        """
+        Remove a Doable ID from a case's members, dropping the case once it is empty.
+        """
+        members = self._case_index.get(case_id)
+        if members is None or doable_id not in members:
+            return False
+        del members[doable_id]
+        if not members:
+            del self._case_index[case_id]
+        self._grouped_cache = None
+        return True
+
+
+    def _count_case_pending(self, case_id: Optional[str], status: str, delta: int):
+        """
+        Adjust the number of pending Doables recorded for a case.
+        """
+        if case_id is None or status != "pending":
+            return
+        count = self._case_pending_counts.get(case_id, 0) + delta
+        if count:
+            self._case_pending_counts[case_id] = count
+        else:
+            self._case_pending_counts.pop(case_id, None)
+
+
+    def _index_case(self, case_id: Optional[str]):
+        """
+        Queue a case in the case heaps if all of its Doables are pending, otherwise drop it.
+        """
+        if case_id is None or self._bulk_loading:
+            return
+        members = self._case_index.get(case_id)
+        if (
+            not members
+            or self._case_pending_counts.get(case_id, 0) != len(members)
+            or case_id in self._cold_case_counts
+        ):
+            self._case_keys.pop(case_id, None)
+            return
+
+        key = (min(doable.created_at for doable in members.values()), case_id)
+        types = frozenset(doable.type for doable in members.values())
+        if self._case_keys.get(case_id) == (key, types):
+            return  # already queued under this key
+
+        self._case_keys[case_id] = (key, types)
+        heapq.heappush(self._case_heaps[None], key)
+        for type in types:
+            heapq.heappush(self._case_heaps.setdefault(type, []), key)
+
+
+    def _index_pending(self, doable: Doable):
+        """
+        Add a pending Doable to the pending heaps, or drop it from them if it is no longer pending.
+        """
+        if doable.status != "pending":
+            self._pending_keys.pop(doable.id, None)
+            return
+
+        key = (PRIORITY_ORDER.get(doable.priority, len(PRIORITY_ORDER)), doable.created_at, doable.id)
+        if self._pending_keys.get(doable.id) == (key, doable.type):
+            return  # already queued under this key
+
+        self._pending_keys[doable.id] = (key, doable.type)
+        push = list.append if self._bulk_loading else heapq.heappush
+        push(self._pending_heaps[None], key)
+        push(self._pending_heaps.setdefault(doable.type, []), key)
+
+
+    def _peek_pending(self, type: Optional[str] = None) -> Optional[Doable]:
+        """
+        Return the first live entry of a pending heap, discarding stale entries on the way.
+        """
+        heap = self._pending_heaps.get(type)
+        while heap:
+            key = heap[0]
+            doable_id = key[-1]
+            doable = self.doables.get(doable_id)
+            if (
+                doable and doable.status == "pending"
+                and self._pending_keys.get(doable_id) == (key, doable.type)
+                and (type is None or doable.type == type)
+            ):
+                return doable
+            heapq.heappop(heap)
+        return None
+
 
     def _sort_doables_by_priority_and_age(self, doables: List[Doable]) -> List[Doable]:
         """
@@ -37,13 +507,11 @@ class DoableManager:
         2. Priority (high -> medium -> low),
         3. Age (oldest first).
         """
-        priority_order = {"high": 0, "medium": 1, "low": 2}
-
         return sorted(
             doables,
             key=lambda x: (
                 0 if x.status == "pending" else 1,
-                priority_order.get(x.priority, float("inf")),
+                PRIORITY_ORDER.get(x.priority, float("inf")),
                 x.created_at,
             ),
         )
@@ -54,8 +522,9 @@ class DoableManager:
         Generate a unique ID.
         """
         if type == "email":
-            self.message_counter += 1 # increment number of messages in the system
-            return f"message_{self.message_counter}"
+            with self._lock:
+                self.message_counter += 1 # increment number of messages in the system
+                return f"message_{self.message_counter}"
         
         elif type == "task": 
             # Append case number to title
@@ -77,16 +546,122 @@ class DoableManager:
         """
         Add a new Doable to the manager.
         """
-        if doable.id in self.doables:
-            raise ValueError(f"Doable with ID {doable.id} already exists.")
-        self.doables[doable.id] = doable
+        with self._lock:
+            if doable.id in self.doables or self._read_cold(doable.id):
+                raise ValueError(f"Doable with ID {doable.id} already exists.")
+            if not isinstance(doable.created_at, datetime) or doable.created_at.tzinfo is not None:
+                raise ValueError(f"Invalid created_at for Doable {doable.id}. Must be a date and time without a timezone.")
+            self.doables[doable.id] = doable
+            try:
+                self._index_doable(doable)
+            except Exception:
+                # Leave nothing behind of a Doable that could not be indexed
+                del self.doables[doable.id]
+                self._unindex_doable(doable)
+                raise
+            self._count_message(doable.id)
+            self._log_change(doable, "doable.created")
+
+
+    def add_doables_bulk(self, rows: Iterable, chunk_size: int = 1000) -> Tuple[int, List[dict]]:
+        """
+        Add many Doables in one pass, e.g. from an import, consuming the rows as they arrive.
+        Each row is a dict accepted by Doable.from_dict, except that a missing ID is generated and a
+        missing created_at defaults to now. A row may also be an exception raised while reading it.
+        Rows that cannot be added are skipped and reported as {"row": <index>, "error": <message>}.
+        Returns the number of Doables added and the errors.
+        """
+        added = 0
+        errors = []
+        chunk = []
+        for index, row in enumerate(rows):
+            try:
+                if isinstance(row, Exception):
+                    raise ValueError(str(row))
+                if not isinstance(row, dict):
+                    raise ValueError("Row must be a JSON object.")
+                doable_data = {"created_at": datetime.now().isoformat(), **row}
+                if not doable_data.get("id"):
+                    doable_data["id"] = self.generate_id(
+                        doable_data.get("title", ""), doable_data.get("type", "task"), doable_data.get("case_id")
+                    )
+                chunk.append((index, Doable.from_dict(doable_data)))
+            except KeyError as e:
+                errors.append({"row": index, "error": f"Missing field {e}."})
+            except (ValueError, TypeError) as e:
+                errors.append({"row": index, "error": str(e)})
+
+            if len(chunk) >= chunk_size:
+                added += self._add_chunk(chunk, errors)
+                chunk = []
+
+        added += self._add_chunk(chunk, errors)
+        return added, sorted(errors, key=lambda error: error["row"])
+
+
+    def _add_chunk(self, chunk: List[Tuple[int, Doable]], errors: List[dict]) -> int:
+        """
+        Add a chunk of validated bulk rows under a single lock, recording rows that clash with existing Doables.
+        """
+        added = 0
+        with self._lock:
+            for index, doable in chunk:
+                try:
+                    self.add_doable_instance(doable)
+                    added += 1
+                except ValueError as e:
+                    errors.append({"row": index, "error": str(e)})
+        return added
+
+
+    def remove_doables(self, doable_ids: Iterable[str]) -> List[Doable]:
+        """
+        Remove Doables, e.g. once they have been archived, skipping IDs that do not exist.
+        Returns the removed Doables.
+        """
+        removed = []
+        with self._lock:
+            for doable_id in doable_ids:
+                doable = self._get_resident_doable(doable_id)
+                if doable is None:
+                    continue
+                del self.doables[doable_id]
+                self._unindex_doable(doable)
+                if self._cold_source:
+                    self._removed.add(doable_id)
+                if self.columns is not None:
+                    self.columns.remove(doable_id)
+                self._log_removal(doable)
+                removed.append(doable)
+            if removed:
+                self._compact_indexes()
+        return removed
 
 
     def get_doable(self, doable_id: str) -> Optional[Doable]:
         """
         Retrieve a Doable by its ID.
         """
-        return self.doables.get(doable_id)
+        doable = self.doables.get(doable_id)
+        if doable is not None or not self._cold_source:
+            return doable
+
+        with self._lock:
+            doable = self.doables.get(doable_id) or self._cold_cache.get(doable_id)
+            if doable is not None:
+                if doable_id in self._cold_cache:
+                    self._cold_cache.move_to_end(doable_id)
+                return doable
+
+            doable_data = self._read_cold(doable_id)
+            if doable_data is None:
+                return None
+            doable = Doable.from_dict(doable_data)
+            if self.cold_cache_size > 0:
+                self._cold_cache[doable_id] = doable
+                if len(self._cold_cache) > self.cold_cache_size:
+                    self._cold_cache.popitem(last=False)
+            return doable
     
 
     def get_oldest_doable_by_type(self, type: Optional[str] = None) -> Optional[Doable]:
@@ -95,63 +670,234 @@ class DoableManager:
         Prioritises high priority items first, then medium, then low.
         If no type is specified, returns the oldest highest-priority Doable regardless of type.
         """
-        filtered_doables = [
-            doable for doable in self.doables.values()
-            if (type is None or doable.type == type) and doable.status == "pending"
-        ]
-        
-        if not filtered_doables:
-            return None
-        
-        sorted_doables = self._sort_doables_by_priority_and_age(filtered_doables)
+        with self._lock:
+            return self._peek_pending(type)
 
-        return sorted_doables[0] if sorted_doables else None
+
+    def get_oldest_pending_case(self, type: Optional[str] = None) -> Optional[str]:
+        """
+        Retrieve the ID of the case with the oldest Doable among cases whose Doables are all pending.
+        If a type is specified, only cases containing a Doable of that type are considered.
+        """
+        with self._lock:
+            heap = self._case_heaps.get(type)
+            while heap:
+                key = heap[0]
+                case_id = key[-1]
+                entry = self._case_keys.get(case_id)
+                if entry and entry[0] == key and (type is None or type in entry[1]):
+                    return case_id
+                heapq.heappop(heap)
+            return None
 
 
     def get_doables_by_case(self, case_id: str) -> List[Doable]:
         """
         Retrieve all Doables for a case, sorted by priority and then by age.
         """
-        case_doables = [doable for doable in self.doables.values() if doable.case_id == case_id]
-        return self._sort_doables_by_priority_and_age(case_doables)
+        with self._lock:
+            case_doables = list(self._case_index.get(case_id, {}).values())
+            if case_id in self._cold_case_counts:
+                case_doables += [
+                    Doable.from_dict(doable_data)
+                    for doable_data in self._cold_source.get_doables_by_case(case_id, status="completed")
+                    if doable_data["id"] not in self.doables and doable_data["id"] not in self._removed
+                ]
+            return self._sort_doables_by_priority_and_age(case_doables)
 
 
-    def get_doables_grouped_by_case(self) -> Dict[str, List[Doable]]:
+    def get_doables_by_status(self, status: str) -> List[Doable]:
         """
-        Group Doables by case ID, and sort each group by priority and then by age.
+        Retrieve all Doables with the given status.
         """
-        doables_by_case = {}
+        with self._lock:
+            doables = [self.doables[doable_id] for doable_id in self._status_index.get(status, ())]
+            if self._cold_source and status == "completed":
+                doables += [
+                    Doable.from_dict(doable_data)
+                    for doable_data in self._cold_source.get_doables_by_status(status)
+                    if doable_data["id"] not in self.doables and doable_data["id"] not in self._removed
+                ]
+            return doables
 
-        for doable in self.doables.values():
-            if doable.case_id is None: # Skip doables with None as case_id
-                continue
 
-            if doable.case_id not in doables_by_case:
-                doables_by_case[doable.case_id] = []
-            doables_by_case[doable.case_id].append(doable)
-        
-        return doables_by_case
+    def get_doable_counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        Count the Doables of each status and type, e.g. {"pending": {"task": 3, "email": 1}, ...}.
+        """
+        if self.columns is not None:
+            return self.columns.counts_by_status_and_type()
+
+        counts = {status: {type: 0 for type in TYPES} for status in STATUSES}
+        for status in STATUSES:
+            for doable in self.get_doables_by_status(status):
+                counts[status][doable.type] += 1
+        return counts
+
+
+    def get_doables_grouped_by_case(self) -> Dict[str, List[Doable]]:
+        """
+        Group Doables by case ID, skipping Doables without a case.
+        The result is cached until case membership changes and must not be modified by callers.
+        With storage or a snapshot, only Doables held in memory are included.
+        """
+        with self._lock:
+            if self._grouped_cache is None:
+                self._grouped_cache = {
+                    case_id: list(members.values()) for case_id, members in self._case_index.items()
+                }
+            return self._grouped_cache
             
 
+    def compare_and_set_status(self, doable_id: str, expected_status: str, status: str) -> bool:
+        """
+        Atomically change a Doable's status, but only if it currently has the expected status.
+        Returns whether the status was changed.
+        """
+        with self._lock:
+            doable = self._get_resident_doable(doable_id)
+            if not doable or doable.status != expected_status:
+                return False
+            self._set_status(doable, status)
+            return True
+
+
+    def compare_and_set_statuses(self, doable_ids: Iterable[str], expected_status: str, status: str) -> bool:
+        """
+        As compare_and_set_status for several Doables at once: either all of them have the expected
+        status and are changed, or none is. Returns whether the statuses were changed.
+        """
+        with self._lock:
+            doables = [self._get_resident_doable(doable_id) for doable_id in doable_ids]
+            if not all(doable and doable.status == expected_status for doable in doables):
+                return False
+            for doable in doables:
+                self._set_status(doable, status)
+            return True
+
+
+    def transition_status(self, doable_id: str, status: str):
+        """
+        Change a Doable's status, allowing only the transitions in STATUS_TRANSITIONS.
+        Unlike update_doable, only the status is validated and reindexed.
+        """
+        with self._lock:
+            doable = self._get_resident_doable(doable_id)
+            if not doable:
+                raise ValueError(f"No Doable found with ID {doable_id}.")
+            self._set_status(doable, status)
+
+
+    def _set_status(self, doable: Doable, status: str):
+        """
+        Move a Doable to a new status if the transition is legal, and update the indexes.
+        """
+        if not isinstance(status, str) or status not in STATUS_TRANSITIONS[doable.status]:
+            raise ValueError(f"Cannot change the status of Doable {doable.id} from '{doable.status}' to '{status}'.")
+        previous_status = doable.status
+        doable.status = sys.intern(status)
+
+        # As _reindex_doable, for a change of status only
+        self._status_index[previous_status].discard(doable.id)
+        self._status_index.setdefault(doable.status, set()).add(doable.id)
+        if doable.case_id is not None:
+            self._count_case_pending(doable.case_id, previous_status, -1)
+            self._count_case_pending(doable.case_id, doable.status, 1)
+            self._index_case(doable.case_id)
+        self._index_pending(doable)
+        self._log_change(doable, "doable.status", {
+            "id": doable.id, "caseId": doable.case_id, "status": doable.status, "previousStatus": previous_status,
+        })
+
+
     def update_doable(self, doable_id: str, **kwargs):
         """
         Update an existing Doable's attributes.
         """
-        doable = self.get_doable(doable_id)
-        if not doable:
-            raise ValueError(f"No Doable found with ID {doable_id}.")
-        for key, value in kwargs.items():
-            if hasattr(doable, key):
-                setattr(doable, key, value)
-            else:
-                raise KeyError(f"Invalid attribute '{key}' for Doable.")
-        
-        doable.__post_init__()
+        with self._lock:
+            doable = self._get_resident_doable(doable_id)
+            if not doable:
+                raise ValueError(f"No Doable found with ID {doable_id}.")
 
+            previous_case_id, previous_status = doable.case_id, doable.status
+            try:
+                for key, value in kwargs.items():
+                    if key in doable.__dataclass_fields__:
+                        setattr(doable, key, value)
+                    else:
+                        raise KeyError(f"Invalid attribute '{key}' for Doable.")
 
+                doable.__post_init__()
+            finally:
+                self._reindex_doable(doable, previous_case_id, previous_status)
+
+            self._log_change(doable)
+
+
+    @timed("DoableManager.save_doables")
     def save_doables(self):
         """
-        Save all Doables to a JSON file.
+        Save all Doables to the JSON file, or the binary snapshot if one is configured.
+        With a write-ahead log, only the changes since the last save are appended to the log,
+        and the file is rewritten in the background once a checkpoint is due.
+        """
+        with self._save_lock:
+            self.dirty = False
+            if self.wal:
+                self.wal.flush()
+                if self.wal.checkpoint_due():
+                    self.checkpoint()
+                return
+
+            if self.storage:
+                with self._lock:
+                    self.storage.commit()
+                    self._removed.clear()
+                    self._evict_completed()
+                return
+
+            self._snapshot_writer()()
+
+
+    @timed("DoableManager.checkpoint")
+    def checkpoint(self, background: bool = True):
+        """
+        Write a snapshot of all Doables to the JSON file or binary snapshot and truncate the write-ahead log.
+        """
+        self.wal.checkpoint(self._snapshot_writer(), background=background)
+
+
+    def _snapshot_writer(self) -> Callable[[], None]:
+        """
+        Capture the Doables held in memory and return a function that writes them, with any Doables
+        only held in the snapshot, to the binary snapshot if one is configured and the JSON file otherwise.
+        In tiered mode, the completed Doables written are then dropped from memory.
+        """
+        with self._lock:
+            doables = list(self.doables.values())
+            message_counter = self.message_counter
+            if not self.snapshot_path:
+                doables_data = [doable.to_dict() for doable in doables]
+                return lambda: write_json_atomic(self.file_path, doables_data)
+            written = {
+                doable.id: doable.to_dict() for doable in doables if self.tiered and doable.status == "completed"
+            }
+            removed = set(self._removed)
+
+        def write():
+            cold_doables = self._cold_doables({doable.id for doable in doables} | removed)
+            write_doable_snapshot(self.snapshot_path, doables + cold_doables, message_counter)
+            snapshot = DoableSnapshot(self.snapshot_path)
+            with self._lock:
+                self._switch_snapshot(snapshot, written, removed)
+        return write
+
+
+    def export_json(self, file_path: str):
+        """
+        Write every Doable, including those only held in storage or the snapshot, to a JSON file.
         """
-        with open(self.file_path, "w") as file:
-            json.dump([doable.to_dict() for doable in self.doables.values()], file, indent=4)
\ No newline at end of file
+        with self._lock:
+            doables = list(self.doables.values())
+            cold_doables = self._cold_doables(set(self.doables))
+        write_json_atomic(file_path, [doable.to_dict() for doable in doables + cold_doables])
\ No newline at end of file
@@ -0,0 +1,87 @@
+from collections import deque
+from typing import Deque, List, Optional
+import json
+import threading
+
+class Event:
+    __slots__ = ("id", "type", "data", "_frame")
+
+    def __init__(self, id: int, type: str, data: dict):
+        """
+        A change published to the event bus, numbered in the order of publishing.
+        """
+        self.id = id
+        self.type = type
+        self.data = data
+        self._frame = None
+
+
+    def to_sse(self) -> str:
+        """
+        Format the event as a server-sent event, serializing it once however many streams send it.
+        """
+        if self._frame is None:
+            self._frame = f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+        return self._frame
+
+
+class EventBus:
+    def __init__(self, capacity: int = 10000):
+        """
+        In-process feed of the changes made by the managers, keeping the most recent events so that
+        readers can catch up from the last event they saw.
+
+        Events are numbered from 1 and never reused while the process runs. Readers block on a
+        condition until there are new events, so waiting readers cost nothing while the data is idle.
+        Events are published with the managers' locks held, so _condition is a leaf lock.
+        """
+        self._events: Deque[Event] = deque(maxlen=capacity)
+        self._last_id = 0
+        self._condition = threading.Condition()
+
+
+    @property
+    def last_id(self) -> int:
+        """
+        ID of the latest event, or 0 if there are none.
+        """
+        return self._last_id
+
+
+    def publish(self, type: str, data: dict) -> int:
+        """
+        Add an event and wake the waiting readers. Returns the event's ID.
+        """
+        with self._condition:
+            self._last_id += 1
+            self._events.append(Event(self._last_id, type, data))
+            self._condition.notify_all()
+            return self._last_id
+
+
+    def _since(self, last_id: int) -> Optional[List[Event]]:
+        if last_id > self._last_id or (
+            last_id < self._last_id and (not self._events or self._events[0].id > last_id + 1)
+        ):
+            return None  # from before a restart, or older than the events kept
+        # IDs are consecutive, so the events after last_id are the newest ones
+        count = self._last_id - last_id
+        return [self._events[index] for index in range(len(self._events) - count, len(self._events))]
+
+
+    def since(self, last_id: int) -> Optional[List[Event]]:
+        """
+        Get the events after an event ID, or None if some of them are no longer kept.
+        """
+        with self._condition:
+            return self._since(last_id)
+
+
+    def wait(self, last_id: int, timeout: float) -> Optional[List[Event]]:
+        """
+        As since, but wait up to timeout seconds for an event after last_id if there is none yet.
+        Returns an empty list if none was published in time.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id != last_id, timeout)
+            return self._since(last_id)
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+from typing import Dict, Hashable
+import threading
+
+class KeyedLock:
+    def __init__(self):
+        """
+        Hands out one lock per key, e.g. per case, and drops each lock once nobody holds or waits for it.
+        """
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, list] = {}  # key -> [lock, number of holders and waiters]
+
+    @contextmanager
+    def __call__(self, key: Hashable):
+        """
+        Hold the lock for a key for the duration of a with block.
+        """
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
@@ -0,0 +1,129 @@
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+import functools
+import threading
+import time
+
+# Bucket upper bounds in seconds, growing by a factor of 2 ** (1 / 4) from 1 microsecond to
+# about 2 minutes, so quantiles read from the buckets are within about 10% of the true value
+BUCKET_BOUNDS: List[float] = [1e-6 * 2 ** (step / 4) for step in range(108)]
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    def __init__(self):
+        """
+        Counts of observed durations in fixed logarithmic buckets, with their total.
+        Observing is a binary search and two additions, so it can be done on every call.
+        """
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # the last bucket holds anything longer
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+
+    def observe(self, seconds: float):
+        """
+        Record a duration.
+        """
+        index = bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile of the observed durations, interpolating within its bucket.
+        """
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else BUCKET_BOUNDS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKET_BOUNDS[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Histograms of durations by metric name and labels, rendered in the Prometheus text format.
+        """
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+
+    def histogram(self, name: str, help: str = "", **labels: str) -> Histogram:
+        """
+        Get the histogram of a metric with the given labels, creating it if needed.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+                if help:
+                    self._help.setdefault(name, help)
+        return histogram
+
+
+    def render(self) -> str:
+        """
+        Render every metric as a Prometheus summary: quantiles, count and total seconds.
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        previous_name = None
+        for (name, labels), histogram in histograms:
+            if name != previous_name:
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                previous_name = name
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            for q in QUANTILES:
+                quantile_labels = f'{label_text},quantile="{q}"' if label_text else f'quantile="{q}"'
+                lines.append(f"{name}{{{quantile_labels}}} {histogram.quantile(q):.9g}")
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{name}_sum{suffix} {histogram.sum:.9g}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registry of the app's metrics
+registry = MetricsRegistry()
+
+
+def timed(method: str):
+    """
+    Decorator recording the duration of every call of a manager method, whether it returns or raises.
+    """
+    histogram = registry.histogram(
+        "manager_call_duration_seconds", "Duration of manager method calls.", method=method
+    )
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
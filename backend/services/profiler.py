@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import List, Optional
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}T\d{6}-\d+$")
+
+class RequestProfiler:
+    def __init__(self, directory: str, keep: int = 50, sample_rate: float = 0.0, header: str = "X-Profile"):
+        """
+        Runs requests under cProfile, as WSGI middleware, and keeps their most recent profiles.
+
+        A request is profiled when it sends the header with the value 1, or at random with the
+        sample rate. Each profile is saved in the directory as <id>.prof in the pstats format,
+        with the request's method, path, status and duration in <id>.json, and the oldest are
+        deleted beyond keep. One request is profiled at a time; requests arriving meanwhile
+        run unprofiled, so profiling never serialises the server.
+        """
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self.environ_key = "HTTP_" + header.upper().replace("-", "_")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Continue numbering after the saved profiles, so IDs are never reused across restarts
+        ids = self._ids()
+        self._sequence = itertools.count(int(ids[-1].split("-")[1]) + 1 if ids else 1)
+
+
+    def wrap(self, wsgi_app):
+        """
+        Wrap a WSGI app so that its requests can be profiled.
+        """
+        def profiled_app(environ, start_response):
+            wanted = environ.get(self.environ_key) == "1" or (self.sample_rate > 0 and random.random() < self.sample_rate)
+            if not wanted or not self._lock.acquire(blocking=False):
+                return wsgi_app(environ, start_response)
+
+            try:
+                status = []
+
+                def recording_start_response(response_status, headers, *args):
+                    status.append(response_status)
+                    return start_response(response_status, headers, *args)
+
+                profile = cProfile.Profile()
+                started = time.perf_counter()
+                profile.enable()
+                try:
+                    return wsgi_app(environ, recording_start_response)
+                finally:
+                    profile.disable()
+                    self._save(profile, environ, status[0] if status else "", time.perf_counter() - started)
+            finally:
+                self._lock.release()
+        return profiled_app
+
+
+    def _save(self, profile: cProfile.Profile, environ: dict, status: str, duration: float):
+        """
+        Save a request's profile and its details, then delete the oldest profiles beyond keep.
+        """
+        profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{next(self._sequence)}"
+        profile.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+            json.dump({
+                "id": profile_id,
+                "method": environ.get("REQUEST_METHOD"),
+                "path": environ.get("PATH_INFO"),
+                "query": environ.get("QUERY_STRING"),
+                "status": int(status.split(" ", 1)[0]) if status else None,
+                "duration_ms": duration * 1000,
+                "created_at": datetime.now().isoformat(),
+            }, f)
+
+        for old_id in self._ids()[:-self.keep]:
+            for extension in ("prof", "json"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{old_id}.{extension}"))
+                except FileNotFoundError:
+                    pass
+
+
+    def _ids(self) -> List[str]:
+        """
+        IDs of the saved profiles, oldest first.
+        """
+        ids = [name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted(
+            (profile_id for profile_id in ids if PROFILE_ID_PATTERN.match(profile_id)),
+            key=lambda profile_id: int(profile_id.split("-")[1]),
+        )
+
+
+    def list_profiles(self) -> List[dict]:
+        """
+        Details of the saved profiles, newest first.
+        """
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json"), "r") as f:
+                    profiles.append(json.load(f))
+            except FileNotFoundError:
+                pass  # rotated out meanwhile
+        return profiles
+
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        """
+        Path of a saved profile's pstats file, or None if there is no such profile.
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+        """
+        Render a saved profile as a pstats text report of its top functions.
+        """
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise ValueError(f"Invalid sort '{sort}'. Must be one of: {', '.join(sorted(pstats.Stats.sort_arg_dict_default))}")
+        path = self.profile_path(profile_id)
+        if path is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+import hashlib
+import threading
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256):
+        """
+        Least recently used cache of serialized responses, each valid only for the data version it was produced at.
+
+        :param max_entries: Maximum number of responses to keep. With 0, nothing is cached.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        """
+        Strong entity tag of a response body.
+        """
+        return hashlib.sha1(body).hexdigest()
+
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Tuple[bytes, str]]:
+        """
+        Retrieve the body and ETag cached for a key, unless it was produced at a different data version.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+
+    def put(self, key: Hashable, version: Hashable, body: bytes) -> str:
+        """
+        Cache a response body produced at a data version, evicting the least recently used
+        responses beyond max_entries. Returns the body's ETag.
+        """
+        etag = self.etag(body)
+        if self.max_entries <= 0:
+            return etag
+        with self._lock:
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
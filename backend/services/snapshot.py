@@ -0,0 +1,331 @@
+from bisect import bisect_left
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Optional
+import mmap
+import struct
+from models.allocation import Allocation
+from models.doable import Doable, PRIORITY_ORDER
+from services.columnar_store import EPOCH, MICROSECOND, PRIORITIES, STATUSES, TYPES
+from utils import write_bytes_atomic
+
+# Binary snapshots of the Doables and Allocations, written in place of the JSON data files
+# when SNAPSHOT_FORMAT is "binary". All integers are little-endian, and strings are UTF-8
+# in a string heap at the end of the file, referenced by (offset, length).
+#
+# Doable snapshot:
+#   header   magic, message counter, row count, completed row count, case count, string heap offset
+#   rows     one fixed-size row per Doable: completed Doables first, sorted by ID, then the others
+#   cases    one entry per case with completed Doables: case ID and the range of its rows in "by case"
+#   by case  row numbers of the completed Doables with a case, grouped by case
+#   strings
+#
+# Allocation snapshot:
+#   header   magic, row count, completed row count, string heap offset
+#   rows     one fixed-size row per Allocation: those of completed Doables first, sorted by doable ID, then the others
+#   strings
+
+DOABLE_MAGIC = b"WASDOA01"
+DOABLE_HEADER = struct.Struct("<8sQQQQQ")
+DOABLE_ROW = struct.Struct("<IIIIIibbbxq")  # id, title, case ID (length -1 if none), type, priority, status, created_at
+CASE_ROW = struct.Struct("<IIII")  # case ID, first "by case" index, count
+ROW_NUMBER = struct.Struct("<I")
+
+ALLOCATION_MAGIC = b"WASALL02"
+ALLOCATION_HEADER = struct.Struct("<8sQQQ")
+ALLOCATION_ROW = struct.Struct("<IIIIq?")  # doable ID, user ID, allocated_at, is_case_allocation
+
+TYPE_CODES = {type: code for code, type in enumerate(TYPES)}
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+COMPLETED = STATUS_CODES["completed"]
+
+
+class _StringHeap:
+    def __init__(self):
+        self.data = bytearray()
+        self._offsets: Dict[str, tuple] = {}
+
+    def add(self, value: Optional[str]) -> tuple:
+        """
+        Add a string to the heap, once per distinct value, and return its (offset, length).
+        """
+        if value is None:
+            return 0, -1
+        location = self._offsets.get(value)
+        if location is None:
+            encoded = value.encode("utf-8")
+            location = self._offsets[value] = (len(self.data), len(encoded))
+            self.data += encoded
+        return location
+
+
+def write_doable_snapshot(file_path: str, doables: Iterable[Doable], message_counter: int):
+    """
+    Atomically write a snapshot of Doables.
+    """
+    doables = list(doables)
+    completed = sorted((doable for doable in doables if doable.status == "completed"), key=lambda doable: doable.id)
+    others = [doable for doable in doables if doable.status != "completed"]
+
+    strings = _StringHeap()
+    rows = bytearray()
+    case_rows: Dict[str, List[int]] = {}
+    for number, doable in enumerate(completed + others):
+        id_location = strings.add(doable.id)
+        rows += DOABLE_ROW.pack(
+            *id_location,
+            *strings.add(doable.title),
+            *strings.add(doable.case_id),
+            TYPE_CODES[doable.type],
+            PRIORITY_ORDER[doable.priority],
+            STATUS_CODES[doable.status],
+            (doable.created_at - EPOCH) // MICROSECOND,
+        )
+        if doable.status == "completed" and doable.case_id is not None:
+            case_rows.setdefault(doable.case_id, []).append(number)
+
+    cases = bytearray()
+    by_case = bytearray()
+    first = 0
+    for case_id, numbers in case_rows.items():
+        cases += CASE_ROW.pack(*strings.add(case_id), first, len(numbers))
+        by_case += b"".join(ROW_NUMBER.pack(number) for number in numbers)
+        first += len(numbers)
+
+    strings_offset = DOABLE_HEADER.size + len(rows) + len(cases) + len(by_case)
+    header = DOABLE_HEADER.pack(
+        DOABLE_MAGIC, message_counter, len(doables), len(completed), len(case_rows), strings_offset
+    )
+    write_bytes_atomic(file_path, b"".join((header, rows, cases, by_case, strings.data)))
+
+
+class DoableSnapshot:
+    def __init__(self, file_path: str):
+        """
+        Read-only view of a Doable snapshot, memory-mapped and decoded record by record on access.
+
+        Provides the read methods of SqliteStorage that DoableManager uses for Doables it does
+        not hold in memory, so completed Doables can stay in the snapshot until they are needed.
+        """
+        self.file_path = file_path
+        with open(file_path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.message_counter, self.row_count, self.completed_count, case_count, self._strings_offset = (
+            DOABLE_HEADER.unpack_from(self._map, 0)
+        )
+        if magic != DOABLE_MAGIC:
+            raise ValueError(f"{file_path} is not a doable snapshot.")
+
+        self._rows_offset = DOABLE_HEADER.size
+        cases_offset = self._rows_offset + self.row_count * DOABLE_ROW.size
+        self._by_case_offset = cases_offset + case_count * CASE_ROW.size
+        self._cases: Dict[str, tuple] = {}
+        for offset, length, first, count in CASE_ROW.iter_unpack(self._map[cases_offset:self._by_case_offset]):
+            self._cases[self._string(offset, length)] = (first, count)
+
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if length < 0:
+            return None
+        start = self._strings_offset + offset
+        return self._map[start:start + length].decode("utf-8")
+
+
+    def _id(self, number: int) -> bytes:
+        """
+        Read the encoded ID of a row. UTF-8 sorts bytewise in the same order as the IDs themselves.
+        """
+        offset, length = struct.unpack_from("<II", self._map, self._rows_offset + number * DOABLE_ROW.size)
+        start = self._strings_offset + offset
+        return self._map[start:start + length]
+
+
+    def _record(self, row: tuple) -> dict:
+        id_offset, id_length, title_offset, title_length, case_offset, case_length, type, priority, status, created_at = row
+        return {
+            "id": self._string(id_offset, id_length),
+            "title": self._string(title_offset, title_length),
+            "case_id": self._string(case_offset, case_length),
+            "type": TYPES[type],
+            "priority": PRIORITIES[priority],
+            "status": STATUSES[status],
+            "created_at": EPOCH + created_at * MICROSECOND,
+        }
+
+
+    def _records(self, start: int, stop: int) -> Iterator[dict]:
+        """
+        Decode the records of a range of rows.
+        """
+        begin = self._rows_offset + start * DOABLE_ROW.size
+        for row in DOABLE_ROW.iter_unpack(self._map[begin:begin + (stop - start) * DOABLE_ROW.size]):
+            yield self._record(row)
+
+
+    def load_doables(self, include_completed: bool = True) -> Iterator[dict]:
+        """
+        Decode the stored Doable records, optionally leaving out completed ones without reading them.
+        """
+        return self._records(0 if include_completed else self.completed_count, self.row_count)
+
+
+    def get_doable(self, doable_id: str) -> Optional[dict]:
+        """
+        Retrieve a completed Doable record by its ID, found by binary search.
+        """
+        encoded = doable_id.encode("utf-8")
+        number = bisect_left(range(self.completed_count), encoded, key=self._id)
+        if number < self.completed_count and self._id(number) == encoded:
+            return next(self._records(number, number + 1))
+        return None
+
+
+    def get_doables_by_case(self, case_id: str, status: Optional[str] = None) -> List[dict]:
+        """
+        Retrieve the completed Doable records of a case.
+        """
+        if status not in (None, "completed") or case_id not in self._cases:
+            return []
+        first, count = self._cases[case_id]
+        numbers = struct.unpack_from(f"<{count}I", self._map, self._by_case_offset + first * ROW_NUMBER.size)
+        return [next(self._records(number, number + 1)) for number in numbers]
+
+
+    def get_doables_by_status(self, status: str) -> List[dict]:
+        """
+        Retrieve the stored Doable records with a status.
+        """
+        if status == "completed":
+            return list(self._records(0, self.completed_count))
+        return [record for record in self._records(self.completed_count, self.row_count) if record["status"] == status]
+
+
+    def count_doables_by_case(self, status: str) -> Dict[str, int]:
+        """
+        Count the stored Doables with a status in each case.
+        """
+        if status == "completed":
+            return {case_id: count for case_id, (_, count) in self._cases.items()}
+        counts: Dict[str, int] = {}
+        for record in self.get_doables_by_status(status):
+            if record["case_id"] is not None:
+                counts[record["case_id"]] = counts.get(record["case_id"], 0) + 1
+        return counts
+
+
+    def max_message_number(self) -> int:
+        return self.message_counter
+
+
+    def close(self):
+        self._map.close()
+
+
+def write_allocation_snapshot(
+    file_path: str, allocations: Iterable[Allocation], completed: AbstractSet[str] = frozenset()
+):
+    """
+    Atomically write a snapshot of Allocations, given the IDs of the completed Doables among theirs.
+    """
+    allocations = list(allocations)
+    completed_allocations = sorted(
+        (allocation for allocation in allocations if allocation.doable_id in completed),
+        key=lambda allocation: allocation.doable_id,
+    )
+    others = [allocation for allocation in allocations if allocation.doable_id not in completed]
+
+    strings = _StringHeap()
+    rows = bytearray()
+    for allocation in completed_allocations + others:
+        rows += ALLOCATION_ROW.pack(
+            *strings.add(allocation.doable_id),
+            *strings.add(allocation.user_id),
+            (allocation.allocated_at - EPOCH) // MICROSECOND,
+            allocation.is_case_allocation,
+        )
+    header = ALLOCATION_HEADER.pack(
+        ALLOCATION_MAGIC, len(allocations), len(completed_allocations), ALLOCATION_HEADER.size + len(rows)
+    )
+    write_bytes_atomic(file_path, b"".join((header, rows, strings.data)))
+
+
+class AllocationSnapshot:
+    def __init__(self, file_path: str):
+        """
+        Read-only view of an Allocation snapshot, memory-mapped and decoded record by record on access.
+
+        Provides the read methods of SqliteStorage that AllocationManager uses for Allocations it does
+        not hold in memory, so the Allocations of completed Doables can stay in the snapshot.
+        """
+        self.file_path = file_path
+        with open(file_path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.row_count, self.completed_count, self._strings_offset = ALLOCATION_HEADER.unpack_from(self._map, 0)
+        if magic != ALLOCATION_MAGIC:
+            raise ValueError(f"{file_path} is not an allocation snapshot.")
+        self._rows_offset = ALLOCATION_HEADER.size
+
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return self._map[start:start + length].decode("utf-8")
+
+
+    def _doable_id(self, number: int) -> bytes:
+        """
+        Read the encoded doable ID of a row, which sorts bytewise in the same order as the IDs themselves.
+        """
+        offset, length = struct.unpack_from("<II", self._map, self._rows_offset + number * ALLOCATION_ROW.size)
+        start = self._strings_offset + offset
+        return self._map[start:start + length]
+
+
+    def _records(self, start: int, stop: int) -> Iterator[dict]:
+        """
+        Decode the records of a range of rows, decoding each distinct user ID once.
+        """
+        begin = self._rows_offset + start * ALLOCATION_ROW.size
+        user_ids: Dict[tuple, str] = {}
+        for doable_offset, doable_length, user_offset, user_length, allocated_at, is_case_allocation in (
+            ALLOCATION_ROW.iter_unpack(self._map[begin:begin + (stop - start) * ALLOCATION_ROW.size])
+        ):
+            user_id = user_ids.get((user_offset, user_length))
+            if user_id is None:
+                user_id = user_ids[(user_offset, user_length)] = self._string(user_offset, user_length)
+            yield {
+                "doable_id": self._string(doable_offset, doable_length),
+                "user_id": user_id,
+                "allocated_at": EPOCH + allocated_at * MICROSECOND,
+                "is_case_allocation": is_case_allocation,
+            }
+
+
+    def load_allocations(self, include_completed: bool = True) -> Iterator[dict]:
+        """
+        Decode the stored Allocation records, optionally leaving out those of completed Doables without reading them.
+        """
+        return self._records(0 if include_completed else self.completed_count, self.row_count)
+
+
+    def get_allocation(self, doable_id: str) -> Optional[dict]:
+        """
+        Retrieve the Allocation record of a completed Doable by its ID, found by binary search.
+        """
+        encoded = doable_id.encode("utf-8")
+        number = bisect_left(range(self.completed_count), encoded, key=self._doable_id)
+        if number < self.completed_count and self._doable_id(number) == encoded:
+            return next(self._records(number, number + 1))
+        return None
+
+
+    def get_completed_allocations(self, user_id: Optional[str] = None) -> List[dict]:
+        """
+        Retrieve the stored Allocation records of completed Doables, optionally only those of a user.
+        """
+        return [
+            record for record in self._records(0, self.completed_count) if user_id is None or record["user_id"] == user_id
+        ]
+
+
+    def close(self):
+        self._map.close()
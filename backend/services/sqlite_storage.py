@@ -0,0 +1,269 @@
+from typing import Dict, Iterator, List, Optional
+import json
+import sqlite3
+import threading
+from models.doable import PRIORITY_ORDER
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doables (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    case_id TEXT,
+    type TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    priority_rank INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doables_pending_idx ON doables (status, type, priority_rank, created_at);
+CREATE INDEX IF NOT EXISTS doables_case_idx ON doables (case_id);
+
+CREATE TABLE IF NOT EXISTS allocations (
+    doable_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    allocated_at TEXT NOT NULL,
+    is_case_allocation INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS allocations_user_idx ON allocations (user_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    user_name TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT,
+    preferred_doable_type TEXT
+);
+"""
+
+DOABLE_COLUMNS = ["id", "title", "case_id", "type", "priority", "status", "created_at"]
+ALLOCATION_COLUMNS = ["doable_id", "user_id", "allocated_at", "is_case_allocation"]
+USER_COLUMNS = ["id", "user_name", "first_name", "last_name", "preferred_doable_type"]
+
+
+class SqliteStorage:
+    def __init__(self, db_path: str):
+        """
+        SQLite storage shared by the Doable, Allocation and User managers.
+
+        Changes are staged by the managers as they happen and written in a single
+        transaction on commit, so a save costs O(changes) rather than O(stored data).
+
+        :param db_path: Path to the SQLite database file, created if missing.
+        """
+        self.db_path = db_path
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._staged: Dict[str, Dict[str, Optional[dict]]] = {"doables": {}, "allocations": {}, "users": {}}
+
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        """
+        Run a read query and return all rows.
+        """
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+
+    def is_empty(self) -> bool:
+        """
+        Check whether nothing has been stored yet.
+        """
+        return not any(
+            self._query(f"SELECT 1 FROM {table} LIMIT 1") for table in ("doables", "allocations", "users")
+        )
+
+
+    def import_json(self, doables_path: str, allocations_path: str, users_path: str):
+        """
+        Import the records of the JSON data files.
+        """
+        for table, path in (("doables", doables_path), ("allocations", allocations_path), ("users", users_path)):
+            try:
+                with open(path, "r") as file:
+                    records = json.load(file)
+            except FileNotFoundError:
+                continue
+            key = "doable_id" if table == "allocations" else "id"
+            for record in records:
+                self.stage(table, record[key], record)
+        self.commit()
+
+
+    def stage(self, table: str, key: str, record: Optional[dict]):
+        """
+        Stage an upserted record, or a deletion if record is None, until the next commit.
+        """
+        with self._lock:
+            self._staged[table][key] = record
+
+
+    def commit(self):
+        """
+        Write all staged changes in one transaction.
+        """
+        with self._lock:
+            if not any(self._staged.values()):
+                return
+            staged, self._staged = self._staged, {"doables": {}, "allocations": {}, "users": {}}
+            with self._connection:
+                self._write(staged["doables"], "doables", "id", self._doable_row)
+                self._write(staged["allocations"], "allocations", "doable_id", self._allocation_row)
+                self._write(staged["users"], "users", "id", self._user_row)
+
+
+    def _write(self, changes: Dict[str, Optional[dict]], table: str, key: str, to_row):
+        """
+        Apply staged upserts and deletions to a table.
+        """
+        upserts = [to_row(record) for record in changes.values() if record is not None]
+        deletions = [(record_key,) for record_key, record in changes.items() if record is None]
+        if upserts:
+            names = list(upserts[0])
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                [tuple(row[name] for name in names) for row in upserts],
+            )
+        if deletions:
+            self._connection.executemany(f"DELETE FROM {table} WHERE {key} = ?", deletions)
+
+
+    @staticmethod
+    def _doable_row(record: dict) -> dict:
+        row = {column: record.get(column) for column in DOABLE_COLUMNS}
+        row["priority_rank"] = PRIORITY_ORDER.get(row["priority"], len(PRIORITY_ORDER))
+        return row
+
+
+    @staticmethod
+    def _allocation_row(record: dict) -> dict:
+        row = {column: record.get(column) for column in ALLOCATION_COLUMNS}
+        row["is_case_allocation"] = int(bool(row["is_case_allocation"]))
+        return row
+
+
+    @staticmethod
+    def _user_row(record: dict) -> dict:
+        return {column: record.get(column) for column in USER_COLUMNS}
+
+
+    @staticmethod
+    def _doable_record(row: sqlite3.Row) -> dict:
+        return {column: row[column] for column in DOABLE_COLUMNS}
+
+
+    def load_doables(self, include_completed: bool = True) -> Iterator[dict]:
+        """
+        Load stored Doable records, optionally leaving out completed ones.
+        """
+        where = "" if include_completed else " WHERE status != 'completed'"
+        for row in self._query(f"SELECT {', '.join(DOABLE_COLUMNS)} FROM doables{where}"):
+            yield self._doable_record(row)
+
+
+    def get_doable(self, doable_id: str) -> Optional[dict]:
+        """
+        Retrieve a stored Doable record by its ID.
+        """
+        rows = self._query(f"SELECT {', '.join(DOABLE_COLUMNS)} FROM doables WHERE id = ?", (doable_id,))
+        return self._doable_record(rows[0]) if rows else None
+
+
+    def get_doables_by_case(self, case_id: str, status: Optional[str] = None) -> List[dict]:
+        """
+        Retrieve the stored Doable records of a case, optionally only those with a status.
+        """
+        sql = f"SELECT {', '.join(DOABLE_COLUMNS)} FROM doables WHERE case_id = ?"
+        params = (case_id,)
+        if status:
+            sql += " AND status = ?"
+            params += (status,)
+        return [self._doable_record(row) for row in self._query(sql, params)]
+
+
+    def get_doables_by_status(self, status: str) -> List[dict]:
+        """
+        Retrieve the stored Doable records with a status.
+        """
+        rows = self._query(f"SELECT {', '.join(DOABLE_COLUMNS)} FROM doables WHERE status = ?", (status,))
+        return [self._doable_record(row) for row in rows]
+
+
+    def count_doables_by_case(self, status: str) -> Dict[str, int]:
+        """
+        Count the stored Doables with a status in each case.
+        """
+        rows = self._query(
+            "SELECT case_id, COUNT(*) AS count FROM doables WHERE status = ? AND case_id IS NOT NULL GROUP BY case_id",
+            (status,),
+        )
+        return {row["case_id"]: row["count"] for row in rows}
+
+
+    def max_message_number(self) -> int:
+        """
+        Return the highest number used in a "message_<n>" Doable ID.
+        """
+        rows = self._query(
+            "SELECT MAX(CAST(SUBSTR(id, 9) AS INTEGER)) AS number FROM doables WHERE id LIKE 'message\\_%' ESCAPE '\\'"
+        )
+        return rows[0]["number"] or 0
+
+
+    @staticmethod
+    def _allocation_record(row: sqlite3.Row) -> dict:
+        record = {column: row[column] for column in ALLOCATION_COLUMNS}
+        record["is_case_allocation"] = bool(record["is_case_allocation"])
+        return record
+
+
+    def load_allocations(self, include_completed: bool = True) -> Iterator[dict]:
+        """
+        Load stored Allocation records, optionally leaving out those of completed Doables.
+        """
+        columns = ", ".join(f"a.{column}" for column in ALLOCATION_COLUMNS)
+        sql = f"SELECT {columns} FROM allocations a"
+        if not include_completed:
+            sql += " LEFT JOIN doables d ON d.id = a.doable_id WHERE d.status IS NOT 'completed'"
+        for row in self._query(sql):
+            yield self._allocation_record(row)
+
+
+    def get_allocation(self, doable_id: str) -> Optional[dict]:
+        """
+        Retrieve a stored Allocation record by its doable ID.
+        """
+        rows = self._query(f"SELECT {', '.join(ALLOCATION_COLUMNS)} FROM allocations WHERE doable_id = ?", (doable_id,))
+        return self._allocation_record(rows[0]) if rows else None
+
+
+    def get_completed_allocations(self, user_id: Optional[str] = None) -> List[dict]:
+        """
+        Retrieve the stored Allocation records of completed Doables, optionally only those of a user.
+        """
+        columns = ", ".join(f"a.{column}" for column in ALLOCATION_COLUMNS)
+        sql = f"SELECT {columns} FROM allocations a JOIN doables d ON d.id = a.doable_id WHERE d.status = 'completed'"
+        params = ()
+        if user_id is not None:
+            sql += " AND a.user_id = ?"
+            params = (user_id,)
+        return [self._allocation_record(row) for row in self._query(sql, params)]
+
+
+    def load_users(self) -> Iterator[dict]:
+        """
+        Load stored User records.
+        """
+        for row in self._query(f"SELECT {', '.join(USER_COLUMNS)} FROM users"):
+            yield {column: row[column] for column in USER_COLUMNS}
+
+
+    def close(self):
+        """
+        Commit staged changes and close the connection.
+        """
+        self.commit()
+        with self._lock:
+            self._connection.close()
@@ -1,18 +1,26 @@
 import json
 from models.user import User
-from typing import List
+from services.metrics import timed
+from services.sqlite_storage import SqliteStorage
+from typing import List, Optional
 
 class UserManager:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, storage: Optional[SqliteStorage] = None):
         """
         Manages user creation, retrieval, and storage.
 
         :param file_path: Path to the JSON file containing user data.
+        :param storage: SQLite storage to load users from instead of the JSON file.
         """
         self.file_path = file_path
+        self.storage = storage
         self.users = {}
-        self._load_users_from_file()
+        if self.storage:
+            self._load_users_from_storage()
+        else:
+            self._load_users_from_file()
 
+    @timed("UserManager._load_users_from_file")
     def _load_users_from_file(self):
         """
         Load users from JSON file into memory.
@@ -28,6 +36,15 @@ class UserManager:
         except json.JSONDecodeError:
             print("Invalid JSON format in user data file.")
 
+    @timed("UserManager._load_users_from_storage")
+    def _load_users_from_storage(self):
+        """
+        Load users from storage into memory.
+        """
+        for user_data in self.storage.load_users():
+            user = User.from_dict(user_data)
+            self.users[user.id] = user
+
     def get_user(self, user_id: str) -> User:
         """
         Retrieve a user by their ID.
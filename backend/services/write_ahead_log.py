@@ -0,0 +1,123 @@
+from typing import Callable, Iterator, List, Tuple
+import json
+import os
+import threading
+
+class WriteAheadLog:
+    def __init__(self, file_path: str, checkpoint_every: int = 1000, sync: bool = True):
+        """
+        Append-only log of the changes made to a manager since its last snapshot.
+
+        :param file_path: Path to the log file. While a checkpoint is running, the log being
+                          checkpointed is kept next to it with an ".old" suffix.
+        :param checkpoint_every: Number of logged records after which a checkpoint is due.
+        :param sync: Whether to fsync the log after each flush.
+        """
+        self.file_path = file_path
+        self.rotated_path = f"{file_path}.old"
+        self.checkpoint_every = checkpoint_every
+        self.sync = sync
+        self.record_count = 0
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._checkpoint_thread = None
+
+
+    def append(self, op: str, data: dict):
+        """
+        Buffer a change record until the next flush.
+        """
+        record = json.dumps({"op": op, "data": data}, separators=(",", ":"))
+        with self._lock:
+            self._buffer.append(record)
+
+
+    def flush(self):
+        """
+        Append all buffered records to the log in a single write.
+        """
+        with self._lock:
+            if not self._buffer:
+                return
+            with open(self.file_path, "a") as file:
+                file.write("\n".join(self._buffer) + "\n")
+                file.flush()
+                if self.sync:
+                    os.fsync(file.fileno())
+            self.record_count += len(self._buffer)
+            self._buffer.clear()
+
+
+    def replay(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Yield the (op, data) records of the log being checkpointed, if any, and then of the current log.
+        Reading stops at the first incomplete record, which is what a crash mid-write leaves behind,
+        and the log is truncated there, so that records appended later are not lost behind it.
+        """
+        self.record_count = 0
+        for path in (self.rotated_path, self.file_path):
+            try:
+                with open(path, "rb+") as file:
+                    offset = 0
+                    for line in file:
+                        try:
+                            if not line.endswith(b"\n"):
+                                raise ValueError("Incomplete record.")
+                            record = json.loads(line)
+                        except ValueError:  # includes json.JSONDecodeError
+                            file.truncate(offset)
+                            break
+                        offset += len(line)
+                        self.record_count += 1
+                        yield record["op"], record["data"]
+            except FileNotFoundError:
+                continue
+
+
+    def checkpoint_due(self) -> bool:
+        """
+        Check whether enough records have been logged to warrant a checkpoint.
+        """
+        running = self._checkpoint_thread is not None and self._checkpoint_thread.is_alive()
+        return not running and self.record_count >= self.checkpoint_every
+
+
+    def checkpoint(self, write_snapshot: Callable[[], None], background: bool = True):
+        """
+        Rotate the log and write a snapshot, then discard the rotated log.
+
+        The snapshot must reflect at least every change in the rotated log. Changes made
+        while it is being written go to the new log, and replaying them on top of a
+        snapshot that already contains them is harmless. A checkpoint still running is
+        waited for first, so that two never write the snapshot at once.
+        """
+        self.wait()
+        with self._lock:
+            if os.path.exists(self.file_path):
+                if os.path.exists(self.rotated_path):
+                    # A previous checkpoint did not finish, so carry its log forward
+                    with open(self.file_path, "r") as current, open(self.rotated_path, "a") as rotated:
+                        rotated.write(current.read())
+                    os.remove(self.file_path)
+                else:
+                    os.replace(self.file_path, self.rotated_path)
+            self.record_count = 0
+
+        def run():
+            write_snapshot()
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+
+        if background:
+            self._checkpoint_thread = threading.Thread(target=run, daemon=True)
+            self._checkpoint_thread.start()
+        else:
+            run()
+
+
+    def wait(self):
+        """
+        Wait for a running checkpoint to finish.
+        """
+        if self._checkpoint_thread is not None:
+            self._checkpoint_thread.join()
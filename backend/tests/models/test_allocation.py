@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
 from models.allocation import Allocation
+from utils import convert_dict_keys_to_camel_case
 
 def test_allocation_creation():
     """
@@ -122,3 +123,11 @@ def test_allocation_invalid_status_in_dict():
     
     with pytest.raises(ValueError, match="is_case_allocation must be a boolean value."):
         Allocation.from_dict(data)
+
+def test_allocation_to_camel_dict():
+    """
+    Test that to_camel_dict matches converting the keys of to_dict to camelCase.
+    """
+    allocation = Allocation(doable_id="123", user_id="456", is_case_allocation=True)
+
+    assert allocation.to_camel_dict() == convert_dict_keys_to_camel_case(allocation.to_dict())
@@ -1,7 +1,9 @@
 import pytest
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 from uuid import uuid4
 from models.doable import Doable
+from utils import convert_dict_keys_to_camel_case
 
 def test_doable_from_dict_valid():
     """
@@ -197,4 +199,37 @@ def test_doable_from_dict_missing_id():
     }
 
     with pytest.raises(KeyError):
-        Doable.from_dict(data)
\ No newline at end of file
+        Doable.from_dict(data)
+
+
+def test_doable_to_camel_dict():
+    """
+    Test that to_camel_dict matches converting the keys of to_dict to camelCase.
+    """
+    doable = Doable(id="task_1_case_1", title="Test Task", case_id="case_1", priority="high")
+
+    assert doable.to_camel_dict() == convert_dict_keys_to_camel_case(doable.to_dict())
+
+
+def test_doable_is_compact():
+    """
+    Test that Doables have no per-instance __dict__ and share repeated strings.
+    """
+    first = Doable.from_dict(json.loads('{"id": "message_1", "title": "A", "case_id": "case_1", "created_at": "2024-01-01T00:00:00"}'))
+    second = Doable.from_dict(json.loads('{"id": "message_2", "title": "B", "case_id": "case_1", "created_at": "2024-01-01T00:00:00"}'))
+
+    assert not hasattr(first, "__dict__")
+    assert first.case_id is second.case_id
+    assert first.status is second.status
+
+
+def test_doable_created_at_with_timezone():
+    """
+    Tests that a created_at with a timezone is converted to naive local time, and that anything else is rejected.
+    """
+    doable = Doable(id="message_1", title="Test", type="email", created_at="2025-01-26T12:00:00+00:00")
+
+    assert doable.created_at.tzinfo is None
+    assert doable.created_at == datetime(2025, 1, 26, 12, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    with pytest.raises(ValueError):
+        Doable(id="message_2", title="Test", type="email", created_at=5)
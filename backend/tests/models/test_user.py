@@ -1,5 +1,6 @@
 import pytest
 from models.user import User
+from utils import convert_dict_keys_to_camel_case
 from uuid import uuid4
 
 def test_user_auto_generate_id():
@@ -184,4 +185,13 @@ def test_to_dict_method_with_missing_optional_fields():
         "last_name": None,
         "preferred_doable_type": None,
     }
-    assert user_dict == expected_dict
\ No newline at end of file
+    assert user_dict == expected_dict
+
+
+def test_user_to_camel_dict():
+    """
+    Test that to_camel_dict matches converting the keys of to_dict to camelCase.
+    """
+    user = User(id="456", user_name="janedoe", first_name="Jane", preferred_doable_type="email")
+
+    assert user.to_camel_dict() == convert_dict_keys_to_camel_case(user.to_dict())
@@ -5,6 +5,7 @@ from models.allocation import Allocation
 from models.doable import Doable
 from models.user import User
 from services.allocation_manager import AllocationManager
+from utils import encode_cursor
 
 @pytest.fixture
 def mock_doables_data():
@@ -33,12 +34,18 @@ def setup_manager(mock_doables_data, mock_users_data, mock_allocations_data):
     user_manager = MagicMock()
     allocation_manager = AllocationManager(doable_manager, user_manager, "mock_file.json")
 
-    doable_manager.get_doable.side_effect = lambda doable_id: Doable.from_dict(next(doable for doable in mock_doables_data if doable["id"] == doable_id))
-    user_manager.get_user.side_effect = lambda user_id: User.from_dict(next(user for user in mock_users_data if user["id"] == user_id))
+    doable_manager.get_doable.side_effect = lambda doable_id: next(
+        (Doable.from_dict(doable) for doable in mock_doables_data if doable["id"] == doable_id), None
+    )
+    user_manager.get_user.side_effect = lambda user_id: next(
+        (User.from_dict(user) for user in mock_users_data if user["id"] == user_id), None
+    )
     doable_manager.get_doables_by_case.side_effect = lambda case_id: [Doable.from_dict(d) for d in mock_doables_data if d["case_id"] == case_id]
 
     allocation_manager._load_from_file = MagicMock()
-    allocation_manager.allocations = {allocation['doable_id']: Allocation.from_dict(allocation) for allocation in mock_allocations_data}
+    allocation_manager.allocations = {}
+    for allocation in mock_allocations_data:
+        allocation_manager._add_allocation(Allocation.from_dict(allocation))
 
     return allocation_manager
 
@@ -76,7 +83,7 @@ def test_allocate_by_doable(setup_manager):
    
    assert allocation.doable_id == mock_doable.id
    assert allocation.user_id == user_id
-   setup_manager.doable_manager.update_doable.assert_called_with(mock_doable.id, status="allocated")
+   setup_manager.doable_manager.compare_and_set_status.assert_called_with(mock_doable.id, "pending", "allocated")
 
 
 def test_allocate_by_case(setup_manager):
@@ -97,12 +104,13 @@ def test_allocate_by_case(setup_manager):
        }) for i in range(1,4)
    ]
    
-   setup_manager.doable_manager.get_doables_grouped_by_case.return_value = {
-       "case_1": mock_case_doables
-   }
+   setup_manager.doable_manager.get_oldest_pending_case.return_value = "case_1"
+   setup_manager.doable_manager.get_doables_by_case.side_effect = None
+   setup_manager.doable_manager.get_doables_by_case.return_value = mock_case_doables
    
    allocations = setup_manager.allocate_by_case(user_id, doable_type)
    
+   setup_manager.doable_manager.get_oldest_pending_case.assert_called_once_with(doable_type)
    assert len(allocations) == 3
    for i, allocation in enumerate(allocations):
        assert allocation.doable_id == f"task_{i+1}"
@@ -110,6 +118,36 @@ def test_allocate_by_case(setup_manager):
        assert allocation.is_case_allocation
 
 
+def test_allocate_by_case_falls_back_to_oldest_case(setup_manager):
+    """
+    Test allocating the oldest case of any type when no case matches the preferred type.
+    """
+    mock_doable = Doable.from_dict({
+        "id": "message_1",
+        "title": "Test Email",
+        "type": "email",
+        "case_id": "case_2",
+        "created_at": "2025-01-01T00:00:00"
+    })
+    setup_manager.doable_manager.get_oldest_pending_case.side_effect = lambda type=None: None if type else "case_2"
+    setup_manager.doable_manager.get_doables_by_case.side_effect = None
+    setup_manager.doable_manager.get_doables_by_case.return_value = [mock_doable]
+
+    allocations = setup_manager.allocate_by_case("user_1", "task")
+
+    assert [allocation.doable_id for allocation in allocations] == ["message_1"]
+    assert allocations[0].is_case_allocation
+
+
+def test_allocate_by_case_no_cases(setup_manager):
+    """
+    Test that no allocations are made when there are no fully pending cases.
+    """
+    setup_manager.doable_manager.get_oldest_pending_case.return_value = None
+
+    assert setup_manager.allocate_by_case("user_1", "task") == []
+
+
 def test_allocate_related_doables(setup_manager):
     """
     Test successful allocation of related doables in a case.
@@ -135,7 +173,7 @@ def test_allocate_related_doables(setup_manager):
     for allocation, doable in zip(allocations, mock_doables):
         assert allocation.doable_id == doable.id
         assert allocation.user_id == user_id
-        setup_manager.doable_manager.update_doable.assert_any_call(doable.id, status="allocated")
+        setup_manager.doable_manager.compare_and_set_status.assert_any_call(doable.id, "pending", "allocated")
 
 
 def test_save_allocations(setup_manager, mock_allocations_data):
@@ -145,9 +183,160 @@ def test_save_allocations(setup_manager, mock_allocations_data):
     with patch("builtins.open", mock_open(read_data=json.dumps(mock_allocations_data))):
         setup_manager._load_from_file()
 
-    with patch("builtins.open", mock_open()) as mock_file:
+    with patch("builtins.open", mock_open()) as mock_file, patch("utils.os.fsync"), patch("utils.os.replace") as mock_replace:
         setup_manager.save_allocations()
 
         written_data = ''.join(call.args[0] for call in mock_file().write.call_args_list)
         expected_data = json.dumps([allocation.to_dict() for allocation in setup_manager.allocations.values()], indent=4)
-        assert written_data == expected_data
\ No newline at end of file
+        assert written_data == expected_data
+        mock_file.assert_any_call(f"{setup_manager.file_path}.tmp", "w")
+        mock_replace.assert_called_once_with(f"{setup_manager.file_path}.tmp", setup_manager.file_path)
+
+
+def test_get_allocations_by_user(setup_manager):
+    """
+    Test that the user index follows allocations as they are made and deleted.
+    """
+    mock_doables = [
+        Doable.from_dict({
+            "id": f"task_{i}_case_3",
+            "title": f"Test Task {i}",
+            "type": "task",
+            "status": "pending",
+            "case_id": "case_3",
+            "created_at": f"2025-01-0{i}T00:00:00",
+        }) for i in range(1, 3)
+    ]
+    setup_manager.doable_manager.get_doables_by_case.side_effect = None
+    setup_manager.doable_manager.get_doables_by_case.return_value = mock_doables
+
+    setup_manager.allocate_related_doables("user_2", "case_3")
+
+    assert [a.doable_id for a in setup_manager.get_allocations_by_user("user_1")] == ["task_1_case_1"]
+    assert [a.doable_id for a in setup_manager.get_allocations_by_user("user_2")] == ["task_1_case_3", "task_2_case_3"]
+
+    setup_manager.delete_allocation("task_1_case_3")
+
+    assert [a.doable_id for a in setup_manager.get_allocations_by_user("user_2")] == ["task_2_case_3"]
+    assert setup_manager.get_allocations_by_user("unknown_user") == []
+
+
+def test_get_open_doables_by_user(setup_manager, mock_doables_data):
+    """
+    Test that completed doables are left out of a user's open doables.
+    """
+    mock_doables_data[0]["status"] = "allocated"
+    mock_doables_data[1]["status"] = "completed"
+    setup_manager._add_allocation(Allocation(doable_id="task_2_case_1", user_id="user_1"))
+
+    open_doables = setup_manager.get_open_doables_by_user("user_1")
+
+    assert [doable.id for doable in open_doables] == ["task_1_case_1"]
+
+
+def test_allocate_bulk(setup_manager):
+    """
+    Test that users take turns until each has its count or nothing is left.
+    """
+    mock_doables = [
+        Doable.from_dict({
+            "id": f"task_{i}",
+            "title": f"Test Task {i}",
+            "type": "task",
+            "created_at": f"2025-01-0{i}T00:00:00"
+        }) for i in range(1, 4)
+    ]
+    setup_manager.doable_manager.get_oldest_doable_by_type.side_effect = mock_doables + [None, None]
+
+    allocations = setup_manager.allocate_bulk([
+        {"user_id": "user_1", "count": 5},
+        {"user_id": "user_2", "mode": "single", "count": 1},
+    ])
+
+    assert [(a.user_id, a.doable_id) for a in allocations] == [
+        ("user_1", "task_1"),
+        ("user_2", "task_2"),
+        ("user_1", "task_3"),
+    ]
+    setup_manager.doable_manager.get_oldest_doable_by_type.assert_any_call("task")
+    setup_manager.doable_manager.get_oldest_doable_by_type.assert_any_call(None)
+
+
+def test_allocate_bulk_by_case(setup_manager):
+    """
+    Test bulk allocation of whole cases.
+    """
+    setup_manager.doable_manager.get_oldest_pending_case.side_effect = ["case_1", None, None]
+
+    allocations = setup_manager.allocate_bulk([{"user_id": "user_1", "mode": "case", "count": 2}])
+
+    assert [a.doable_id for a in allocations] == ["task_1_case_1", "task_2_case_1"]
+    assert all(a.is_case_allocation for a in allocations)
+
+
+@pytest.mark.parametrize("request_data", [
+    {"user_id": "unknown_user"},
+    {"user_id": "user_1", "mode": "everything"},
+    {"user_id": "user_1", "count": 0},
+])
+def test_allocate_bulk_invalid_request(setup_manager, request_data):
+    """
+    Test that invalid requests are rejected before anything is allocated.
+    """
+    setup_manager.user_manager.get_user.side_effect = lambda user_id: None if user_id == "unknown_user" else User(user_name="u", first_name="U", id=user_id)
+
+    with pytest.raises(ValueError):
+        setup_manager.allocate_bulk([{"user_id": "user_2"}, request_data])
+
+    setup_manager.doable_manager.get_oldest_doable_by_type.assert_not_called()
+
+
+def test_query_allocation_view_pages_with_cursor(setup_manager, mock_doables_data):
+    """
+    Test paging through filtered allocations with a cursor.
+    """
+    setup_manager.doable_manager.get_doables_by_status.side_effect = lambda status: [
+        Doable.from_dict(d) for d in mock_doables_data if d["status"] == status
+    ]
+    for doable_id in ("task_2_case_1", "task_3_case_2"):
+        setup_manager._add_allocation(Allocation(doable_id=doable_id, user_id="user_2"))
+
+    first_page, cursor = setup_manager.query_allocation_view(statuses=["pending"], limit=2)
+    second_page, last_cursor = setup_manager.query_allocation_view(statuses=["pending"], cursor=cursor, limit=2)
+
+    assert [row["doable_id"] for row in first_page] == ["task_1_case_1", "task_2_case_1"]
+    assert [row["doable_id"] for row in second_page] == ["task_3_case_2"]
+    assert last_cursor is None
+
+
+def test_query_allocation_view_filters(setup_manager):
+    """
+    Test filtering allocations by user, case and title.
+    """
+    for doable_id in ("task_2_case_1", "task_3_case_2"):
+        setup_manager._add_allocation(Allocation(doable_id=doable_id, user_id="user_2"))
+
+    by_user, _ = setup_manager.query_allocation_view(user_id="user_2")
+    by_case, _ = setup_manager.query_allocation_view(case_id="case_1", user_id="user_2")
+    by_title, _ = setup_manager.query_allocation_view(title="task 3")
+
+    assert [row["doable_id"] for row in by_user] == ["task_2_case_1", "task_3_case_2"]
+    assert [row["doable_id"] for row in by_case] == ["task_2_case_1"]
+    assert [row["doable_id"] for row in by_title] == ["task_3_case_2"]
+    with pytest.raises(ValueError):
+        setup_manager.query_allocation_view(cursor="not-a-cursor")
+
+
+@pytest.mark.parametrize("key", [
+    [True, "2025-01-01T00:00:00", "task_1_case_1"],
+    [0, "2025-01-01T00:00:00", None],
+    [0, "2025-01-01T00:00:00", ["task_1_case_1"]],
+    [0, "not-a-date", "task_1_case_1"],
+    {"rank": 0, "created_at": "2025-01-01T00:00:00", "doable_id": "task_1_case_1"},
+])
+def test_query_allocation_view_rejects_crafted_cursor(setup_manager, key):
+    """
+    Test that a well-formed cursor holding anything but a sort key of the view is rejected.
+    """
+    with pytest.raises(ValueError):
+        setup_manager.query_allocation_view(cursor=encode_cursor(key))
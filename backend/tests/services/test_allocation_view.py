@@ -0,0 +1,97 @@
+import pytest
+from models.allocation import Allocation
+from models.doable import Doable
+from models.user import User
+from services.allocation_view import AllocationView
+
+@pytest.fixture
+def mock_doables():
+    return [
+        Doable(id="task_1_case_1", title="Test Task 1", case_id="case_1", priority="medium", created_at="2025-01-01T00:00:00"),
+        Doable(id="task_2_case_1", title="Test Task 2", case_id="case_1", priority="low", created_at="2025-01-02T00:00:00"),
+        Doable(id="task_3_case_2", title="Test Task 3", case_id="case_2", priority="high", created_at="2025-01-03T00:00:00"),
+    ]
+
+@pytest.fixture
+def view(mock_doables):
+    view = AllocationView()
+    user = User(id="user_1", user_name="test_user", first_name="Test", last_name="User")
+    for doable in mock_doables:
+        doable.status = "allocated"
+        view.put(Allocation(doable_id=doable.id, user_id=user.id), doable, user)
+    return view
+
+
+def test_page_is_sorted_by_priority_and_age(view):
+    """
+    Test that rows are returned by priority, then age, one page at a time.
+    """
+    first_page, last_key = view.page(limit=2)
+    second_page, next_key = view.page(after=last_key, limit=2)
+
+    assert [row["doable_id"] for row in first_page] == ["task_3_case_2", "task_1_case_1"]
+    assert [row["doable_id"] for row in second_page] == ["task_2_case_1"]
+    assert next_key is None
+
+
+def test_update_doable_moves_row(view, mock_doables):
+    """
+    Test that a changed doable's row is patched and moved in the sorted indexes.
+    """
+    doable = mock_doables[1]
+    doable.priority = "high"
+    doable.status = "completed"
+    view.update_doable(doable)
+
+    rows, _ = view.page()
+    completed, _ = view.page(statuses=["completed"])
+    allocated, _ = view.page(statuses=["allocated"])
+
+    assert [row["doable_id"] for row in rows] == ["task_2_case_1", "task_3_case_2", "task_1_case_1"]
+    assert [row["doable_id"] for row in completed] == ["task_2_case_1"]
+    assert [row["doable_id"] for row in allocated] == ["task_3_case_2", "task_1_case_1"]
+
+
+def test_update_doable_ignores_unallocated(view):
+    """
+    Test that changes to doables without an allocation leave the view alone.
+    """
+    view.update_doable(Doable(id="task_4_case_3", title="Test Task 4", case_id="case_3"))
+
+    assert len(view.page()[0]) == 3
+
+
+def test_remove(view):
+    """
+    Test that a removed allocation disappears from every index.
+    """
+    view.remove("task_3_case_2")
+
+    assert [row["doable_id"] for row in view.page()[0]] == ["task_1_case_1", "task_2_case_1"]
+    assert view.page(case_id="case_2")[0] == []
+    assert view.page(user_id="user_1")[0][0]["doable_id"] == "task_1_case_1"
+
+
+def test_grouped_by_case(view):
+    """
+    Test that rows are grouped by case, with the case holding the most urgent row first.
+    """
+    groups = view.grouped_by_case()
+
+    assert [case_id for case_id, _ in groups] == ["case_2", "case_1"]
+    assert [row["doable_id"] for row in groups[1][1]] == ["task_1_case_1", "task_2_case_1"]
+    assert [case_id for case_id, _ in view.grouped_by_case(title="task 2")] == ["case_1"]
+
+
+def test_grouped_by_case_with_caseless_doable(view):
+    """
+    Test that doables without a case are grouped on their own, rather than with every row.
+    """
+    doable = Doable(id="message_1", title="Test email", type="email", priority="low", created_at="2025-01-04T00:00:00")
+    user = User(id="user_1", user_name="test_user", first_name="Test", last_name="User")
+    view.put(Allocation(doable_id=doable.id, user_id=user.id), doable, user)
+
+    groups = dict(view.grouped_by_case())
+
+    assert [row["doable_id"] for row in groups[None]] == ["message_1"]
+    assert sum(len(rows) for rows in groups.values()) == 4
@@ -0,0 +1,161 @@
+import pytest
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from models.allocation import Allocation
+from services.allocation_manager import AllocationManager
+from services.archive import ArchiveManager
+from services.doable_manager import DoableManager
+from services.write_ahead_log import WriteAheadLog
+
+@pytest.fixture
+def mock_doables_data():
+    return [
+        {
+            "id": "task_1_case_1",
+            "title": "Test Task 1",
+            "case_id": "case_1",
+            "type": "task",
+            "priority": "low",
+            "status": "completed",
+            "created_at": "2024-01-02T00:00:00",
+        },
+        {
+            "id": "message_7",
+            "title": "Test email 1",
+            "case_id": "case_1",
+            "type": "email",
+            "priority": "high",
+            "status": "completed",
+            "created_at": "2024-02-01T00:00:00",
+        },
+        {
+            "id": "task_1_case_2",
+            "title": "Test Task 1",
+            "case_id": "case_2",
+            "type": "task",
+            "priority": "low",
+            "status": "completed",
+            "created_at": "2024-01-03T00:00:00",
+        },
+        {
+            "id": "task_2_case_2",
+            "title": "Test Task 2",
+            "case_id": "case_2",
+            "type": "task",
+            "priority": "low",
+            "status": "pending",
+            "created_at": "2024-01-04T00:00:00",
+        },
+    ]
+
+@pytest.fixture
+def managers(tmp_path, mock_doables_data):
+    (tmp_path / "doables.json").write_text(json.dumps(mock_doables_data))
+    doable_manager = DoableManager(str(tmp_path / "doables.json"))
+    allocation_manager = AllocationManager(doable_manager, MagicMock(), str(tmp_path / "allocations.json"))
+    allocation_manager.restore_allocations([Allocation(doable_id="message_7", user_id="user_1")])
+    archive_manager = ArchiveManager(str(tmp_path / "archive"), doable_manager, allocation_manager)
+    return doable_manager, allocation_manager, archive_manager
+
+
+def test_archive_completed_cases(managers):
+    """
+    Test that only cases whose doables are all completed and old enough are archived, by month of creation.
+    """
+    doable_manager, allocation_manager, archive_manager = managers
+
+    archived = archive_manager.archive_completed(datetime(2025, 1, 1))
+
+    assert archived == {"2024-01": 1, "2024-02": 1}
+    assert set(doable_manager.doables) == {"task_1_case_2", "task_2_case_2"}
+    assert "message_7" not in allocation_manager.allocations
+    assert archive_manager.partitions() == [
+        {"partition": "2024-01", "doables": 1, "allocations": 0},
+        {"partition": "2024-02", "doables": 1, "allocations": 1},
+    ]
+    assert archive_manager.read_partition("2024-02")["allocations"][0]["user_id"] == "user_1"
+    assert archive_manager.archive_completed(datetime(2024, 1, 3)) == {}
+
+
+def test_archive_respects_retention(managers):
+    """
+    Test that a case is held back while any of its doables is newer than the threshold.
+    """
+    doable_manager, _, archive_manager = managers
+
+    assert archive_manager.archive_completed(datetime(2024, 1, 15)) == {}
+    assert len(doable_manager.doables) == 4
+
+
+def test_failed_archive_write_removes_nothing(managers, tmp_path):
+    """
+    Test that doables and allocations stay in the managers and the data file if an archive file cannot be written.
+    """
+    doable_manager, allocation_manager, archive_manager = managers
+
+    with patch.object(ArchiveManager, "_write_partition", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            archive_manager.archive_completed(datetime(2025, 1, 1))
+
+    assert len(doable_manager.doables) == 4
+    assert "message_7" in allocation_manager.allocations
+    assert not doable_manager.dirty
+    assert archive_manager.partitions() == []
+    doable_manager.save_doables()
+    assert len(DoableManager(str(tmp_path / "doables.json")).doables) == 4
+
+
+def test_restore(managers):
+    """
+    Test that restoring a partition moves its doables and allocations back and removes the archive file.
+    """
+    doable_manager, allocation_manager, archive_manager = managers
+    archive_manager.archive_completed(datetime(2025, 1, 1))
+
+    assert archive_manager.restore("2024-02") == {"doables": 1, "allocations": 1}
+
+    assert doable_manager.get_doable("message_7").status == "completed"
+    assert allocation_manager.allocations["message_7"].user_id == "user_1"
+    assert [summary["partition"] for summary in archive_manager.partitions()] == ["2024-01"]
+    assert archive_manager.restore("2024-02") is None
+    with pytest.raises(ValueError):
+        archive_manager.read_partition("../doables")
+
+
+def test_archived_messages_keep_counter(managers, tmp_path):
+    """
+    Test that the message counter survives its messages being archived out of the data file.
+    """
+    doable_manager, _, archive_manager = managers
+    archive_manager.archive_completed(datetime(2025, 1, 1))
+    doable_manager.save_doables()
+
+    doable_manager = DoableManager(str(tmp_path / "doables.json"))
+    ArchiveManager(str(tmp_path / "archive"), doable_manager, MagicMock())
+
+    assert doable_manager.generate_id("Test email", "email") == "message_8"
+
+
+def test_removal_with_snapshot_and_write_ahead_log(tmp_path, mock_doables_data):
+    """
+    Test that doables removed from a snapshot stay removed across a restart and a checkpoint.
+    """
+    (tmp_path / "doables.json").write_text(json.dumps(mock_doables_data))
+    doable_path, snapshot_path, wal_path = (str(tmp_path / name) for name in ("doables.json", "doables.snapshot", "doables.json.log"))
+    DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path).checkpoint(background=False)
+
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    assert [doable.id for doable in manager.remove_doables(["task_1_case_1", "task_9"])] == ["task_1_case_1"]
+    assert manager.get_doable("task_1_case_1") is None
+    assert [doable.id for doable in manager.get_doables_by_case("case_1")] == ["message_7"]
+    manager.save_doables()
+
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    assert manager.get_doable("task_1_case_1") is None
+    assert manager._cold_case_counts == {"case_1": 1, "case_2": 1}
+    manager.checkpoint(background=False)
+    assert not manager._removed
+
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    assert len(manager.get_doables_by_status("completed")) == 2
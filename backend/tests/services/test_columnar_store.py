@@ -0,0 +1,84 @@
+import pytest
+from models.doable import Doable
+from services import columnar_store
+from services.columnar_store import ColumnarDoableStore
+from services.doable_manager import DoableManager
+
+@pytest.fixture(params=["numpy", "python"])
+def store(request, monkeypatch):
+    """
+    A store with a few doables, scanned with numpy if it is installed and in plain Python.
+    """
+    if request.param == "numpy" and columnar_store.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(columnar_store, "np", None)
+
+    store = ColumnarDoableStore()
+    store.extend([
+        Doable(id="message_1", title="Test email 1", case_id="case_1", type="email", priority="low", created_at="2024-01-01T00:00:00"),
+        Doable(id="message_2", title="Test email 2", case_id="case_2", type="email", priority="high", created_at="2024-01-03T00:00:00"),
+        Doable(id="task_1_case_1", title="Test Task 1", case_id="case_1", priority="high", created_at="2024-01-02T00:00:00"),
+        Doable(id="task_2_case_1", title="Test Task 2", case_id="case_1", status="completed", created_at="2023-12-01T00:00:00"),
+    ])
+    return store
+
+
+def test_get_doable_round_trips(store):
+    """
+    Test that a Doable built from its row equals the one stored.
+    """
+    doable = Doable(id="message_3", title="Test email 3", type="email", created_at="2024-02-01T12:34:56.789012")
+    store.put(doable)
+
+    assert store.get_doable(len(store) - 1) == doable
+    assert store.get_doable(0).case_id == "case_1"
+
+
+def test_counts(store):
+    """
+    Test counting by status and type.
+    """
+    counts = store.counts_by_status_and_type()
+
+    assert counts["pending"] == {"task": 1, "email": 2}
+    assert counts["allocated"] == {"task": 0, "email": 0}
+    assert counts["completed"] == {"task": 1, "email": 0}
+
+
+def test_put_updates_row(store):
+    """
+    Test that putting a stored Doable again updates its row.
+    """
+    store.put(Doable(id="message_2", title="Test email 2", case_id="case_2", type="email", priority="high",
+                     status="allocated", created_at="2024-01-03T00:00:00"))
+
+    assert len(store) == 4
+    assert store.get_doable(1).status == "allocated"
+    assert store.counts_by_status_and_type()["pending"] == {"task": 1, "email": 1}
+
+
+def test_remove(store):
+    """
+    Test that removing a row moves the last row into its place.
+    """
+    store.remove("message_1")
+    store.remove("message_9")
+
+    assert store.ids == ["task_2_case_1", "message_2", "task_1_case_1"]
+    assert store.get_doable(0).status == "completed"
+    assert store.counts_by_status_and_type()["pending"] == {"task": 1, "email": 1}
+    store.put(Doable(id="task_2_case_1", title="Test Task 2", case_id="case_1", status="allocated", created_at="2023-12-01T00:00:00"))
+    assert len(store) == 3 and store.counts_by_status_and_type()["allocated"]["task"] == 1
+
+
+def test_doable_manager_keeps_columns_up_to_date(tmp_path):
+    """
+    Test that a DoableManager with a columnar store counts from it as Doables change.
+    """
+    manager = DoableManager(str(tmp_path / "doables.json"), columns=ColumnarDoableStore())
+    manager.add_doable_instance(Doable(id="message_1", title="Test email 1", type="email"))
+    manager.update_doable("message_1", status="completed")
+
+    assert manager.get_doable_counts()["completed"]["email"] == 1
+    assert manager.get_doable_counts()["pending"]["email"] == 0
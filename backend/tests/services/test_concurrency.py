@@ -0,0 +1,142 @@
+import pytest
+import json
+import random
+import sys
+import threading
+from services.allocation_manager import AllocationManager
+from services.data_manager import DataManager
+from services.doable_manager import DoableManager
+from services.user_manager import UserManager
+
+THREADS = 16
+USERS = [f"user_{i}" for i in range(8)]
+
+@pytest.fixture
+def mock_data_dir(tmp_path):
+    doables = []
+    for case in range(60):
+        for i in range(3):
+            doables.append({
+                "id": f"task_{i}_{case}",
+                "title": f"Task {i}",
+                "case_id": f"case_{case}",
+                "type": "task" if i else "email",
+                "priority": random.choice(["low", "medium", "high"]),
+                "created_at": f"2024-01-{case % 28 + 1:02d}T{i:02d}:00:00",
+            })
+    for i in range(100):
+        doables.append({
+            "id": f"message_{i}",
+            "title": f"Email {i}",
+            "type": "email",
+            "priority": random.choice(["low", "medium", "high"]),
+            "created_at": f"2024-02-{i % 28 + 1:02d}T00:00:00",
+        })
+    users = [{"id": user_id, "user_name": user_id, "first_name": user_id} for user_id in USERS]
+
+    (tmp_path / "doables.json").write_text(json.dumps(doables))
+    (tmp_path / "users.json").write_text(json.dumps(users))
+    return tmp_path
+
+@pytest.fixture
+def managers(mock_data_dir):
+    doable_manager = DoableManager(str(mock_data_dir / "doables.json"))
+    user_manager = UserManager(str(mock_data_dir / "users.json"))
+    allocation_manager = AllocationManager(doable_manager, user_manager, str(mock_data_dir / "allocations.json"))
+    data_manager = DataManager(doable_manager, allocation_manager)
+    return doable_manager, allocation_manager, data_manager
+
+
+def run_threads(target):
+    errors = []
+
+    def run(index):
+        try:
+            target(index)
+        except Exception as e:  # surface failures from worker threads
+            errors.append(e)
+
+    # Switch threads as often as possible to shake out races
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
+
+
+def assert_consistent(doable_manager, allocation_manager):
+    for doable in doable_manager.doables.values():
+        assert (doable.status == "allocated") == (doable.id in allocation_manager.allocations), doable.id
+    indexed = [a.doable_id for user_id in USERS for a in allocation_manager.get_allocations_by_user(user_id)]
+    assert sorted(indexed) == sorted(allocation_manager.allocations)
+
+
+def test_concurrent_allocation_never_double_allocates(managers):
+    """
+    Test that doables handed out by concurrent single and case allocations are all distinct.
+    """
+    doable_manager, allocation_manager, data_manager = managers
+    allocated = []
+    lock = threading.Lock()
+
+    def allocate(index):
+        user_id = USERS[index % len(USERS)]
+        while True:
+            if index % 2:
+                allocations = allocation_manager.allocate_by_case(user_id, "task")
+            else:
+                allocation = allocation_manager.allocate_by_doable(user_id)
+                allocations = [allocation] if allocation else []
+            if not allocations:
+                return
+            data_manager.save_all()
+            with lock:
+                allocated.extend(allocation.doable_id for allocation in allocations)
+
+    run_threads(allocate)
+
+    assert len(allocated) == len(set(allocated)) == len(doable_manager.doables)
+    assert_consistent(doable_manager, allocation_manager)
+    for case_id in {doable.case_id for doable in doable_manager.doables.values() if doable.case_id}:
+        case_allocations = [allocation_manager.allocations[d.id] for d in doable_manager.get_doables_by_case(case_id)]
+        if any(allocation.is_case_allocation for allocation in case_allocations):
+            assert len({allocation.user_id for allocation in case_allocations}) == 1
+
+
+def test_concurrent_allocate_and_unallocate(managers, mock_data_dir):
+    """
+    Test that allocations and unallocations racing on the same doables leave consistent state behind.
+    """
+    doable_manager, allocation_manager, data_manager = managers
+    data_manager.commit_window = 0.01
+
+    def churn(index):
+        rng = random.Random(index)
+        user_id = USERS[index % len(USERS)]
+        for _ in range(200):
+            action = rng.random()
+            if action < 0.4:
+                allocation_manager.allocate_by_doable(user_id, rng.choice(["task", "email", None]))
+            elif action < 0.6:
+                allocation_manager.allocate_by_case(user_id)
+            elif action < 0.7:
+                allocation_manager.allocate_related_doables(user_id, f"case_{rng.randrange(60)}")
+            else:
+                try:
+                    allocation_manager.delete_allocation(rng.choice(list(doable_manager.doables)))
+                except ValueError:
+                    pass  # not allocated
+            data_manager.save_all()
+
+    run_threads(churn)
+    data_manager.flush()
+
+    assert_consistent(doable_manager, allocation_manager)
+    with open(mock_data_dir / "allocations.json") as file:
+        assert sorted(a["doable_id"] for a in json.load(file)) == sorted(allocation_manager.allocations)
@@ -0,0 +1,110 @@
+import pytest
+import threading
+import time
+from unittest.mock import MagicMock
+from services.data_manager import DataManager
+
+@pytest.fixture
+def mock_managers():
+    doable_manager = MagicMock()
+    allocation_manager = MagicMock()
+    doable_manager.dirty = True
+    allocation_manager.dirty = True
+    return doable_manager, allocation_manager
+
+
+def test_save_all_writes_immediately_without_window(mock_managers):
+    """
+    Test that saves are written straight away when no commit window is set.
+    """
+    doable_manager, allocation_manager = mock_managers
+    data_manager = DataManager(doable_manager, allocation_manager)
+
+    data_manager.save_all()
+
+    doable_manager.save_doables.assert_called_once()
+    allocation_manager.save_allocations.assert_called_once()
+
+
+def test_save_all_skips_clean_managers(mock_managers):
+    """
+    Test that managers without unsaved changes are not written.
+    """
+    doable_manager, allocation_manager = mock_managers
+    allocation_manager.dirty = False
+    data_manager = DataManager(doable_manager, allocation_manager)
+
+    data_manager.save_all()
+
+    doable_manager.save_doables.assert_called_once()
+    allocation_manager.save_allocations.assert_not_called()
+
+
+def test_save_all_groups_saves_within_window(mock_managers):
+    """
+    Test that saves requested within the commit window are written once, and that each
+    caller only returns once the save is written.
+    """
+    doable_manager, allocation_manager = mock_managers
+    data_manager = DataManager(doable_manager, allocation_manager, commit_window=0.05)
+
+    threads = [threading.Thread(target=data_manager.save_all) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    doable_manager.save_doables.assert_not_called()
+    assert all(thread.is_alive() for thread in threads)
+
+    for thread in threads:
+        thread.join(5)
+
+    doable_manager.save_doables.assert_called_once()
+    allocation_manager.save_allocations.assert_called_once()
+
+
+def test_save_all_raises_failed_save(mock_managers):
+    """
+    Test that the callers waiting on a batch get the error if writing it fails.
+    """
+    doable_manager, allocation_manager = mock_managers
+    doable_manager.save_doables.side_effect = OSError("disk full")
+    data_manager = DataManager(doable_manager, allocation_manager, commit_window=0.01)
+
+    with pytest.raises(OSError):
+        data_manager.save_all()
+
+
+def test_flush_writes_pending_saves(mock_managers):
+    """
+    Test that flush writes a held save straight away, releasing the caller waiting on it.
+    """
+    doable_manager, allocation_manager = mock_managers
+    data_manager = DataManager(doable_manager, allocation_manager, commit_window=60)
+
+    thread = threading.Thread(target=data_manager.save_all)
+    thread.start()
+    time.sleep(0.01)
+    data_manager.flush()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    doable_manager.save_doables.assert_called_once()
+    assert data_manager._timer is None
+
+
+def test_close_checkpoints_write_ahead_logs(mock_managers):
+    """
+    Test that close flushes and then checkpoints the managers that have a write-ahead log.
+    """
+    doable_manager, allocation_manager = mock_managers
+    allocation_manager.wal = None
+    data_manager = DataManager(doable_manager, allocation_manager)
+
+    data_manager.close()
+
+    doable_manager.save_doables.assert_called_once()
+    doable_manager.checkpoint.assert_called_once_with(background=False)
+    allocation_manager.checkpoint.assert_not_called()
+    # A running background checkpoint is waited for before the final one
+    calls = [name for name, _, _ in doable_manager.mock_calls]
+    assert calls.index("wal.wait") < calls.index("checkpoint")
@@ -302,9 +302,211 @@ def test_save_doables(setup_manager, mock_doables_data):
     with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
         setup_manager._load_from_file()
 
-    with patch("builtins.open", mock_open()) as mock_file:
+    with patch("builtins.open", mock_open()) as mock_file, patch("utils.os.fsync"), patch("utils.os.replace") as mock_replace:
         setup_manager.save_doables()
  
         written_data = ''.join(call.args[0] for call in mock_file().write.call_args_list)
         expected_data = json.dumps([doable.to_dict() for doable in setup_manager.doables.values()], indent=4)
-        assert written_data == expected_data
\ No newline at end of file
+        assert written_data == expected_data
+        mock_file.assert_any_call(f"{setup_manager.file_path}.tmp", "w")
+        mock_replace.assert_called_once_with(f"{setup_manager.file_path}.tmp", setup_manager.file_path)
+
+def test_get_oldest_doable_by_type_skips_allocated(setup_manager, mock_doables_data):
+    """
+    Test that a doable leaves the pending index once allocated and returns when unallocated.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    setup_manager.update_doable("message_1", status="allocated")
+    assert setup_manager.get_oldest_doable_by_type().id == "message_2"
+    assert setup_manager.get_oldest_doable_by_type(type="email").id == "message_2"
+
+    setup_manager.update_doable("message_1", status="pending")
+    assert setup_manager.get_oldest_doable_by_type().id == "message_1"
+
+
+def test_get_oldest_doable_by_type_after_add_and_priority_change(setup_manager, mock_doables_data):
+    """
+    Test that added doables and priority changes are reflected in the pending index.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    setup_manager.add_doable_instance(Doable.from_dict({
+        "id": "task_3_case_2",
+        "title": "Test Task 3",
+        "case_id": "case_2",
+        "type": "task",
+        "priority": "medium",
+        "created_at": "2023-01-01T00:00:00",
+    }))
+    assert setup_manager.get_oldest_doable_by_type(type="task").id == "task_3_case_2"
+
+    setup_manager.update_doable("task_1_case_1", priority="high")
+    assert setup_manager.get_oldest_doable_by_type(type="task").id == "task_1_case_1"
+    assert setup_manager.get_oldest_doable_by_type().id == "message_1"
+
+
+def test_get_oldest_doable_by_type_none_pending(setup_manager, mock_doables_data):
+    """
+    Test that None is returned once every doable of a type has been allocated.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    setup_manager.update_doable("task_1_case_1", status="allocated")
+    assert setup_manager.get_oldest_doable_by_type(type="task") is None
+
+
+def test_get_doables_by_case_follows_case_changes(setup_manager, mock_doables_data):
+    """
+    Test that the case index follows doables that are added or moved between cases.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    setup_manager.update_doable("task_1_case_1", case_id="case_2")
+
+    assert [doable.id for doable in setup_manager.get_doables_by_case("case_2")] == ["task_1_case_1"]
+    assert "task_1_case_1" not in [doable.id for doable in setup_manager.get_doables_by_case("case_1")]
+    assert set(setup_manager.get_doables_grouped_by_case()) == {"case_1", "case_2"}
+    assert setup_manager.get_doables_by_case("unknown_case") == []
+
+
+def test_get_doables_by_status(setup_manager, mock_doables_data):
+    """
+    Test retrieving doables by status as their status changes.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    assert [doable.id for doable in setup_manager.get_doables_by_status("completed")] == ["task_2_case_1"]
+
+    setup_manager.update_doable("message_1", status="allocated")
+
+    assert [doable.id for doable in setup_manager.get_doables_by_status("allocated")] == ["message_1"]
+    assert "message_1" not in [doable.id for doable in setup_manager.get_doables_by_status("pending")]
+
+
+def test_get_oldest_pending_case(setup_manager, mock_doables_data):
+    """
+    Test that only cases whose doables are all pending are returned, oldest first.
+    """
+    test_data = mock_doables_data + [
+        {
+            "id": "task_1_case_2",
+            "title": "Test Task 1",
+            "case_id": "case_2",
+            "type": "task",
+            "priority": "low",
+            "status": "pending",
+            "created_at": "2024-02-01T00:00:00",
+        },
+        {
+            "id": "message_3",
+            "title": "Test email 3",
+            "case_id": "case_3",
+            "type": "email",
+            "priority": "low",
+            "status": "pending",
+            "created_at": "2024-01-15T00:00:00",
+        },
+    ]
+    with patch("builtins.open", mock_open(read_data=json.dumps(test_data))):
+        setup_manager._load_from_file()
+
+    # case_1 has a completed doable, so it is never eligible
+    assert setup_manager.get_oldest_pending_case() == "case_3"
+    assert setup_manager.get_oldest_pending_case(type="task") == "case_2"
+    assert setup_manager.get_oldest_pending_case(type="email") == "case_3"
+
+    setup_manager.update_doable("message_3", status="allocated")
+    assert setup_manager.get_oldest_pending_case() == "case_2"
+    assert setup_manager.get_oldest_pending_case(type="email") is None
+
+    setup_manager.update_doable("message_3", status="pending")
+    assert setup_manager.get_oldest_pending_case(type="email") == "case_3"
+
+
+def test_add_doables_bulk(setup_manager, mock_doables_data):
+    """
+    Test adding many doables at once, skipping invalid and duplicate rows.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    rows = [
+        {"title": "Bulk task", "case_id": "case_9", "type": "task", "priority": "high"},
+        {"id": "message_1", "title": "Duplicate", "case_id": "case_1", "type": "email", "priority": "low"},
+        {"case_id": "case_9", "type": "task", "priority": "low"},
+        "not a doable",
+        {"title": "Bulk email", "case_id": "case_9", "type": "email", "priority": "medium"},
+    ]
+    added, errors = setup_manager.add_doables_bulk(rows, chunk_size=2)
+
+    assert added == 2
+    assert [error["row"] for error in errors] == [1, 2, 3]
+    assert setup_manager.get_doable("bulk_task_9").title == "Bulk task"
+    assert setup_manager.get_doable("message_3").title == "Bulk email"
+    assert setup_manager.get_oldest_doable_by_type("task").id == "bulk_task_9"
+
+
+def test_add_doables_bulk_with_message_ids(setup_manager, mock_doables_data):
+    """
+    Test that imported message IDs advance the message counter, and that rows with a timezone are
+    converted to local time rather than failing the import.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    rows = [
+        {"id": "message_463", "title": "Imported", "type": "email", "created_at": "2024-01-01T00:00:00+00:00"},
+        {"id": "message_465", "title": "Imported", "type": "email", "created_at": "2024-01-01T00:00:00"},
+        {"id": "message_466", "title": "Bad date", "type": "email", "created_at": 5},
+    ]
+    added, errors = setup_manager.add_doables_bulk(rows)
+
+    assert added == 2
+    assert [error["row"] for error in errors] == [2]
+    assert setup_manager.get_doable("message_463").created_at.tzinfo is None
+    assert setup_manager.generate_id("re: searches", "email") == "message_466"
+    assert setup_manager.get_oldest_doable_by_type("email") is not None
+
+
+def test_add_doable_instance_leaves_nothing_when_indexing_fails(setup_manager):
+    """
+    Test that a Doable that cannot be indexed is not left half-added.
+    """
+    doable = Doable(id="message_9", title="Test", type="email")
+    with patch.object(setup_manager, "_index_pending", side_effect=TypeError("cannot compare")):
+        with pytest.raises(TypeError):
+            setup_manager.add_doable_instance(doable)
+
+    assert setup_manager.get_doable("message_9") is None
+    assert "message_9" not in [d.id for d in setup_manager.get_doables_by_status("pending")]
+    setup_manager.add_doable_instance(doable)
+    assert setup_manager.get_doable("message_9") is doable
+
+
+def test_transition_status(setup_manager, mock_doables_data):
+    """
+    Test that legal status transitions update the indexes and illegal ones are rejected.
+    """
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_doables_data))):
+        setup_manager._load_from_file()
+
+    setup_manager.transition_status("message_1", "allocated")
+
+    assert setup_manager.get_doable("message_1").status == "allocated"
+    assert setup_manager.get_oldest_doable_by_type("email").id == "message_2"
+
+    setup_manager.transition_status("message_1", "completed")
+
+    assert "message_1" in [doable.id for doable in setup_manager.get_doables_by_status("completed")]
+    with pytest.raises(ValueError):
+        setup_manager.transition_status("message_1", "pending")
+    with pytest.raises(ValueError):
+        setup_manager.transition_status("message_2", "completed")
+    with pytest.raises(ValueError):
+        setup_manager.transition_status("non_existent_id", "allocated")
@@ -0,0 +1,151 @@
+import pytest
+import json
+import threading
+from unittest.mock import MagicMock
+from models.doable import Doable
+from services.allocation_manager import AllocationManager
+from services.doable_manager import DoableManager
+from services.event_bus import EventBus
+
+def test_since():
+    """
+    Test that readers get the events after the last one they saw, and None once those are no longer kept.
+    """
+    bus = EventBus(capacity=3)
+    for number in range(5):
+        bus.publish("doable.created", {"id": f"message_{number}"})
+
+    assert bus.last_id == 5
+    assert [event.id for event in bus.since(2)] == [3, 4, 5]
+    assert bus.since(5) == []
+    assert bus.since(1) is None
+    assert bus.since(6) is None  # from before a restart
+
+
+def test_since_without_kept_events():
+    """
+    Test that readers behind the latest event get None rather than an error when no events are kept.
+    """
+    bus = EventBus(capacity=0)
+    bus.publish("doable.created", {"id": "message_1"})
+
+    assert bus.since(1) == []
+    assert bus.since(0) is None
+    assert bus.wait(0, timeout=0.01) is None
+
+
+def test_wait_wakes_on_publish():
+    """
+    Test that a waiting reader is woken by a new event, and gets nothing if none is published in time.
+    """
+    bus = EventBus()
+    assert bus.wait(0, timeout=0.01) == []
+
+    timer = threading.Timer(0.05, bus.publish, ("doable.removed", {"id": "message_1"}))
+    timer.start()
+    events = bus.wait(0, timeout=5)
+    timer.join()
+
+    assert [(event.id, event.type) for event in events] == [(1, "doable.removed")]
+
+
+def test_to_sse():
+    """
+    Test that an event is formatted as a server-sent event.
+    """
+    bus = EventBus()
+    bus.publish("doable.status", {"id": "message_1", "status": "allocated"})
+    frame = bus.since(0)[0].to_sse()
+
+    assert frame.startswith("id: 1\nevent: doable.status\ndata: ")
+    assert frame.endswith("\n\n")
+    assert json.loads(frame.splitlines()[2][len("data: "):]) == {"id": "message_1", "status": "allocated"}
+
+
+@pytest.fixture
+def managers(tmp_path):
+    (tmp_path / "doables.json").write_text(json.dumps([{
+        "id": "case_setup_1",
+        "title": "set up the case",
+        "case_id": "case_1",
+        "type": "task",
+        "priority": "low",
+        "status": "pending",
+        "created_at": "2024-01-02T00:00:00",
+    }]))
+    bus = EventBus()
+    doable_manager = DoableManager(str(tmp_path / "doables.json"), events=bus)
+    allocation_manager = AllocationManager(doable_manager, MagicMock(), str(tmp_path / "allocations.json"), events=bus)
+    return bus, doable_manager, allocation_manager
+
+
+def test_managers_publish_changes(managers):
+    """
+    Test that allocating, unallocating, status changes and new and removed doables are published, in order.
+    """
+    bus, doable_manager, allocation_manager = managers
+    assert bus.last_id == 0  # loading publishes nothing
+
+    allocation_manager.allocate_by_doable("user_1")
+    allocation_manager.delete_allocation("case_setup_1")
+    doable_manager.add_doable_instance(Doable.from_dict({
+        "id": "message_1", "title": "re: searches", "case_id": None, "type": "email",
+        "priority": "high", "status": "pending", "created_at": "2024-01-03T00:00:00",
+    }))
+    doable_manager.remove_doables(["message_1"])
+
+    events = bus.since(0)
+    assert [event.type for event in events] == [
+        "doable.status", "allocation.created", "doable.status", "allocation.deleted", "doable.created", "doable.removed",
+    ]
+    assert events[0].data == {"id": "case_setup_1", "caseId": "case_1", "status": "allocated", "previousStatus": "pending"}
+    assert events[1].data["userId"] == "user_1"
+    assert events[3].data == {"doableId": "case_setup_1", "userId": "user_1"}
+    assert events[4].data["id"] == "message_1"
+
+
+def test_allocation_view_changes(managers):
+    """
+    Test that the allocation view changes since a version list added, updated and removed rows,
+    and that None is returned once the changes are no longer kept.
+    """
+    bus, doable_manager, allocation_manager = managers
+    allocation_manager.allocate_by_doable("user_1")
+
+    changes = allocation_manager.get_allocation_view_changes(0)
+    assert changes["version"] == bus.last_id
+    assert [row["doable_id"] for row in changes["added"]] == ["case_setup_1"]
+    assert changes["updated"] == changes["removed"] == []
+
+    version = changes["version"]
+    doable_manager.transition_status("case_setup_1", "completed")
+    changes = allocation_manager.get_allocation_view_changes(version)
+    assert changes["added"] == changes["removed"] == []
+    assert [row["status"] for row in changes["updated"]] == ["completed"]
+
+    allocation_manager.remove_allocations(["case_setup_1"])
+    assert allocation_manager.get_allocation_view_changes(version)["removed"] == ["case_setup_1"]
+    assert allocation_manager.get_allocation_view_changes(0)["added"] == []  # created and removed since
+    assert allocation_manager.get_allocation_view_changes(bus.last_id) == {
+        "version": bus.last_id, "added": [], "updated": [], "removed": [],
+    }
+    assert allocation_manager.get_allocation_view_changes(bus.last_id + 1) is None
+
+
+def test_delete_allocation_of_completed_doable_changes_nothing(managers):
+    """
+    Test that deleting the allocation of a completed doable, alone or with its case, fails without changing anything.
+    """
+    bus, doable_manager, allocation_manager = managers
+    allocation_manager.allocate_by_case("user_1")
+    doable_manager.transition_status("case_setup_1", "completed")
+    version = bus.last_id
+
+    with pytest.raises(ValueError):
+        allocation_manager.delete_allocation("case_setup_1")
+    with pytest.raises(ValueError):
+        allocation_manager.delete_case_allocations("case_1")
+
+    assert "case_setup_1" in allocation_manager.allocations
+    assert doable_manager.get_doable("case_setup_1").status == "completed"
+    assert bus.last_id == version
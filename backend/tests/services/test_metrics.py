@@ -0,0 +1,49 @@
+import pytest
+from services.metrics import Histogram, MetricsRegistry, registry, timed
+
+def test_histogram_quantiles():
+    """
+    Test that quantiles read from the buckets are close to the true values.
+    """
+    histogram = Histogram()
+    for millisecond in range(1, 1001):
+        histogram.observe(millisecond / 1000)
+
+    assert histogram.count == 1000
+    assert histogram.sum == pytest.approx(500.5)
+    assert histogram.quantile(0.5) == pytest.approx(0.5, rel=0.1)
+    assert histogram.quantile(0.99) == pytest.approx(0.99, rel=0.1)
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_render():
+    """
+    Test that histograms are rendered as Prometheus summaries, with label values escaped.
+    """
+    metrics = MetricsRegistry()
+    metrics.histogram("request_seconds", "Request durations.", route='/a"b').observe(0.002)
+    metrics.histogram("request_seconds", route="/c").observe(0.001)
+
+    lines = metrics.render().splitlines()
+
+    assert lines[:2] == ["# HELP request_seconds Request durations.", "# TYPE request_seconds summary"]
+    name, value = lines[4].split(" ")
+    assert name == 'request_seconds{route="/a\\"b",quantile="0.99"}'
+    assert float(value) == pytest.approx(0.002, rel=0.1)
+    assert 'request_seconds_count{route="/c"} 1' in lines
+    assert sum(line.startswith("# TYPE") for line in lines) == 1
+
+
+def test_timed_records_calls_that_raise():
+    """
+    Test that the decorator records a call whether it returns or raises.
+    """
+    @timed("Test.fail")
+    def fail():
+        raise ValueError("failed")
+
+    histogram = registry.histogram("manager_call_duration_seconds", method="Test.fail")
+    with pytest.raises(ValueError):
+        fail()
+
+    assert histogram.count == 1
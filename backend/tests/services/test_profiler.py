@@ -0,0 +1,75 @@
+import pstats
+from services.profiler import RequestProfiler
+
+def hello_app(environ, start_response):
+    start_response("201 Created", [("Content-Type", "text/plain")])
+    return [b"hello"]
+
+
+def call(app, **environ):
+    statuses = []
+    body = app({"REQUEST_METHOD": "GET", "PATH_INFO": "/hello", "QUERY_STRING": "", **environ},
+               lambda status, headers: statuses.append(status))
+    return statuses[0], b"".join(body)
+
+
+def test_profiles_requests_with_header(tmp_path):
+    """
+    Test that only requests with the header are profiled, and that their responses are unchanged.
+    """
+    profiler = RequestProfiler(str(tmp_path))
+    app = profiler.wrap(hello_app)
+
+    assert call(app) == ("201 Created", b"hello")
+    assert call(app, HTTP_X_PROFILE="1") == ("201 Created", b"hello")
+
+    profiles = profiler.list_profiles()
+    assert len(profiles) == 1
+    assert profiles[0]["path"] == "/hello"
+    assert profiles[0]["status"] == 201
+    stats = pstats.Stats(profiler.profile_path(profiles[0]["id"]))
+    assert any(function == "hello_app" for _, _, function in stats.stats)
+
+
+def test_sample_rate(tmp_path):
+    """
+    Test that every request is profiled with a sample rate of 1.
+    """
+    profiler = RequestProfiler(str(tmp_path), sample_rate=1.0)
+    app = profiler.wrap(hello_app)
+
+    for _ in range(3):
+        call(app)
+
+    assert len(profiler.list_profiles()) == 3
+
+
+def test_keeps_most_recent_profiles(tmp_path):
+    """
+    Test that the oldest profiles are deleted beyond the number to keep, and that numbering
+    continues after the saved profiles when restarted.
+    """
+    profiler = RequestProfiler(str(tmp_path), keep=2)
+    app = profiler.wrap(hello_app)
+    for path in ("/a", "/b", "/c"):
+        call(app, HTTP_X_PROFILE="1", PATH_INFO=path)
+
+    assert [profile["path"] for profile in profiler.list_profiles()] == ["/c", "/b"]
+    assert len(list(tmp_path.iterdir())) == 4
+
+    restarted = RequestProfiler(str(tmp_path), keep=2)
+    call(restarted.wrap(hello_app), HTTP_X_PROFILE="1", PATH_INFO="/d")
+    assert [profile["path"] for profile in restarted.list_profiles()] == ["/d", "/c"]
+
+
+def test_report(tmp_path):
+    """
+    Test that a profile is rendered as a text report, and that unknown or invalid IDs are not found.
+    """
+    profiler = RequestProfiler(str(tmp_path))
+    call(profiler.wrap(hello_app), HTTP_X_PROFILE="1")
+    profile_id = profiler.list_profiles()[0]["id"]
+
+    assert "hello_app" in profiler.report(profile_id)
+    assert profiler.report("20240101T000000-99") is None
+    assert profiler.profile_path("../users") is None
@@ -0,0 +1,41 @@
+import pytest
+from services.response_cache import ResponseCache
+
+@pytest.fixture
+def cache():
+    return ResponseCache(max_entries=2)
+
+
+def test_get_returns_cached_body_for_same_version(cache):
+    """
+    Test that a cached response is served, with its ETag, while the data version is unchanged.
+    """
+    etag = cache.put("/api/users", 1, b"[]")
+
+    assert cache.get("/api/users", 1) == (b"[]", etag)
+    assert cache.get("/api/users", 2) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_put_evicts_least_recently_used(cache):
+    """
+    Test that the least recently used response is evicted beyond max_entries.
+    """
+    cache.put("a", 1, b"a")
+    cache.put("b", 1, b"b")
+    cache.get("a", 1)
+    cache.put("c", 1, b"c")
+
+    assert len(cache) == 2
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+
+
+def test_disabled_cache_still_returns_etag():
+    """
+    Test that a cache with no room stores nothing but still computes ETags.
+    """
+    cache = ResponseCache(max_entries=0)
+
+    assert cache.put("a", 1, b"a") == ResponseCache.etag(b"a")
+    assert cache.get("a", 1) is None
@@ -0,0 +1,326 @@
+import pytest
+import json
+from datetime import datetime
+from unittest.mock import MagicMock
+from models.allocation import Allocation
+from models.doable import Doable
+from services.allocation_manager import AllocationManager
+from services.doable_manager import DoableManager
+from services.event_bus import EventBus
+from services.snapshot import AllocationSnapshot, DoableSnapshot, write_allocation_snapshot, write_doable_snapshot
+from services.write_ahead_log import WriteAheadLog
+
+@pytest.fixture
+def mock_doables_data():
+    return [
+        {
+            "id": "message_7",
+            "title": "Test email 1",
+            "case_id": "case_1",
+            "type": "email",
+            "priority": "high",
+            "status": "pending",
+            "created_at": "2024-01-01T00:00:00",
+        },
+        {
+            "id": "task_2_case_1",
+            "title": "Test Task 2",
+            "case_id": "case_1",
+            "type": "task",
+            "priority": "low",
+            "status": "completed",
+            "created_at": "2024-01-02T00:00:00.123456",
+        },
+        {
+            "id": "task_1_case_1",
+            "title": "Test Task 1 ✓",
+            "case_id": "case_1",
+            "type": "task",
+            "priority": "medium",
+            "status": "completed",
+            "created_at": "2024-01-03T00:00:00",
+        },
+        {
+            "id": "task_1",
+            "title": "Test Task without case",
+            "case_id": None,
+            "type": "task",
+            "priority": "low",
+            "status": "allocated",
+            "created_at": "2024-01-04T00:00:00",
+        },
+    ]
+
+@pytest.fixture
+def snapshot(tmp_path, mock_doables_data):
+    path = str(tmp_path / "doables.snapshot")
+    write_doable_snapshot(path, [Doable.from_dict(doable_data) for doable_data in mock_doables_data], 7)
+    snapshot = DoableSnapshot(path)
+    yield snapshot
+    snapshot.close()
+
+@pytest.fixture
+def data_files(tmp_path, mock_doables_data):
+    doable_path = tmp_path / "doables.json"
+    doable_path.write_text(json.dumps(mock_doables_data))
+    return str(doable_path), str(tmp_path / "doables.snapshot")
+
+
+def test_doable_snapshot_round_trip(snapshot, mock_doables_data):
+    """
+    Test that every record is read back as written, completed records first.
+    """
+    records = list(snapshot.load_doables())
+
+    assert [record["id"] for record in records] == ["task_1_case_1", "task_2_case_1", "message_7", "task_1"]
+    assert sorted((Doable.from_dict(record).to_dict() for record in records), key=lambda data: data["id"]) == sorted(
+        (Doable.from_dict(doable_data).to_dict() for doable_data in mock_doables_data), key=lambda data: data["id"]
+    )
+    assert [record["id"] for record in snapshot.load_doables(include_completed=False)] == ["message_7", "task_1"]
+    assert snapshot.max_message_number() == 7
+
+
+def test_doable_snapshot_queries(snapshot):
+    """
+    Test lookups of completed records by ID, case and status.
+    """
+    assert snapshot.get_doable("task_2_case_1")["created_at"] == datetime(2024, 1, 2, 0, 0, 0, 123456)
+    assert snapshot.get_doable("message_7") is None  # only completed records are looked up
+    assert snapshot.get_doable("task_9") is None
+    assert {record["id"] for record in snapshot.get_doables_by_case("case_1", status="completed")} == {
+        "task_1_case_1", "task_2_case_1"
+    }
+    assert snapshot.get_doables_by_case("case_2") == []
+    assert [record["id"] for record in snapshot.get_doables_by_status("allocated")] == ["task_1"]
+    assert snapshot.count_doables_by_case("completed") == {"case_1": 2}
+    assert snapshot.count_doables_by_case("pending") == {"case_1": 1}
+
+
+def test_allocation_snapshot_round_trip(tmp_path):
+    """
+    Test that allocations are read back as written, those of completed doables first, and that those
+    can be looked up by doable ID and user.
+    """
+    path = str(tmp_path / "allocations.snapshot")
+    allocations = [
+        Allocation(doable_id="message_7", user_id="user_1", allocated_at=datetime(2025, 1, 1, 10, 0, 0), is_case_allocation=True),
+        Allocation(doable_id="task_2_case_1", user_id="user_2"),
+        Allocation(doable_id="task_1_case_1", user_id="user_1"),
+    ]
+    write_allocation_snapshot(path, allocations, {"task_1_case_1", "task_2_case_1"})
+    snapshot = AllocationSnapshot(path)
+
+    loaded = [Allocation.from_dict(allocation_data) for allocation_data in snapshot.load_allocations()]
+
+    assert [allocation.doable_id for allocation in loaded] == ["task_1_case_1", "task_2_case_1", "message_7"]
+    assert sorted((allocation.to_dict() for allocation in loaded), key=lambda data: data["doable_id"]) == sorted(
+        (allocation.to_dict() for allocation in allocations), key=lambda data: data["doable_id"]
+    )
+    assert [record["doable_id"] for record in snapshot.load_allocations(include_completed=False)] == ["message_7"]
+    assert snapshot.get_allocation("task_2_case_1")["user_id"] == "user_2"
+    assert snapshot.get_allocation("message_7") is None  # only allocations of completed doables are looked up
+    assert [record["doable_id"] for record in snapshot.get_completed_allocations("user_1")] == ["task_1_case_1"]
+    snapshot.close()
+
+
+def test_manager_switches_from_json_to_snapshot(data_files):
+    """
+    Test that a manager with a snapshot path writes a snapshot on its first checkpoint and loads it on the next start,
+    keeping completed doables in the snapshot until they are needed.
+    """
+    doable_path, snapshot_path = data_files
+    manager = DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path)
+    manager.checkpoint(background=False)
+
+    manager = DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path)
+
+    assert manager.snapshot is not None
+    assert set(manager.doables) == {"message_7", "task_1"}
+    assert manager.message_counter == 7
+    assert manager.get_doable("task_2_case_1").priority == "low"
+    assert {doable.id for doable in manager.get_doables_by_case("case_1")} == {
+        "message_7", "task_1_case_1", "task_2_case_1"
+    }
+    assert len(manager.get_doables_by_status("completed")) == 2
+    assert manager.get_oldest_doable_by_type().id == "message_7"
+    with pytest.raises(ValueError):
+        manager.add_doable_instance(Doable(id="task_1_case_1", title="Duplicate", case_id="case_1"))
+
+
+def test_snapshot_with_write_ahead_log(data_files, tmp_path):
+    """
+    Test that changes logged after the snapshot are replayed on top of it, and checkpointed into it.
+    """
+    doable_path, snapshot_path = data_files
+    wal_path = str(tmp_path / "doables.json.log")
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    manager.checkpoint(background=False)
+
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    manager.update_doable("task_2_case_1", title="Renamed")
+    manager.transition_status("message_7", "allocated")
+    manager.save_doables()
+
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    assert manager.get_doable("task_2_case_1").title == "Renamed"
+    assert manager.get_doable("message_7").status == "allocated"
+    assert manager._cold_case_counts == {"case_1": 1}
+
+    manager.checkpoint(background=False)
+    manager = DoableManager(doable_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    assert set(manager.doables) == {"message_7", "task_1"}
+    assert manager.get_doable("task_2_case_1").title == "Renamed"
+
+
+def test_export_json(data_files, mock_doables_data, tmp_path):
+    """
+    Test that exporting includes the completed doables only held in the snapshot.
+    """
+    doable_path, snapshot_path = data_files
+    DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path).checkpoint(background=False)
+    export_path = tmp_path / "export.json"
+
+    DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path).export_json(str(export_path))
+
+    exported = json.loads(export_path.read_text())
+    assert sorted(doable_data["id"] for doable_data in exported) == sorted(
+        doable_data["id"] for doable_data in mock_doables_data
+    )
+
+
+def test_allocation_manager_snapshot(tmp_path):
+    """
+    Test that allocations are checkpointed to and loaded from a snapshot.
+    """
+    doable_manager = MagicMock()
+    doable_manager.get_doable.return_value = None
+    user_manager = MagicMock()
+    allocation_path = str(tmp_path / "allocations.json")
+    snapshot_path = str(tmp_path / "allocations.snapshot")
+    wal_path = f"{allocation_path}.log"
+    manager = AllocationManager(doable_manager, user_manager, allocation_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+    manager._add_allocation(Allocation(doable_id="message_7", user_id="user_1", is_case_allocation=True))
+    manager.checkpoint(background=False)
+
+    manager = AllocationManager(doable_manager, user_manager, allocation_path, wal=WriteAheadLog(wal_path), snapshot_path=snapshot_path)
+
+    assert manager.allocations["message_7"].is_case_allocation
+    assert manager.get_allocations_by_user("user_1")[0].doable_id == "message_7"
+
+
+def test_tiered_evicts_written_completed_doables(data_files):
+    """
+    Test that in tiered mode completed doables are dropped from memory once written to the snapshot,
+    unless they changed while it was being written.
+    """
+    doable_path, snapshot_path = data_files
+    manager = DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path, tiered=True)
+    manager.checkpoint(background=False)
+    assert set(manager.doables) == {"message_7", "task_1"}
+
+    manager.transition_status("message_7", "allocated")
+    manager.transition_status("message_7", "completed")
+    manager.transition_status("task_1", "completed")
+    write = manager._snapshot_writer()
+    manager.update_doable("task_1", title="Changed while saving")
+    write()
+
+    assert set(manager.doables) == {"task_1"}
+    assert manager.get_doable("message_7").status == "completed"
+    assert manager._cold_case_counts == {"case_1": 3}
+    assert len(manager.get_doables_by_case("case_1")) == 3
+    assert len(manager.get_doables_by_status("completed")) == 4
+
+
+def test_tiered_requires_snapshot():
+    """
+    Test that tiered mode cannot be used without a snapshot to evict to.
+    """
+    with pytest.raises(ValueError):
+        DoableManager("mock_doables.json", tiered=True)
+    with pytest.raises(ValueError):
+        AllocationManager(MagicMock(), MagicMock(), "mock_allocations.json", tiered=True)
+
+
+def test_snapshot_requires_write_ahead_log():
+    """
+    Test that snapshots cannot be used without a write-ahead log, as they are only written when it is checkpointed.
+    """
+    with pytest.raises(ValueError):
+        DoableManager("mock_doables.json", snapshot_path="mock_doables.snapshot")
+    with pytest.raises(ValueError):
+        AllocationManager(MagicMock(), MagicMock(), "mock_allocations.json", snapshot_path="mock_allocations.snapshot")
+
+
+def test_cold_cache(data_files):
+    """
+    Test that doables read from the snapshot are cached up to the cache size, and dropped once resident.
+    """
+    doable_path, snapshot_path = data_files
+    DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path).checkpoint(background=False)
+    manager = DoableManager(doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=snapshot_path, cold_cache_size=1)
+
+    first = manager.get_doable("task_1_case_1")
+    assert manager.get_doable("task_1_case_1") is first
+    manager.get_doable("task_2_case_1")
+    assert list(manager._cold_cache) == ["task_2_case_1"]
+
+    manager.update_doable("task_2_case_1", title="Renamed")
+    assert not manager._cold_cache
+    assert manager.get_doable("task_2_case_1").title == "Renamed"
+
+
+def test_tiered_keeps_allocations_of_completed_doables_in_snapshot(data_files, tmp_path):
+    """
+    Test that in tiered mode allocations of completed doables are dropped from memory once written to the
+    snapshot and not loaded on the next start, while queries that can include completed doables still return them.
+    """
+    doable_path, doable_snapshot_path = data_files
+    allocation_path = tmp_path / "allocations.json"
+    allocation_path.write_text(json.dumps([
+        {"doable_id": "task_1", "user_id": "user_1", "allocated_at": "2024-02-01T00:00:00", "is_case_allocation": False},
+        {"doable_id": "task_1_case_1", "user_id": "user_2", "allocated_at": "2024-02-01T00:00:00", "is_case_allocation": True},
+    ]))
+
+    def load():
+        bus = EventBus()
+        doable_manager = DoableManager(
+            doable_path, wal=WriteAheadLog(f"{doable_path}.log"), snapshot_path=doable_snapshot_path, tiered=True, events=bus,
+        )
+        allocation_manager = AllocationManager(
+            doable_manager, MagicMock(), str(allocation_path), wal=WriteAheadLog(f"{allocation_path}.log"),
+            snapshot_path=str(tmp_path / "allocations.snapshot"), tiered=True, events=bus,
+        )
+        return bus, doable_manager, allocation_manager
+
+    bus, doable_manager, manager = load()
+    manager.checkpoint(background=False)
+    assert set(manager.allocations) == {"task_1"}
+
+    version = bus.last_id
+    doable_manager.transition_status("task_1", "completed")
+    doable_manager.checkpoint(background=False)
+    manager.checkpoint(background=False)
+
+    assert manager.allocations == {}
+    assert [row["doable_id"] for row in manager.get_allocation_view()] == ["task_1_case_1", "task_1"]
+    rows, cursor = manager.query_allocation_view(limit=1)
+    assert [row["doable_id"] for row in rows] == ["task_1_case_1"]
+    assert [row["doable_id"] for row in manager.query_allocation_view(cursor=cursor, limit=1)[0]] == ["task_1"]
+    assert manager.query_allocation_view(statuses=["allocated"]) == ([], None)
+    assert [group["case_id"] for group in manager.get_allocation_view_by_case()] == ["case_1", None]
+    assert [row["status"] for row in manager.get_allocation_view_changes(version)["updated"]] == ["completed"]
+
+    bus, doable_manager, manager = load()
+    assert manager.allocations == {}
+    assert manager.get_allocation("task_1").user_id == "user_1"
+    assert [allocation.doable_id for allocation in manager.get_allocations_by_user("user_2")] == ["task_1_case_1"]
+    with pytest.raises(ValueError):
+        manager.delete_allocation("task_1")
+
+    assert [allocation.doable_id for allocation in manager.remove_allocations(["task_1"])] == ["task_1"]
+    assert manager.get_allocation("task_1") is None
+    manager.save_allocations()
+    manager.checkpoint(background=False)
+    bus, doable_manager, manager = load()
+    assert [row["doable_id"] for row in manager.get_allocation_view()] == ["task_1_case_1"]
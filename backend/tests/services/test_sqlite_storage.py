@@ -0,0 +1,177 @@
+import pytest
+from unittest.mock import MagicMock
+from models.doable import Doable
+from services.allocation_manager import AllocationManager
+from services.doable_manager import DoableManager
+from services.sqlite_storage import SqliteStorage
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "test.db"))
+    yield storage
+    storage.close()
+
+@pytest.fixture
+def mock_doables_data():
+    return [
+        {
+            "id": "message_7",
+            "title": "Test email 1",
+            "case_id": "case_1",
+            "type": "email",
+            "priority": "high",
+            "status": "pending",
+            "created_at": "2024-01-01T00:00:00",
+        },
+        {
+            "id": "task_1_case_1",
+            "title": "Test Task 1",
+            "case_id": "case_1",
+            "type": "task",
+            "priority": "low",
+            "status": "completed",
+            "created_at": "2024-01-02T00:00:00",
+        },
+        {
+            "id": "task_1_case_2",
+            "title": "Test Task 1",
+            "case_id": "case_2",
+            "type": "task",
+            "priority": "low",
+            "status": "pending",
+            "created_at": "2024-01-03T00:00:00",
+        },
+    ]
+
+@pytest.fixture
+def seeded_storage(storage, mock_doables_data):
+    for doable_data in mock_doables_data:
+        storage.stage("doables", doable_data["id"], doable_data)
+    storage.commit()
+    return storage
+
+
+def test_stage_and_commit(storage, mock_doables_data):
+    """
+    Test that staged records are only visible once committed.
+    """
+    storage.stage("doables", "message_7", mock_doables_data[0])
+    assert storage.is_empty()
+
+    storage.commit()
+
+    assert not storage.is_empty()
+    assert storage.get_doable("message_7") == mock_doables_data[0]
+
+
+def test_staged_deletion(storage):
+    """
+    Test that staging None deletes a record.
+    """
+    allocation_data = {"doable_id": "message_7", "user_id": "user_1", "allocated_at": "2025-01-01T00:00:00", "is_case_allocation": True}
+    storage.stage("allocations", "message_7", allocation_data)
+    storage.commit()
+    assert list(storage.load_allocations()) == [allocation_data]
+
+    storage.stage("allocations", "message_7", None)
+    storage.commit()
+    assert list(storage.load_allocations()) == []
+
+
+def test_queries(seeded_storage):
+    """
+    Test the indexed queries used by the managers.
+    """
+    assert [d["id"] for d in seeded_storage.load_doables(include_completed=False)] == ["message_7", "task_1_case_2"]
+    assert [d["id"] for d in seeded_storage.get_doables_by_case("case_1", status="completed")] == ["task_1_case_1"]
+    assert seeded_storage.count_doables_by_case("completed") == {"case_1": 1}
+    assert seeded_storage.max_message_number() == 7
+
+
+def test_allocation_queries(seeded_storage):
+    """
+    Test the allocation queries that keep allocations of completed doables in storage.
+    """
+    for doable_id, user_id in (("message_7", "user_1"), ("task_1_case_1", "user_2")):
+        seeded_storage.stage("allocations", doable_id, {
+            "doable_id": doable_id, "user_id": user_id, "allocated_at": "2025-01-01T00:00:00", "is_case_allocation": False,
+        })
+    seeded_storage.commit()
+
+    assert [a["doable_id"] for a in seeded_storage.load_allocations(include_completed=False)] == ["message_7"]
+    assert seeded_storage.get_allocation("task_1_case_1")["user_id"] == "user_2"
+    assert seeded_storage.get_allocation("task_1_case_2") is None
+    assert [a["doable_id"] for a in seeded_storage.get_completed_allocations()] == ["task_1_case_1"]
+    assert seeded_storage.get_completed_allocations("user_1") == []
+
+
+def test_allocation_manager_keeps_completed_allocations_in_storage(seeded_storage):
+    """
+    Test that only allocations of open doables are loaded, that those of doables completed in memory
+    are dropped once committed, and that queries including completed doables still return them.
+    """
+    for doable_id in ("message_7", "task_1_case_1"):
+        seeded_storage.stage("allocations", doable_id, {
+            "doable_id": doable_id, "user_id": "user_1", "allocated_at": "2025-01-01T00:00:00", "is_case_allocation": False,
+        })
+    seeded_storage.commit()
+    doable_manager = DoableManager("unused.json", storage=seeded_storage)
+    manager = AllocationManager(doable_manager, MagicMock(), "unused.json", storage=seeded_storage)
+
+    assert set(manager.allocations) == {"message_7"}
+    assert [row["doable_id"] for row in manager.get_allocation_view()] == ["message_7", "task_1_case_1"]
+    assert [row["doable_id"] for row in manager.query_allocation_view(statuses=["pending"])[0]] == ["message_7"]
+
+    doable_manager.update_doable("message_7", status="completed")
+    doable_manager.save_doables()
+    manager.save_allocations()
+
+    assert manager.allocations == {}
+    assert [row["doable_id"] for row in manager.query_allocation_view(statuses=["completed"])[0]] == [
+        "message_7", "task_1_case_1"
+    ]
+    assert len(manager.get_allocations_by_user("user_1")) == 2
+    with pytest.raises(ValueError):
+        manager.delete_allocation("task_1_case_1")
+
+
+def test_doable_manager_keeps_completed_doables_in_storage(seeded_storage):
+    """
+    Test that completed doables are not held in memory but can still be read.
+    """
+    manager = DoableManager("unused.json", storage=seeded_storage)
+
+    assert set(manager.doables) == {"message_7", "task_1_case_2"}
+    assert manager.message_counter == 7
+    assert manager.get_doable("task_1_case_1").status == "completed"
+    assert [d.id for d in manager.get_doables_by_case("case_1")] == ["message_7", "task_1_case_1"]
+    assert manager.get_oldest_pending_case() == "case_2"  # case_1 has a completed doable
+
+
+def test_doable_manager_evicts_completed_doables_on_save(seeded_storage):
+    """
+    Test that doables completed in memory are committed and then dropped from memory.
+    """
+    manager = DoableManager("unused.json", storage=seeded_storage)
+
+    manager.update_doable("task_1_case_2", status="completed")
+    manager.save_doables()
+
+    assert "task_1_case_2" not in manager.doables
+    assert seeded_storage.get_doable("task_1_case_2")["status"] == "completed"
+    assert manager.get_oldest_pending_case() is None
+
+    manager.update_doable("task_1_case_2", status="pending")
+
+    assert "task_1_case_2" in manager.doables
+    assert manager.get_oldest_pending_case() == "case_2"
+
+
+def test_doable_manager_rejects_duplicate_of_stored_doable(seeded_storage):
+    """
+    Test that a doable held only in storage still counts as existing.
+    """
+    manager = DoableManager("unused.json", storage=seeded_storage)
+
+    with pytest.raises(ValueError):
+        manager.add_doable_instance(Doable(id="task_1_case_1", title="Test Task 1", case_id="case_1"))
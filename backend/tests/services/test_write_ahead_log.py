@@ -0,0 +1,186 @@
+import pytest
+import json
+import threading
+from unittest.mock import MagicMock
+from models.doable import Doable
+from services.allocation_manager import AllocationManager
+from services.doable_manager import DoableManager
+from services.write_ahead_log import WriteAheadLog
+
+@pytest.fixture
+def wal(tmp_path):
+    return WriteAheadLog(str(tmp_path / "doables.json.log"), checkpoint_every=2)
+
+@pytest.fixture
+def mock_doable_data():
+    return {
+        "id": "message_1",
+        "title": "Test email 1",
+        "case_id": "case_1",
+        "type": "email",
+        "priority": "high",
+        "status": "pending",
+        "created_at": "2024-01-01T00:00:00",
+    }
+
+
+def test_append_is_buffered_until_flush(wal):
+    """
+    Test that records are only written to the log when flushed.
+    """
+    wal.append("put", {"id": "message_1"})
+    assert list(wal.replay()) == []
+
+    wal.flush()
+    assert list(wal.replay()) == [("put", {"id": "message_1"})]
+
+
+def test_replay_stops_at_torn_record(wal):
+    """
+    Test that an incomplete trailing record left by a crash is ignored.
+    """
+    wal.append("put", {"id": "message_1"})
+    wal.flush()
+    with open(wal.file_path, "a") as file:
+        file.write('{"op":"put","da')
+
+    assert list(wal.replay()) == [("put", {"id": "message_1"})]
+    assert wal.record_count == 1
+
+
+def test_records_after_torn_record_survive_restart(wal):
+    """
+    Test that records written after restarting from a torn record are replayed on the next restart.
+    """
+    wal.append("put", {"id": "message_1"})
+    wal.flush()
+    with open(wal.file_path, "a") as file:
+        file.write('{"op":"put","da')
+
+    restarted = WriteAheadLog(wal.file_path)
+    assert list(restarted.replay()) == [("put", {"id": "message_1"})]
+    restarted.append("put", {"id": "message_2"})
+    restarted.append("put", {"id": "message_3"})
+    restarted.flush()
+
+    assert [data["id"] for _, data in WriteAheadLog(wal.file_path).replay()] == ["message_1", "message_2", "message_3"]
+
+
+def test_checkpoint_due(wal):
+    """
+    Test that a checkpoint is due once enough records have been flushed.
+    """
+    wal.append("put", {"id": "message_1"})
+    wal.flush()
+    assert not wal.checkpoint_due()
+
+    wal.append("put", {"id": "message_2"})
+    wal.flush()
+    assert wal.checkpoint_due()
+
+
+def test_checkpoint_writes_snapshot_and_truncates_log(wal):
+    """
+    Test that a checkpoint writes the snapshot and leaves an empty log behind.
+    """
+    snapshot = MagicMock()
+    wal.append("put", {"id": "message_1"})
+    wal.flush()
+
+    wal.checkpoint(snapshot)
+    wal.wait()
+
+    snapshot.assert_called_once()
+    assert list(wal.replay()) == []
+
+
+def test_checkpoint_waits_for_running_checkpoint(wal):
+    """
+    Test that a checkpoint only starts once a checkpoint running in the background has finished.
+    """
+    order = []
+    release = threading.Event()
+
+    def slow_snapshot():
+        release.wait(5)
+        order.append("background")
+
+    wal.append("put", {"id": "message_1"})
+    wal.flush()
+    wal.checkpoint(slow_snapshot)
+    threading.Timer(0.05, release.set).start()
+    wal.checkpoint(lambda: order.append("final"), background=False)
+
+    assert order == ["background", "final"]
+
+
+def test_replay_includes_unfinished_checkpoint(wal):
+    """
+    Test that records of a checkpoint that never finished are replayed before newer records.
+    """
+    wal.append("put", {"id": "message_1"})
+    wal.flush()
+    with open(wal.rotated_path, "w") as file:
+        file.write('{"op":"put","data":{"id":"message_0"}}\n')
+
+    assert [data["id"] for _, data in wal.replay()] == ["message_0", "message_1"]
+
+
+def test_doable_manager_replays_log(tmp_path, mock_doable_data):
+    """
+    Test that a DoableManager restores changes from its log on top of the JSON snapshot.
+    """
+    file_path = str(tmp_path / "doables.json")
+    with open(file_path, "w") as file:
+        json.dump([mock_doable_data], file)
+
+    manager = DoableManager(file_path, wal=WriteAheadLog(f"{file_path}.log"))
+    manager.update_doable("message_1", status="allocated")
+    manager.add_doable_instance(Doable.from_dict({**mock_doable_data, "id": "message_2"}))
+    manager.save_doables()
+
+    with open(file_path) as file:
+        assert json.load(file) == [mock_doable_data]  # snapshot untouched until a checkpoint
+
+    restored = DoableManager(file_path, wal=WriteAheadLog(f"{file_path}.log"))
+    assert restored.get_doable("message_1").status == "allocated"
+    assert restored.get_doable("message_2") is not None
+    assert restored.message_counter == 2
+    assert restored.get_oldest_doable_by_type().id == "message_2"
+
+
+def test_doable_manager_checkpoint(tmp_path, mock_doable_data):
+    """
+    Test that a checkpoint folds the log into the JSON snapshot.
+    """
+    file_path = str(tmp_path / "doables.json")
+    manager = DoableManager(file_path, wal=WriteAheadLog(f"{file_path}.log", checkpoint_every=1))
+    manager.add_doable_instance(Doable.from_dict(mock_doable_data))
+    manager.save_doables()
+    manager.wal.wait()
+
+    with open(file_path) as file:
+        assert [doable["id"] for doable in json.load(file)] == ["message_1"]
+    assert list(manager.wal.replay()) == []
+
+
+def test_allocation_manager_replays_log(tmp_path):
+    """
+    Test that an AllocationManager restores added and deleted allocations from its log.
+    """
+    file_path = str(tmp_path / "allocations.json")
+    doable_manager = MagicMock()
+    doable_manager.get_oldest_doable_by_type.side_effect = [
+        Doable(id="task_1", title="Task 1"),
+        Doable(id="task_2", title="Task 2"),
+    ]
+
+    manager = AllocationManager(doable_manager, MagicMock(), file_path, wal=WriteAheadLog(f"{file_path}.log"))
+    manager.allocate_by_doable("user_1")
+    manager.allocate_by_doable("user_1")
+    manager.delete_allocation("task_1")
+    manager.save_allocations()
+
+    restored = AllocationManager(doable_manager, MagicMock(), file_path, wal=WriteAheadLog(f"{file_path}.log"))
+    assert list(restored.allocations) == ["task_2"]
+    assert [a.doable_id for a in restored.get_allocations_by_user("user_1")] == ["task_2"]
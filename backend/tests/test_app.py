@@ -0,0 +1,335 @@
+import pytest
+import importlib
+import json
+import shutil
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+pytest.importorskip("flask")
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """
+    Import a fresh copy of the app backed by a copy of the sample data.
+    """
+    data_dir = tmp_path / "data"
+    shutil.copytree(DATA_DIR, data_dir)
+    monkeypatch.setenv("DATA_DIR", str(data_dir))
+    sys.modules.pop("app", None)
+    module = importlib.import_module("app")
+    yield module
+    sys.modules.pop("app", None)
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def test_concurrent_requests_never_double_allocate(app_module, client):
+    """
+    Test that allocation requests hammering the API from many threads never hand out a doable twice.
+    """
+    user_ids = [user["id"] for user in client.get("/api/users").get_json()]
+    allocated = []
+    lock = threading.Lock()
+
+    def allocate(index):
+        user_id = user_ids[index % len(user_ids)]
+        path = f"/api/users/{user_id}/doables" + ("/case" if index % 2 else "")
+        while True:
+            response = client.post(path)
+            assert response.status_code == 200
+            body = response.get_json()
+            if isinstance(body, dict) and "message" in body:
+                return
+            with lock:
+                allocated.extend(d["id"] for d in (body if isinstance(body, list) else [body]))
+
+    threads = [threading.Thread(target=allocate, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(allocated) == len(set(allocated))
+    views = client.get("/api/allocations").get_json()
+    assert sorted(view["doableId"] for view in views) == sorted(allocated)
+    with open(Path(app_module.DATA_DIR) / "allocations.json") as file:
+        assert sorted(a["doable_id"] for a in json.load(file)) == sorted(allocated)
+
+
+def test_allocate_bulk(client):
+    """
+    Test filling several users' queues in one request.
+    """
+    users = {user["userName"]: user["id"] for user in client.get("/api/users").get_json()}
+
+    response = client.post("/api/allocations/bulk", json=[
+        {"userId": users["emma.emails"], "count": 2},
+        {"userId": users["terry.tasks"], "mode": "case"},
+    ])
+
+    assert response.status_code == 200
+    allocations = response.get_json()
+    emma = [a for a in allocations if a["userId"] == users["emma.emails"]]
+    terry = [a for a in allocations if a["userId"] == users["terry.tasks"]]
+    assert len(emma) == 2 and all(a["doable"]["type"] == "email" for a in emma)
+    assert terry and all(a["isCaseAllocation"] for a in terry)
+    assert len(client.get("/api/allocations").get_json()) == len(allocations)
+
+
+def test_allocate_bulk_rejects_unknown_user(client):
+    """
+    Test that an unknown user fails the request without allocating anything.
+    """
+    response = client.post("/api/allocations/bulk", json=[{"userId": "nobody"}])
+
+    assert response.status_code == 400
+    assert client.get("/api/allocations").get_json() == []
+
+
+def test_add_doables_bulk(app_module, client):
+    """
+    Test adding doables from a JSON array, with invalid rows reported rather than failing the request.
+    """
+    response = client.post("/api/doables/bulk", json=[
+        {"doableTitle": "Chase the bank", "caseId": "case_90", "doableType": "task", "doablePriority": "high"},
+        {"doableTitle": "Bad priority", "caseId": "case_90", "doablePriority": "urgent"},
+        {"doableTitle": "New enquiry", "caseId": "case_90", "doableType": "email"},
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["added"] == 2
+    assert [error["row"] for error in body["errors"]] == [1]
+    assert app_module.doable_manager.get_doable("chase_the_bank_90").priority == "high"
+
+
+def test_add_doables_bulk_ndjson(client):
+    """
+    Test adding doables streamed as NDJSON, with unparseable lines reported.
+    """
+    lines = [
+        json.dumps({"doableTitle": "Call the client", "caseId": "case_91", "doableType": "task"}),
+        "{not json",
+        "",
+        json.dumps({"doableTitle": "Send the forms", "caseId": "case_91", "doableType": "task"}),
+    ]
+    response = client.post("/api/doables/bulk", data="\n".join(lines), content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["added"] == 2
+    assert [error["row"] for error in body["errors"]] == [1]
+
+
+def test_get_allocations_paginated(client):
+    """
+    Test paging through allocations filtered on the server.
+    """
+    user_id = next(user["id"] for user in client.get("/api/users").get_json() if user["userName"] == "emma.emails")
+    client.post("/api/allocations/bulk", json=[{"userId": user_id, "count": 3}])
+
+    first = client.get(f"/api/allocations?userId={user_id}&status=allocated&limit=2").get_json()
+    second = client.get(f"/api/allocations?userId={user_id}&status=allocated&limit=2&cursor={first['nextCursor']}").get_json()
+
+    assert len(first["allocations"]) == 2 and first["nextCursor"]
+    assert len(second["allocations"]) == 1 and second["nextCursor"] is None
+    assert client.get("/api/allocations?limit=0").status_code == 400
+
+
+def test_get_allocations_follows_doable_changes(client):
+    """
+    Test that the allocation view reflects doables completed after they were allocated, grouped by case.
+    """
+    user_id = next(user["id"] for user in client.get("/api/users").get_json() if user["userName"] == "terry.tasks")
+    allocated = client.post(f"/api/users/{user_id}/doables/case").get_json()
+    case_id = allocated[0]["caseId"]
+    client.patch(f"/api/doables/{allocated[0]['id']}", json={"status": "completed"})
+
+    completed = client.get("/api/allocations?status=completed").get_json()
+    groups = client.get(f"/api/allocations?groupBy=case&userId={user_id}").get_json()
+
+    assert [view["doableId"] for view in completed] == [allocated[0]["id"]]
+    assert [group["caseId"] for group in groups] == [case_id]
+    assert len(groups[0]["allocations"]) == len(allocated)
+
+
+def test_get_allocations_etag(client):
+    """
+    Test that unchanged polls get a 304 and that a change produces a new response.
+    """
+    first = client.get("/api/allocations")
+    unchanged = client.get("/api/allocations", headers={"If-None-Match": first.headers["ETag"]})
+
+    user_id = client.get("/api/users").get_json()[0]["id"]
+    client.post(f"/api/users/{user_id}/doables")
+    changed = client.get("/api/allocations", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200 and first.get_json() == []
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200 and len(changed.get_json()) == 1
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_get_doable_counts(app_module, client):
+    """
+    Test counting doables by status and type.
+    """
+    counts = client.get("/api/doables/counts").get_json()
+
+    total = sum(count for by_type in counts.values() for count in by_type.values())
+    assert total == len(app_module.doable_manager.doables)
+    assert set(counts) == {"pending", "allocated", "completed"}
+
+
+def test_archive_endpoints(app_module, client):
+    """
+    Test listing, reading and restoring archived doables.
+    """
+    case_doables = app_module.doable_manager.get_doables_by_case("case_1")
+    for doable in case_doables:
+        app_module.doable_manager.transition_status(doable.id, "allocated")
+        app_module.doable_manager.transition_status(doable.id, "completed")
+    archived = app_module.archive_manager.archive_completed(datetime.now())
+    partition = next(iter(archived))
+
+    partitions = client.get("/api/archive").get_json()
+    archive = client.get(f"/api/archive/{partition}?caseId=case_1").get_json()
+    restored = client.post(f"/api/archive/{partition}/restore")
+
+    assert partitions == [{"partition": partition, "doables": len(case_doables), "allocations": 0}]
+    assert {doable["id"] for doable in archive["doables"]} == {doable.id for doable in case_doables}
+    assert restored.status_code == 200 and restored.get_json()["doables"] == len(case_doables)
+    assert client.get(f"/api/archive/{partition}").status_code == 404
+    assert client.get("/api/archive/latest").status_code == 400
+
+
+def test_get_metrics(client):
+    """
+    Test that request and manager call durations are reported in the Prometheus text format.
+    """
+    client.get("/api/users")
+
+    response = client.get("/api/metrics")
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/users",status="200"}' in text
+    assert 'manager_call_duration_seconds_count{method="DoableManager._load_from_file"}' in text
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setenv("PROFILING", "1")
+
+
+def test_profiles(profiling, client):
+    """
+    Test that requests sent with the profile header are profiled, and their profiles listed and served.
+    """
+    assert client.get("/api/profiles").get_json() == []
+    client.get("/api/users", headers={"X-Profile": "1"})
+    client.get("/api/users")
+
+    profiles = client.get("/api/profiles").get_json()
+    assert len(profiles) == 1
+    assert profiles[0]["method"] == "GET"
+    assert profiles[0]["path"] == "/api/users"
+    assert profiles[0]["status"] == 200
+
+    response = client.get(f"/api/profiles/{profiles[0]['id']}")
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+
+    report = client.get(f"/api/profiles/{profiles[0]['id']}?format=text").get_data(as_text=True)
+    assert "get_users" in report
+    assert client.get(f"/api/profiles/{profiles[0]['id']}?format=text&sort=tottime").status_code == 200
+    assert client.get(f"/api/profiles/{profiles[0]['id']}?format=text&sort=bogus").status_code == 400
+    assert client.get("/api/profiles/20240101T000000-99").status_code == 404
+    assert client.get("/api/profiles/..%2Fusers").status_code == 404
+
+
+def test_profiles_disabled(client):
+    """
+    Test that the profile endpoints are not found, and headers ignored, unless profiling is enabled.
+    """
+    client.get("/api/users", headers={"X-Profile": "1"})
+
+    assert client.get("/api/profiles").status_code == 404
+
+
+def test_events_stream(client):
+    """
+    Test that changes are streamed as server-sent events, resuming after the last event ID.
+    """
+    user_id = client.get("/api/users").get_json()[0]["id"]
+    client.post(f"/api/users/{user_id}/doables")
+
+    response = client.get("/api/events", headers={"Last-Event-ID": "0"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunk = next(iter(response.response)).decode("utf-8")
+    response.close()
+
+    frames = [frame.splitlines() for frame in chunk.strip().split("\n\n")]
+    assert [frame[:2] for frame in frames] == [
+        ["id: 1", "event: doable.status"],
+        ["id: 2", "event: allocation.created"],
+    ]
+    assert json.loads(frames[1][2][len("data: "):])["userId"] == user_id
+
+
+def test_events_stream_resync(client):
+    """
+    Test that a stream asked to resume from an event that is not kept tells the client to resync.
+    """
+    response = client.get("/api/events?lastEventId=5", buffered=False)
+    chunk = next(iter(response.response)).decode("utf-8")
+    response.close()
+
+    assert chunk.startswith("id: 0\nevent: resync\n")
+    assert client.get("/api/events?lastEventId=abc").status_code == 400
+
+
+def test_get_allocations_since(client):
+    """
+    Test that polling with since returns only the changes since the version of an earlier response.
+    """
+    user_id = client.get("/api/users").get_json()[0]["id"]
+    first_id = client.post(f"/api/users/{user_id}/doables").get_json()["id"]
+    version = client.get("/api/allocations").headers["X-Data-Version"]
+    doable_id = client.post(f"/api/users/{user_id}/doables").get_json()["id"]
+    client.delete(f"/api/allocations/{first_id}")
+
+    changes = client.get(f"/api/allocations?since={version}").get_json()
+
+    assert [row["doableId"] for row in changes["added"]] == [doable_id]
+    assert changes["removed"] == [first_id]
+    assert changes["updated"] == []
+    assert changes["version"] == int(client.get("/api/allocations").headers["X-Data-Version"])
+    assert client.get(f"/api/allocations?since={changes['version']}").get_json()["added"] == []
+
+    response = client.get(f"/api/allocations?since={changes['version'] + 1}")
+    assert response.status_code == 410
+    assert response.get_json()["resyncRequired"] is True
+    assert client.get("/api/allocations?since=1&limit=5").status_code == 400
+
+
+def test_delete_allocation_of_completed_doable(client):
+    """
+    Test that deleting the allocation of a completed doable is refused and leaves the allocation in place.
+    """
+    user_id = client.get("/api/users").get_json()[0]["id"]
+    doable_id = client.post(f"/api/users/{user_id}/doables").get_json()["id"]
+    client.patch(f"/api/doables/{doable_id}", json={"status": "completed"})
+
+    response = client.delete(f"/api/allocations/{doable_id}")
+
+    assert response.status_code == 409
+    assert [row["doableId"] for row in client.get("/api/allocations").get_json()] == [doable_id]
+    assert client.delete("/api/allocations/unknown").status_code == 404
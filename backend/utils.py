@@ -1,17 +1,79 @@
+import base64
+import functools
+import json
+import os
+
 def sort_object_list_by_key(data, key):
     """Sort a list of objects by a specific key."""
     return sorted(data, key=lambda x: getattr(x, key))
 
+@functools.lru_cache(maxsize=None)
 def snake_to_camel(snake_str):
-    """Convert snake_case to camelCase."""
+    """Convert snake_case to camelCase. Memoized, as responses repeat the same few keys on every row."""
     components = snake_str.split('_')
     return components[0] + ''.join(x.title() for x in components[1:])
 
 def convert_dict_keys_to_camel_case(data):
     """Convert dictionary keys from snake_case to camelCase."""
     if isinstance(data, dict):
-        return {snake_to_camel(key): convert_dict_keys_to_camel_case(value) for key, value in data.items()}
+        return {
+            snake_to_camel(key): convert_dict_keys_to_camel_case(value) if isinstance(value, (dict, list)) else value
+            for key, value in data.items()
+        }
     elif isinstance(data, list):
-        return [convert_dict_keys_to_camel_case(item) for item in data]
+        return [convert_dict_keys_to_camel_case(item) if isinstance(item, (dict, list)) else item for item in data]
     else:
-        return data
\ No newline at end of file
+        return data
+
+@functools.lru_cache(maxsize=1024)
+def _camel_case_keys(keys):
+    return tuple(snake_to_camel(key) for key in keys)
+
+def camel_case_rows(rows):
+    """Convert the keys of flat dictionaries to camelCase, converting each distinct set of keys only once."""
+    return [dict(zip(_camel_case_keys(tuple(row)), row.values())) for row in rows]
+
+def write_json_atomic(file_path, data, indent=4):
+    """Write data as JSON to a temporary file and atomically move it into place."""
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, file_path)
+
+
+def write_bytes_atomic(file_path, data):
+    """Write bytes to a temporary file and atomically move it into place."""
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, file_path)
+
+
+def encode_cursor(key):
+    """Encode a sort key as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor back into its sort key, raising ValueError if it is malformed."""
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def iter_ndjson(lines):
+    """Parse newline-delimited JSON lazily, yielding the error in place of any line that is not valid JSON."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield e